@@ -0,0 +1,99 @@
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List
+
+from fastapi import FastAPI, HTTPException
+from pydantic import create_model
+
+from insurance_fraud_detection.constants import APP_HOST, APP_PORT, SCHEMA_FILE_PATH
+from insurance_fraud_detection.entity.config_entity import InsuranceFraudPredictorConfig
+from insurance_fraud_detection.entity.estimator import SchemaPreprocessor
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.pipeline.prediction_pipeline import (InsuranceFraudClassifier, LatencyTracker,
+                                                                    MicroBatcher, build_claim_model)
+from insurance_fraud_detection.utils.main_utils import read_yaml_file
+
+
+init_logging()
+predictor_config = InsuranceFraudPredictorConfig()
+schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+
+InsuranceClaim = build_claim_model(schema_config, SchemaPreprocessor(schema_config).input_columns)
+InsuranceClaimBatch = create_model("InsuranceClaimBatch", claims=(List[InsuranceClaim], ...))
+
+classifier = InsuranceFraudClassifier(prediction_pipeline_config=predictor_config)
+tracker = LatencyTracker(window=predictor_config.latency_window)
+# the service looks up the cache itself and only queues the claims it misses
+batcher = MicroBatcher(partial(classifier.predict_records, lookup=False),
+                       max_batch_size=predictor_config.max_batch_size, max_wait_ms=predictor_config.max_wait_ms,
+                       tracker=tracker)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the model is loaded once per worker process, before the first request is accepted
+    classifier.load()
+    await batcher.start()
+    # promoted models are loaded in the background and swapped in while requests keep being served
+    watcher = classifier.watch()
+    logging.info(f"Prediction service ready: max_batch_size={predictor_config.max_batch_size}, "
+                 f"max_wait_ms={predictor_config.max_wait_ms}")
+    yield
+    if watcher is not None:
+        watcher.stop()
+    await batcher.stop()
+
+
+app = FastAPI(title="Insurance fraud detection", lifespan=lifespan)
+
+
+async def _score(claims: list) -> List[dict]:
+    start = time.perf_counter()
+    records = [claim.dict() for claim in claims]
+    try:
+        results = classifier.lookup(records)
+        missing = [record for record, result in zip(records, results) if result is None]
+        if missing:
+            scored = iter(await batcher.submit(missing))
+            results = [result if result is not None else next(scored) for result in results]
+    except Exception:
+        tracker.errors += 1
+        logging.exception("Prediction failed")
+        raise HTTPException(status_code=500, detail="prediction failed")
+    tracker.record_request((time.perf_counter() - start) * 1000.0, len(claims))
+    return results
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "model": repr(classifier.model), "model_version": classifier.model_version,
+            "model_file_path": classifier.model_file_path}
+
+
+@app.post("/predict")
+async def predict(claim: InsuranceClaim):
+    return (await _score([claim]))[0]
+
+
+@app.post("/predict/batch")
+async def predict_batch(batch: InsuranceClaimBatch):
+    if len(batch.claims) > predictor_config.max_request_records:
+        raise HTTPException(status_code=413,
+                            detail=f"at most {predictor_config.max_request_records} claims per request")
+    return {"predictions": await _score(batch.claims)}
+
+
+@app.get("/metrics")
+async def metrics():
+    summary = tracker.summary()
+    if classifier.cache is not None:
+        summary["cache"] = classifier.cache.stats()
+    return summary
+
+
+if __name__ == "__main__":
+    # a server process imports uvicorn itself (uvicorn app:app), only `python app.py` needs it here
+    import uvicorn
+
+    uvicorn.run(app, host=APP_HOST, port=APP_PORT)
@@ -1,5 +1,7 @@
+from insurance_fraud_detection.logger import init_logging
 from insurance_fraud_detection.pipeline.training_pipeline import TrainPipeline
 
+init_logging()
 
 obj = TrainPipeline()
 obj.run_pipeline()  # This will start the training pipeline and execute the data ingestion step.
\ No newline at end of file
@@ -1,34 +1,118 @@
 import os
 import sys
+from datetime import datetime
+from typing import Any, Iterator, Optional, Tuple
 
+import pandas as pd
 from pandas import DataFrame
-from sklearn.model_selection import train_test_split
 
+from insurance_fraud_detection.constants import SCHEMA_FILE_PATH
 from insurance_fraud_detection.entity.config_entity import DataIngestionConfig
 from insurance_fraud_detection.entity.artifact_entity import DataIngestionArtifact
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.logger import logging
 from insurance_fraud_detection.data_access.data import InsuranceData
+from insurance_fraud_detection.data_access.feature_store import FeatureStore
+from insurance_fraud_detection.utils.main_utils import compute_file_hash, read_yaml_file, write_yaml_file
+from insurance_fraud_detection.utils.run_metrics import add_rows, instrumented_step
+from insurance_fraud_detection.utils.split_utils import HashSplitter
+from insurance_fraud_detection.utils.stage_cache import StageCache
 
 
 
 class DataIngestion:
     
-    logging.info("Data Ingestion started")
     def __init__(self,data_ingestion_config:DataIngestionConfig=DataIngestionConfig()):
         """
         :param data_ingestion_config: configuration for data ingestion
         """
         try:
+            logging.info("Data Ingestion started")
             logging.info(f"Data Ingestion Config: {data_ingestion_config}")
             self.data_ingestion_config = data_ingestion_config
         except Exception as e:
             raise CustomException(e,sys)
+
+    def get_feature_store(self, file_path: str) -> FeatureStore:
+        """
+        Returns a FeatureStore for file_path in the configured format
+        """
+        return FeatureStore(file_path=file_path,
+                            file_format=self.data_ingestion_config.feature_store_format,
+                            compression=self.data_ingestion_config.feature_store_compression)
         
+    def split_settings(self) -> dict:
+        """
+        The settings that decide the train/test assignment, stored with the split state
+        """
+        config = self.data_ingestion_config
+        return {
+            "strategy": config.split_strategy,
+            "ratio": config.train_test_split_ratio,
+            "key_column": config.split_key_column,
+            "stratify_column": config.split_stratify_column,
+            "salt": config.split_salt,
+        }
+
+    def get_splitter(self, thresholds: Optional[dict] = None) -> Optional[HashSplitter]:
+        """
+        Returns the HashSplitter for the "hash" split strategy, or None for the "random" strategy.
+        thresholds are the per-stratum thresholds of a fitted splitter, e.g. from the ingestion state.
+        """
+        config = self.data_ingestion_config
+        if config.split_strategy == "random":
+            return None
+        if config.split_strategy != "hash":
+            raise ValueError(f"Unknown split strategy: {config.split_strategy}")
+        return HashSplitter(test_ratio=config.train_test_split_ratio,
+                            key_column=config.split_key_column,
+                            stratify_column=config.split_stratify_column or None,
+                            salt=config.split_salt,
+                            thresholds=thresholds)
+
+    def fit_splitter(self, splitter: Optional[HashSplitter],
+                     dataframe: Optional[DataFrame] = None) -> Optional[HashSplitter]:
+        """
+        Method Name :   fit_splitter
+        Description :   This method fits the per-stratum thresholds of a stratified splitter on dataframe,
+                        or, when the table is streamed, on the key and stratify columns of the whole
+                        source table (see iter_split_key_chunks), read before the rows themselves.
+        """
+        try:
+            if splitter is None or not splitter.needs_fit:
+                return splitter
+            if dataframe is None:
+                splitter.fit_chunks(self.iter_split_key_chunks(splitter))
+            else:
+                splitter.fit(dataframe)
+            logging.info(f"Fitted split thresholds per '{splitter.stratify_column}' stratum: {splitter.thresholds}")
+            return splitter
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_stage_fingerprint(self) -> str:
+        """
+        Method Name :   get_stage_fingerprint
+        Description :   This method fingerprints the ingestion stage from its config, the signature of
+                        the source table, schema.yaml (it types the feature store) and the code of the
+                        ingestion modules
+        """
+        try:
+            table_signature = InsuranceData().get_table_signature(
+                table_name=self.data_ingestion_config.table_name,
+                key_column=self.data_ingestion_config.watermark_column)
+            inputs = {"source": table_signature, "schema": compute_file_hash(SCHEMA_FILE_PATH)}
+            code_modules = [sys.modules[module_name] for module_name in
+                            (__name__, InsuranceData.__module__, FeatureStore.__module__)]
+            return StageCache.fingerprint(self.data_ingestion_config, inputs, code_modules)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @instrumented_step()
     def export_data_into_feature_store(self)->DataFrame:
         """
         Method Name :   export_data_into_feature_store
-        Description :   This method exports data from MySQL to csv file
+        Description :   This method exports data from MySQL to the feature store
         
         Output      :   data is returned as artifact of data ingestion components
         On Failure  :   Write an exception log and then raise an exception
@@ -39,29 +123,252 @@ class DataIngestion:
             dataframe = usvisa_data.export_collection_as_dataframe(table_name=
                                                                    self.data_ingestion_config.table_name)
             logging.info(f"Shape of dataframe: {dataframe.shape}")
+            add_rows(rows_out=len(dataframe))
             feature_store_file_path  = self.data_ingestion_config.feature_store_file_path
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path,exist_ok=True)
             logging.info(f"Saving exported data into feature store file path: {feature_store_file_path}")
-            dataframe.to_csv(feature_store_file_path,index=False,header=True)
+            self.get_feature_store(feature_store_file_path).write(dataframe)
             return dataframe
 
         except Exception as e:
             raise CustomException(e,sys)
+
+    def iter_source_chunks(self, incremental: bool = False, watermark_value: Optional[Any] = None) -> Iterator[DataFrame]:
+        """
+        Method Name :   iter_source_chunks
+        Description :   This method yields the source table as cleaned DataFrame chunks, either streamed
+                        through a server-side cursor ("stream") or read as key-range partitions in
+                        parallel ("partitioned"). With incremental=True only rows past watermark_value
+                        are read.
+        """
+        config = self.data_ingestion_config
+        insurance_data = InsuranceData()
+        if config.extraction_mode == "partitioned":
+            reports = []
+            partitions = insurance_data.export_collection_as_partitions(
+                table_name=config.table_name,
+                key_column=config.watermark_column if incremental else config.partition_column,
+                n_partitions=config.extraction_partitions,
+                max_workers=config.extraction_workers,
+                lower_bound=watermark_value if incremental else None,
+                use_processes=config.extraction_executor == "process",
+                # an incremental run commits its watermark after every partition, so they must come in key order
+                ordered=incremental)
+            for report, chunk in partitions:
+                reports.append(report)
+                yield chunk
+            write_yaml_file(file_path=config.extraction_report_file_path,
+                            content={"partitions": sorted(reports, key=lambda report: report["partition"])})
+        else:
+            yield from insurance_data.export_collection_as_dataframe_chunks(
+                table_name=config.table_name,
+                chunk_size=config.chunk_size,
+                watermark_column=config.watermark_column if incremental else None,
+                watermark_value=watermark_value if incremental else None)
+
+    def iter_split_key_chunks(self, splitter: HashSplitter) -> Iterator[DataFrame]:
+        """
+        Method Name :   iter_split_key_chunks
+        Description :   This method yields the split key and stratify columns of the whole source table,
+                        which a stratified splitter is fitted on, here in one query of only those columns.
+        """
+        config = self.data_ingestion_config
+        yield InsuranceData().export_columns_as_dataframe(
+            table_name=config.table_name, columns=[splitter.key_column, splitter.stratify_column])
+
+    @instrumented_step()
+    def stream_data_into_feature_store(self, splitter: Optional[HashSplitter] = None) -> Tuple[int, Any]:
+        """
+        Method Name :   stream_data_into_feature_store
+        Description :   This method reads data from MySQL in chunks or partitions and appends each cleaned
+                        chunk to the feature store as it arrives, so peak memory is bounded by the chunk size.
+                        When a splitter is given every chunk is also split into the train and test files.
         
-    
-    def split_data_as_train_test(self,dataframe: DataFrame) ->None:
+        Output      :   number of rows written to the feature store and the largest watermark value
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            logging.info(f"Streaming data from MySQL into feature store file path: {config.feature_store_file_path}")
+            feature_store = self.get_feature_store(config.feature_store_file_path)
+            feature_store.clear()
+            if splitter is not None:
+                for path in (config.training_file_path, config.testing_file_path):
+                    self.get_feature_store(path).clear()
+
+            n_rows = 0
+            watermark_value = None
+            for chunk in self.iter_source_chunks():
+                feature_store.append(chunk)
+                if splitter is not None:
+                    self.split_data_as_train_test(chunk, append=True, splitter=splitter)
+                if config.watermark_column in chunk.columns:
+                    watermark_value = _max_value(chunk[config.watermark_column], watermark_value)
+                n_rows += len(chunk)
+
+            logging.info(f"Number of rows streamed into feature store: {n_rows}")
+            add_rows(rows_out=n_rows)
+            return n_rows, watermark_value
+
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def read_ingestion_state(self) -> dict:
+        """
+        Method Name :   read_ingestion_state
+        Description :   This method reads the high-water mark left by the previous ingestion run.
+                        An empty dict is returned when there is no usable state.
+        """
+        try:
+            state_file_path = self.data_ingestion_config.ingestion_state_file_path
+            if not os.path.exists(state_file_path):
+                return {}
+            state = read_yaml_file(file_path=state_file_path) or {}
+            if (state.get("table_name") != self.data_ingestion_config.table_name or
+                    state.get("watermark_column") != self.data_ingestion_config.watermark_column):
+                logging.info(f"Ingestion state {state} does not match the current config, ignoring it")
+                return {}
+            return state
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def ingestion_stores(self) -> dict:
+        """
+        The feature store, train and test stores an ingestion run appends to, by name
+        """
+        config = self.data_ingestion_config
+        return {"feature_store": self.get_feature_store(config.feature_store_file_path),
+                "train": self.get_feature_store(config.training_file_path),
+                "test": self.get_feature_store(config.testing_file_path)}
+
+    def write_ingestion_state(self, watermark_value: Any, n_new_rows: int, total_rows: int,
+                              splitter: Optional[HashSplitter] = None) -> None:
+        """
+        Method Name :   write_ingestion_state
+        Description :   This method records the high-water mark reached by this ingestion run, the settings
+                        and per-stratum thresholds of the split, the hash of schema.yaml and the size of
+                        the stores that hold the rows up to that mark, so the next incremental run
+                        continues from them. The file is replaced atomically: it is
+                        the commit point of the rows appended before it.
+        """
+        try:
+            state = {
+                "table_name": self.data_ingestion_config.table_name,
+                "watermark_column": self.data_ingestion_config.watermark_column,
+                "watermark_value": _to_builtin(watermark_value),
+                "last_run_rows": int(n_new_rows),
+                "total_rows": int(total_rows),
+                "last_run_at": datetime.now().isoformat(timespec="seconds"),
+                "schema_hash": compute_file_hash(SCHEMA_FILE_PATH),
+            }
+            if splitter is not None:
+                state["split"] = {"settings": self.split_settings(), "thresholds": splitter.thresholds}
+            state["stores"] = {name: store.marker() for name, store in self.ingestion_stores().items()}
+            state_file_path = self.data_ingestion_config.ingestion_state_file_path
+            write_yaml_file(file_path=state_file_path + ".tmp", content=state)
+            os.replace(state_file_path + ".tmp", state_file_path)
+            logging.info(f"Ingestion state saved: {state}")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @instrumented_step()
+    def ingest_incremental(self) -> int:
+        """
+        Method Name :   ingest_incremental
+        Description :   This method fetches only the rows past the stored high-water mark, appends them
+                        to the feature store as new partitions and adds their split to the train and
+                        test files. Without a previous state the whole table is loaded once.
+                        The state is saved after every chunk, and rows a failed run appended after its
+                        last saved state are rolled back first, so a rerun never ingests a row twice.
+                        The watermark column must grow with insertion order (see DATA_INGESTION_WATERMARK_COLUMN).
+        
+        Output      :   number of new rows ingested
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            stores = self.ingestion_stores()
+            state = self.read_ingestion_state()
+            for name, marker in state.get("stores", {}).items():
+                stores[name].rollback(marker)
+            stores_ready = all(store.exists() for store in stores.values())
+            split_state = state.get("split", {})
+            splitter = self.get_splitter(thresholds=split_state.get("thresholds"))
+            # rows already split under other settings or thresholds would not match the split of the new rows
+            split_changed = splitter is not None and (split_state.get("settings") != self.split_settings()
+                                                      or splitter.needs_fit)
+            # the stores are typed from schema.yaml, new partitions must not be written with other types
+            schema_changed = state.get("schema_hash") != compute_file_hash(SCHEMA_FILE_PATH)
+            if not (state and stores_ready) or split_changed or schema_changed:
+                logging.info("No usable ingestion state found, loading the full table")
+                state = {}
+                # the old state must not outlive the stores it describes if this reload fails
+                if os.path.exists(config.ingestion_state_file_path):
+                    os.remove(config.ingestion_state_file_path)
+                for store in stores.values():
+                    store.clear()
+                # the thresholds are fitted on the whole table being reloaded
+                splitter = self.fit_splitter(self.get_splitter())
+
+            watermark_value = state.get("watermark_value")
+            logging.info(f"Fetching rows with {config.watermark_column} > {watermark_value}")
+            n_new_rows = 0
+            total_rows = state.get("total_rows", 0)
+            for chunk in self.iter_source_chunks(incremental=True, watermark_value=watermark_value):
+                stores["feature_store"].append(chunk)
+                self.split_data_as_train_test(chunk, append=True, splitter=splitter)
+                watermark_value = _max_value(chunk[config.watermark_column], watermark_value)
+                n_new_rows += len(chunk)
+                total_rows += len(chunk)
+                # commit the chunk: a failure before this point rolls its rows back on the next run
+                self.write_ingestion_state(watermark_value, n_new_rows, total_rows, splitter=splitter)
+
+            add_rows(rows_out=n_new_rows)
+            if n_new_rows == 0:
+                self.write_ingestion_state(watermark_value, n_new_rows, total_rows, splitter=splitter)
+            logging.info(f"Incremental ingestion added {n_new_rows} rows, {total_rows} rows in feature store")
+            return n_new_rows
+
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @instrumented_step()
+    def split_data_as_train_test(self,dataframe: DataFrame, append: bool = False,
+                                 splitter: Optional[HashSplitter] = None) ->None:
         """
         Method Name :   split_data_as_train_test
-        Description :   This method splits the dataframe into train set and test set based on split ratio 
+        Description :   This method splits the dataframe into train set and test set based on split ratio.
+                        With the "hash" strategy rows are assigned by a hash of the split key against
+                        per-stratum thresholds fitted once (see fit_splitter), so chunks of a stream can be
+                        split one by one, with "random" by a seeded train_test_split. Both stratify on the
+                        configured column. With append=True the sets are added to the
+                        existing train and test files.
         
         Output      :   Folder is created in ingested directory and train and test files are exported
         On Failure  :   Write an exception log and then raise an exception
         """
-        logging.info("Entered split_data_as_train_test method of Data_Ingestion class")
+        logging.debug("Entered split_data_as_train_test method of Data_Ingestion class")
 
         try:
-            train_set, test_set = train_test_split(dataframe, test_size=self.data_ingestion_config.train_test_split_ratio)
+            config = self.data_ingestion_config
+            if splitter is None:
+                splitter = self.fit_splitter(self.get_splitter(), dataframe)
+            if splitter is not None:
+                train_set, test_set = splitter.split(dataframe)
+            elif len(dataframe) < 2:
+                # too few rows to split, e.g. a single new row in an incremental run
+                train_set, test_set = dataframe, dataframe.iloc[0:0]
+            else:
+                # the default hash split does not need scikit-learn, only the "random" strategy does
+                from sklearn.model_selection import train_test_split
+
+                stratify = None
+                if config.split_stratify_column and config.split_stratify_column in dataframe.columns:
+                    classes = dataframe[config.split_stratify_column]
+                    # train_test_split cannot stratify classes with a single member
+                    if classes.notna().all() and classes.value_counts().min() >= 2:
+                        stratify = classes
+                train_set, test_set = train_test_split(dataframe, test_size=config.train_test_split_ratio,
+                                                       random_state=config.random_state, stratify=stratify)
             logging.info("Performed train test split on the dataframe")
             
             
@@ -69,10 +376,17 @@ class DataIngestion:
             os.makedirs(dir_path,exist_ok=True)
 
             logging.info(f"Exporting train and test file path.")
-            train_set.to_csv(self.data_ingestion_config.training_file_path,index=False,header=True)
-            test_set.to_csv(self.data_ingestion_config.testing_file_path,index=False,header=True)
+            train_store = self.get_feature_store(self.data_ingestion_config.training_file_path)
+            test_store = self.get_feature_store(self.data_ingestion_config.testing_file_path)
+            if append:
+                train_store.append(train_set)
+                test_store.append(test_set)
+            else:
+                train_store.write(train_set)
+                test_store.write(test_set)
 
             logging.info(f"Exported train and test file path.")
+            add_rows(rows_in=len(dataframe), rows_out=len(train_set) + len(test_set))
             logging.info(f"Shape of train set: {train_set.shape}, Shape of test set: {test_set.shape}") 
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -86,19 +400,53 @@ class DataIngestion:
         Output      :   train set and test set are returned as the artifacts of data ingestion components
         On Failure  :   Write an exception log and then raise an exception
         """
-        logging.info("Entered initiate_data_ingestion method of Data_Ingestion class")
+        logging.debug("Entered initiate_data_ingestion method of Data_Ingestion class")
 
         try:
-            dataframe = self.export_data_into_feature_store()
+            if self.data_ingestion_config.ingestion_mode == "incremental":
+                self.ingest_incremental()
+                if not self.get_feature_store(self.data_ingestion_config.training_file_path).exists():
+                    raise CustomException("Dataframe is empty. No data to process.", sys)
+                return DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path,
+                                             test_file_path=self.data_ingestion_config.testing_file_path)
+            if self.data_ingestion_config.ingestion_mode != "full":
+                raise ValueError(f"Unknown ingestion mode: {self.data_ingestion_config.ingestion_mode}")
+
+            if self.data_ingestion_config.extraction_mode in ("stream", "partitioned"):
+                splitter = self.fit_splitter(self.get_splitter())
+                if splitter is None:
+                    # train_test_split needs the whole table in memory, which streaming is meant to avoid
+                    raise ValueError(f"The '{self.data_ingestion_config.split_strategy}' split strategy cannot "
+                                     f"be streamed, use split_strategy='hash' with extraction mode "
+                                     f"'{self.data_ingestion_config.extraction_mode}' or extraction mode 'batch'")
+                # chunks are split while streaming, the table never has to be held in memory
+                n_rows, watermark_value = self.stream_data_into_feature_store(splitter=splitter)
+                if n_rows == 0:
+                    raise CustomException("Dataframe is empty. No data to process.", sys)
+                self.write_ingestion_state(watermark_value, n_new_rows=n_rows, total_rows=n_rows,
+                                           splitter=splitter)
+                return DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path,
+                                             test_file_path=self.data_ingestion_config.testing_file_path)
+            elif self.data_ingestion_config.extraction_mode == "batch":
+                dataframe = self.export_data_into_feature_store()
+            else:
+                raise ValueError(f"Unknown extraction mode: {self.data_ingestion_config.extraction_mode}")
 
             logging.info("Got the data from MySQL and exported it into feature store")
             if dataframe.empty:
                 raise CustomException("Dataframe is empty. No data to process.", sys)
 
-            self.split_data_as_train_test(dataframe)
+            splitter = self.fit_splitter(self.get_splitter(), dataframe)
+            self.split_data_as_train_test(dataframe, splitter=splitter)
 
             logging.info("Performed train test split on the dataset")
 
+            # a full refresh also resets the high-water mark for later incremental runs
+            if self.data_ingestion_config.watermark_column in dataframe.columns:
+                self.write_ingestion_state(
+                    _max_value(dataframe[self.data_ingestion_config.watermark_column], None),
+                    n_new_rows=len(dataframe), total_rows=len(dataframe), splitter=splitter)
+
             
             data_ingestion_artifact = DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path,
                                                             test_file_path=self.data_ingestion_config.testing_file_path)
@@ -109,6 +457,29 @@ class DataIngestion:
         except Exception as e:
             raise CustomException(e, sys) from e
         
+def _max_value(column: pd.Series, current: Optional[Any]) -> Optional[Any]:
+    """
+    Largest non-null value of column, or current if that is larger
+    """
+    column_max = column.max()
+    if pd.isna(column_max):
+        return current
+    if current is None:
+        return column_max
+    return max(current, column_max)
+
+
+def _to_builtin(value: Any) -> Any:
+    """
+    Convert numpy / pandas scalars to plain python values so they can be written to yaml
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
 # if __name__ == "__main__":
 #     data_ingestion = DataIngestion()
 #     data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
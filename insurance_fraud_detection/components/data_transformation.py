@@ -0,0 +1,190 @@
+import sys
+from functools import partial
+
+import numpy as np
+from pandas import DataFrame
+
+from insurance_fraud_detection.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from insurance_fraud_detection.data_access.feature_store import FeatureStore
+from insurance_fraud_detection.entity.artifact_entity import (DataIngestionArtifact, DataTransformationArtifact,
+                                                              DataValidationArtifact)
+from insurance_fraud_detection.entity.config_entity import DataTransformationConfig
+from insurance_fraud_detection.entity.estimator import SchemaPreprocessor
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.dag_executor import DagExecutor, DagNode
+from insurance_fraud_detection.utils.main_utils import (NumpyArrayWriter, compute_file_hash, read_yaml_file,
+                                                        save_model_artifact)
+from insurance_fraud_detection.utils.run_metrics import add_rows, instrumented_step, step
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+
+# label of the positive (fraud) class in the target column
+POSITIVE_LABEL = "Y"
+
+
+class DataTransformation:
+    def __init__(self, data_ingestion_artifact: DataIngestionArtifact,
+                 data_transformation_config: DataTransformationConfig,
+                 data_validation_artifact: DataValidationArtifact):
+        """
+        :param data_ingestion_artifact: Output reference of data ingestion artifact stage
+        :param data_transformation_config: configuration for data transformation
+        :param data_validation_artifact: Output reference of data validation artifact stage
+        """
+        try:
+            self.data_ingestion_artifact = data_ingestion_artifact
+            self.data_transformation_config = data_transformation_config
+            self.data_validation_artifact = data_validation_artifact
+            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_stage_fingerprint(self) -> str:
+        """
+        Fingerprint of the transformation stage: its config, the train and test data, schema.yaml
+        and the code of the transformation modules.
+        """
+        try:
+            inputs = {
+                "train": compute_file_hash(self.data_ingestion_artifact.trained_file_path),
+                "test": compute_file_hash(self.data_ingestion_artifact.test_file_path),
+                "schema": compute_file_hash(SCHEMA_FILE_PATH),
+            }
+            code_modules = [sys.modules[module_name] for module_name in
+                            (__name__, SchemaPreprocessor.__module__, FeatureStore.__module__)]
+            return StageCache.fingerprint(self.data_transformation_config, inputs, code_modules)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_data_transformer_object(self) -> SchemaPreprocessor:
+        """
+        Method Name :   get_data_transformer_object
+        Description :   This method creates the preprocessor described by schema.yaml
+
+        Output      :   unfitted SchemaPreprocessor
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.debug("Entered get_data_transformer_object method of DataTransformation class")
+        try:
+            preprocessor = SchemaPreprocessor(schema_config=self._schema_config,
+                                              n_year_bins=self.data_transformation_config.n_year_bins,
+                                              random_state=self.data_transformation_config.random_state)
+            logging.info(f"Preprocessor input columns: {preprocessor.input_columns}")
+            return preprocessor
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def encode_target(dataframe: DataFrame) -> np.ndarray:
+        """
+        fraud_reported as float32 1 (fraud) / 0
+        """
+        return (dataframe[TARGET_COLUMN].astype(str).str.upper() == POSITIVE_LABEL).to_numpy(dtype=np.float32)
+
+    @instrumented_step()
+    def transform_to_file(self, preprocessor: SchemaPreprocessor, feature_store: FeatureStore,
+                          file_path: str) -> int:
+        """
+        Method Name :   transform_to_file
+        Description :   This method transforms the data of feature_store chunk by chunk and appends every
+                        chunk straight to a float32 .npy file, with the encoded target as the last column.
+                        Only one chunk is densified at a time; the sidecar metadata records the column names.
+                        The file stays dense so the trainer and its search workers can memory-map it, and
+                        the models are fitted on dense arrays anyway.
+
+        Output      :   number of rows written
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            columns = preprocessor.input_columns + [TARGET_COLUMN]
+            output_columns = preprocessor.get_feature_names_out() + [TARGET_COLUMN]
+            with NumpyArrayWriter(file_path, n_columns=len(output_columns), dtype=np.float32,
+                                  columns=output_columns) as writer:
+                for chunk in feature_store.iter_batches(batch_size=self.data_transformation_config.chunk_size,
+                                                        columns=columns):
+                    block = np.empty((len(chunk), len(output_columns)), dtype=np.float32)
+                    block[:, :-1] = preprocessor.transform(chunk).toarray()
+                    block[:, -1] = self.encode_target(chunk)
+                    writer.append(block)
+            logging.info(f"Wrote {writer.n_rows} transformed rows to {file_path}")
+            add_rows(rows_in=writer.n_rows, rows_out=writer.n_rows)
+            return writer.n_rows
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @instrumented_step()
+    def verify_compiled_preprocessor(self, preprocessor: SchemaPreprocessor, feature_store: FeatureStore) -> int:
+        """
+        Method Name :   verify_compiled_preprocessor
+        Description :   This method checks that the compiled single-record path of the fitted preprocessor
+                        (used by the prediction service) gives the same features as transform on the first
+                        compiled_check_rows rows of feature_store
+
+        Output      :   number of rows checked
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            n_rows = self.data_transformation_config.compiled_check_rows
+            if n_rows <= 0:
+                return 0
+            sample = next(iter(feature_store.iter_batches(batch_size=n_rows, columns=preprocessor.input_columns)),
+                          None)
+            if sample is None:
+                return 0
+            n_checked = preprocessor.compile().verify(preprocessor, sample.reset_index(drop=True))
+            logging.info(f"Compiled preprocessor matches transform on {n_checked} rows")
+            return n_checked
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def initiate_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Method Name :   initiate_data_transformation
+        Description :   This method initiates the data transformation component for the pipeline
+
+        Output      :   data transformer object and transformed train and test arrays are saved
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.debug("Entered initiate_data_transformation method of DataTransformation class")
+        try:
+            if not self.data_validation_artifact.validation_status:
+                raise Exception(self.data_validation_artifact.message)
+
+            config = self.data_transformation_config
+            train_store = FeatureStore(file_path=self.data_ingestion_artifact.trained_file_path)
+            test_store = FeatureStore(file_path=self.data_ingestion_artifact.test_file_path)
+
+            preprocessor = self.get_data_transformer_object()
+            logging.info("Fitting the preprocessor on the train set in chunks")
+            with step("fit_preprocessor"):
+                preprocessor.fit_chunks(lambda: train_store.iter_batches(batch_size=config.chunk_size,
+                                                                         columns=preprocessor.input_columns))
+
+            # the fitted preprocessor is only read from here on (imputation is seeded from each row),
+            # so the train and test sets, the compiled check and the saved object are done concurrently
+            logging.info("Transforming the train and test sets")
+            DagExecutor([
+                DagNode("transform_train", partial(self.transform_to_file, preprocessor, train_store,
+                                                   config.transformed_train_file_path)),
+                DagNode("transform_test", partial(self.transform_to_file, preprocessor, test_store,
+                                                  config.transformed_test_file_path)),
+                DagNode("verify_compiled_preprocessor", partial(self.verify_compiled_preprocessor,
+                                                                preprocessor, test_store)),
+                DagNode("save_preprocessor", partial(save_model_artifact, config.transformed_object_file_path,
+                                                     preprocessor, compress=config.artifact_compression,
+                                                     file_format=config.artifact_format,
+                                                     metadata={"feature_names":
+                                                               preprocessor.get_feature_names_out()})),
+            ], max_workers=config.task_workers, name="data_transformation").run()
+            logging.info("Saved the preprocessor object")
+
+            data_transformation_artifact = DataTransformationArtifact(
+                transformed_object_file_path=config.transformed_object_file_path,
+                transformed_train_file_path=config.transformed_train_file_path,
+                transformed_test_file_path=config.transformed_test_file_path
+            )
+            logging.info(f"Data transformation artifact: {data_transformation_artifact}")
+            return data_transformation_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
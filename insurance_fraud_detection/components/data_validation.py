@@ -1,19 +1,23 @@
 import json
 import os
 import sys
-import pandas as pd
+from functools import partial
 
-from evidently.report import Report
-from evidently.metric_preset import DataDriftPreset
-#from evidently.presets import DataDriftPreset
+import pandas as pd
 
-# from evidently.model_profile import Profile
-# from evidently.model_profile.sections import DataDriftProfileSection
+# evidently (with plotly, scipy.stats and nltk) takes seconds to import: it is imported by the evidently
+# drift engine when it runs, see detect_dataset_drift
 from pandas import DataFrame
 
+from insurance_fraud_detection.data_access.feature_store import FeatureStore
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.logger import logging
-from insurance_fraud_detection.utils.main_utils import read_yaml_file, write_yaml_file
+from insurance_fraud_detection.utils.dag_executor import CAN_FORK, DagExecutor, DagNode
+from insurance_fraud_detection.utils.main_utils import read_yaml_file, write_yaml_file, compute_file_hash
+from insurance_fraud_detection.utils.drift_utils import NativeDriftDetector, ReferenceProfile
+from insurance_fraud_detection.utils.validation_utils import SchemaValidator
+from insurance_fraud_detection.utils.run_metrics import add_rows, instrumented_step
+from insurance_fraud_detection.utils.stage_cache import StageCache
 from insurance_fraud_detection.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from insurance_fraud_detection.entity.config_entity import DataValidationConfig
 from insurance_fraud_detection.constants import SCHEMA_FILE_PATH
@@ -29,49 +33,74 @@ class DataValidation:
         except Exception as e:
             raise CustomException(e, sys)
 
-    def validate_number_of_columns(self, dataframe: DataFrame) -> bool:
+    def get_stage_fingerprint(self) -> str:
+        """
+        Fingerprint of the validation stage: its config, the content of the train and test data
+        and of schema.yaml, and the code of the validation modules.
+        """
         try:
-            logging.info("Validating number of columns in the dataframe")
-            
-            logging.info(f"Expected number of columns: {len(self._schema_config['columns'])}")
-            logging.info(f"Actual number of columns: {len(dataframe.columns)}")
-            
-            status = len(dataframe.columns) == len(self._schema_config["columns"])
-            logging.info(f"Is required column present: [{status}]")
-            return status
-        
+            inputs = {
+                "train": compute_file_hash(self.data_ingestion_artifact.trained_file_path),
+                "test": compute_file_hash(self.data_ingestion_artifact.test_file_path),
+                "schema": compute_file_hash(SCHEMA_FILE_PATH),
+            }
+            code_modules = [sys.modules[module_name] for module_name in
+                            (__name__, NativeDriftDetector.__module__, SchemaValidator.__module__,
+                             FeatureStore.__module__)]
+            return StageCache.fingerprint(self.data_validation_config, inputs, code_modules)
         except Exception as e:
             raise CustomException(e, sys)
 
-    def is_column_exist(self, df: DataFrame) -> bool:
+    @staticmethod
+    def schema_report_message(report: dict, dataset_name: str) -> str:
+        """
+        Summarise the failures of a SchemaValidator report for the validation message.
+        """
+        if report["validation_status"]:
+            return ""
+        message = ""
+        if report["missing_columns"]:
+            message += f"Missing columns in {dataset_name} dataset: {report['missing_columns']}. "
+        if report["unexpected_columns"]:
+            message += f"Unexpected columns in {dataset_name} dataset: {report['unexpected_columns']}. "
+        failed_columns = [column for column in report["failed_columns"] if column not in report["missing_columns"]]
+        if failed_columns:
+            message += f"Data quality checks failed in {dataset_name} dataset for columns: {failed_columns}. "
+        return message
+
+    @staticmethod
+    @instrumented_step()
+    def read_data(file_path, columns=None) -> DataFrame:
         try:
-            dataframe_columns = df.columns
-            missing_numerical_columns = []
-            missing_categorical_columns = []
-            for column in self._schema_config["numerical_columns"]:
-                if column not in dataframe_columns:
-                    missing_numerical_columns.append(column)
-            if missing_numerical_columns:
-                logging.info(f"Missing numerical column(s): {missing_numerical_columns}")
-
-            for column in self._schema_config["categorical_columns"]:
-                if column not in dataframe_columns:
-                    missing_categorical_columns.append(column)
-            if missing_categorical_columns:
-                logging.info(f"Missing categorical column(s): {missing_categorical_columns}")
-
-            return not (missing_categorical_columns or missing_numerical_columns)
+            # typed parquet or csv, picked from the file extension
+            dataframe = FeatureStore(file_path=file_path).read(columns=columns)
+            add_rows(rows_in=len(dataframe))
+            return dataframe
         except Exception as e:
             raise CustomException(e, sys)
-
-    @staticmethod
-    def read_data(file_path) -> DataFrame:
+    @instrumented_step()
+    def validate_schema(self, dataframe: DataFrame) -> dict:
+        """
+        SchemaValidator report of dataframe.
+        """
         try:
-            return pd.read_csv(file_path)
+            report = SchemaValidator(self._schema_config).validate(dataframe)
+            add_rows(rows_in=len(dataframe))
+            return report
         except Exception as e:
             raise CustomException(e, sys)
+
+    @instrumented_step()
     def detect_dataset_drift(self, reference_df, current_df):
         try:
+            if self.data_validation_config.drift_engine == "native":
+                return self.detect_dataset_drift_native(reference_df, current_df)
+            if self.data_validation_config.drift_engine != "evidently":
+                raise ValueError(f"Unknown drift engine: {self.data_validation_config.drift_engine}")
+
+            from evidently.metric_preset import DataDriftPreset
+            from evidently.report import Report
+
             logging.info("Detecting dataset drift")
             drift_report = Report(metrics=[DataDriftPreset()])
             drift_report.run(reference_data=reference_df, current_data=current_df)
@@ -80,17 +109,22 @@ class DataValidation:
             report_dir = os.path.dirname(self.data_validation_config.drift_report_file_path)
             os.makedirs(report_dir, exist_ok=True)
             
-            # Save the drift report as a YAML file
-            # Save HTML report (optional)
+            def save_yaml_report() -> dict:
+                report_dict = drift_report.as_dict()
+                write_yaml_file(
+                    file_path=self.data_validation_config.drift_report_file_path,
+                    content=report_dict
+                )
+                return report_dict
+
+            # The HTML report (optional) is rendered in a forked child while the YAML report is written;
+            # without fork both render the same Report object, so they run one after the other
             html_path = self.data_validation_config.drift_report_file_path.replace('.yaml', '.html')
-            drift_report.save_html(html_path)
-            
-            # Save YAML report
-            report_dict = drift_report.as_dict()
-            write_yaml_file(
-                file_path=self.data_validation_config.drift_report_file_path,
-                content=report_dict
-            )
+            reports = DagExecutor([
+                DagNode("html_report", partial(drift_report.save_html, html_path), use_process=CAN_FORK),
+                DagNode("yaml_report", save_yaml_report),
+            ], max_workers=2 if CAN_FORK else 1, name="drift_report").run()
+            report_dict = reports["yaml_report"]
             
             # Extract drift metrics correctly
             drift_metrics = report_dict['metrics'][0]['result']
@@ -103,26 +137,97 @@ class DataValidation:
         except Exception as e:
             raise CustomException(e, sys)
 
+    def get_reference_profile(self, reference_df=None) -> ReferenceProfile:
+        """
+        Load the cached profile of the training data, or build and cache it when the training data,
+        schema.yaml or the profile parameters changed since the cached one was built.
+        """
+        try:
+            config = self.data_validation_config
+            profile_file_path = config.reference_profile_file_path
+            content_hash = ReferenceProfile.cache_key(
+                data_hash=compute_file_hash(self.data_ingestion_artifact.trained_file_path),
+                schema_hash=compute_file_hash(SCHEMA_FILE_PATH),
+                n_quantiles=config.profile_quantiles,
+                n_bins=config.profile_bins)
+            if os.path.exists(profile_file_path):
+                reference_profile = ReferenceProfile.load(profile_file_path)
+                if reference_profile.content_hash == content_hash:
+                    logging.info(f"Using cached reference profile: {profile_file_path}")
+                    return reference_profile
+                logging.info("Reference data, schema or profile parameters changed, rebuilding the reference profile")
 
-    def initiate_data_validation(self) -> DataValidationArtifact:
+            if reference_df is None:
+                reference_df = self.read_data(file_path=self.data_ingestion_artifact.trained_file_path)
+            reference_profile = ReferenceProfile.build(
+                reference_df,
+                numerical_columns=self._schema_config["numerical_columns"],
+                categorical_columns=self._schema_config["categorical_columns"],
+                content_hash=content_hash,
+                n_quantiles=config.profile_quantiles,
+                n_bins=config.profile_bins,
+                max_workers=config.drift_workers,
+            )
+            reference_profile.save(profile_file_path)
+            logging.info(f"Reference profile saved: {profile_file_path}")
+            return reference_profile
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def detect_dataset_drift_native(self, reference_df, current_df):
+        """
+        Detect dataset drift with the built-in NumPy engine over the schema columns.
+        The YAML report keeps the layout of the evidently report (metrics[0].result).
+        """
         try:
-            validation_error_msg = ""
-            logging.info("Starting data validation")
+            logging.info("Detecting dataset drift with the native engine")
+            config = self.data_validation_config
+            detector = NativeDriftDetector(
+                numerical_columns=self._schema_config["numerical_columns"],
+                categorical_columns=self._schema_config["categorical_columns"],
+                numerical_stattest=config.numerical_stattest,
+                categorical_stattest=config.categorical_stattest,
+                thresholds=config.drift_thresholds,
+                drift_share=config.drift_share,
+                max_workers=config.drift_workers,
+            )
+            if config.use_reference_profile:
+                drift_metrics = detector.run_against_profile(self.get_reference_profile(reference_df), current_df)
+            else:
+                drift_metrics = detector.run(reference_df, current_df)
 
-            train_df = self.read_data(file_path=self.data_ingestion_artifact.trained_file_path)
-            test_df = self.read_data(file_path=self.data_ingestion_artifact.test_file_path)
+            write_yaml_file(
+                file_path=config.drift_report_file_path,
+                content={"metrics": [{"metric": "NativeDataDrift", "result": drift_metrics}]}
+            )
+
+            n_features = drift_metrics['number_of_columns']
+            n_drifted_features = drift_metrics['number_of_drifted_columns']
+            logging.info(f"{n_drifted_features}/{n_features} features drifted.")
+            return drift_metrics['dataset_drift']
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            if not self.validate_number_of_columns(train_df):
-                validation_error_msg += "Missing columns in training dataset. "
 
-            if not self.validate_number_of_columns(test_df):
-                validation_error_msg += "Missing columns in test dataset. "
+    def initiate_data_validation(self) -> DataValidationArtifact:
+        try:
+            validation_error_msg = ""
+            logging.info("Starting data validation")
 
-            if not self.is_column_exist(train_df):
-                validation_error_msg += "Some expected columns missing in training dataset. "
+            # train and test are read and checked independently of each other
+            tasks = DagExecutor([
+                DagNode("train_df", partial(self.read_data, file_path=self.data_ingestion_artifact.trained_file_path)),
+                DagNode("test_df", partial(self.read_data, file_path=self.data_ingestion_artifact.test_file_path)),
+                DagNode("train_report", self.validate_schema, inputs={"dataframe": "train_df"}),
+                DagNode("test_report", self.validate_schema, inputs={"dataframe": "test_df"}),
+            ], max_workers=self.data_validation_config.task_workers, name="data_validation").run()
+            train_df, test_df = tasks["train_df"], tasks["test_df"]
+            train_report, test_report = tasks["train_report"], tasks["test_report"]
+            write_yaml_file(file_path=self.data_validation_config.validation_report_file_path,
+                            content={"train": train_report, "test": test_report})
 
-            if not self.is_column_exist(test_df):
-                validation_error_msg += "Some expected columns missing in test dataset. "
+            validation_error_msg += self.schema_report_message(train_report, "training")
+            validation_error_msg += self.schema_report_message(test_report, "test")
 
             validation_status = len(validation_error_msg.strip()) == 0
 
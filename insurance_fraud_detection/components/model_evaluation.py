@@ -0,0 +1,164 @@
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from insurance_fraud_detection.components.data_transformation import DataTransformation
+from insurance_fraud_detection.constants import TARGET_COLUMN
+from insurance_fraud_detection.data_access.feature_store import FeatureStore
+from insurance_fraud_detection.entity.artifact_entity import (DataIngestionArtifact, ModelEvaluationArtifact,
+                                                              ModelTrainerArtifact)
+from insurance_fraud_detection.entity.config_entity import ModelEvaluationConfig
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.evaluation_utils import (METRIC_NAMES, BootstrapEvaluator, ScoredPredictions)
+from insurance_fraud_detection.utils.main_utils import compute_file_hash, load_model_artifact, write_yaml_file
+from insurance_fraud_detection.utils.model_registry import ModelRegistry
+from insurance_fraud_detection.utils.run_metrics import add_rows, instrumented_step, step
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+
+CANDIDATE = "candidate"
+PRODUCTION = "production"
+
+
+class ModelEvaluation:
+    def __init__(self, model_eval_config: ModelEvaluationConfig, data_ingestion_artifact: DataIngestionArtifact,
+                 model_trainer_artifact: ModelTrainerArtifact):
+        """
+        :param model_eval_config: Configuration for model evaluation
+        :param data_ingestion_artifact: Output reference of data ingestion artifact stage (raw test set)
+        :param model_trainer_artifact: Output reference of model trainer artifact stage (candidate model)
+        """
+        try:
+            if model_eval_config.promotion_metric not in METRIC_NAMES:
+                raise ValueError(f"promotion_metric must be one of {METRIC_NAMES}, "
+                                 f"got {model_eval_config.promotion_metric}")
+            self.model_eval_config = model_eval_config
+            self.data_ingestion_artifact = data_ingestion_artifact
+            self.model_trainer_artifact = model_trainer_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_stage_fingerprint(self) -> str:
+        """
+        Fingerprint of the evaluation stage: its config, the test set, the candidate and production
+        models and the code of the evaluation modules.
+        """
+        try:
+            production_model_file_path = self.get_production_model_file_path()
+            inputs = {
+                "test": compute_file_hash(self.data_ingestion_artifact.test_file_path),
+                "candidate": compute_file_hash(self.model_trainer_artifact.trained_model_file_path),
+                "production": compute_file_hash(production_model_file_path) if production_model_file_path else None,
+            }
+            code_modules = [sys.modules[module_name] for module_name in (__name__, BootstrapEvaluator.__module__)]
+            return StageCache.fingerprint(self.model_eval_config, inputs, code_modules)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_production_model_file_path(self) -> Optional[str]:
+        """
+        Method Name :   get_production_model_file_path
+        Description :   This method returns the model promoted in the model registry, if there is one
+
+        Output      :   path of the production model or None
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            return ModelRegistry(registry_dir=self.model_eval_config.model_registry_dir).current_model_file_path()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @instrumented_step()
+    def score_test_set(self, models: Dict[str, object]) -> Tuple[Dict[str, ScoredPredictions], np.ndarray]:
+        """
+        Method Name :   score_test_set
+        Description :   This method reads the raw test set once, chunk by chunk, and scores every chunk
+                        with all models, so the candidate and production models see exactly the same rows
+
+        Output      :   predictions of every model on the test set and the test targets
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            feature_store = FeatureStore(file_path=self.data_ingestion_artifact.test_file_path)
+            targets: List[np.ndarray] = []
+            labels: Dict[str, List[np.ndarray]] = {name: [] for name in models}
+            scores: Dict[str, List[np.ndarray]] = {name: [] for name in models}
+            for chunk in feature_store.iter_batches(batch_size=self.model_eval_config.chunk_size):
+                targets.append(DataTransformation.encode_target(chunk).astype(np.int64))
+                features = chunk.drop(columns=[TARGET_COLUMN])
+                for name, model in models.items():
+                    chunk_labels, chunk_scores = model.predict_with_proba(features)
+                    labels[name].append(np.asarray(chunk_labels).astype(np.int64))
+                    scores[name].append(chunk_scores)
+            y_true = np.concatenate(targets)
+            add_rows(rows_in=len(y_true))
+            logging.info(f"Scored {len(y_true)} test rows with {list(models)}")
+            return {name: ScoredPredictions(y_true, np.concatenate(labels[name]),
+                                            None if any(s is None for s in scores[name]) else np.concatenate(scores[name]))
+                    for name in models}, y_true
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+        """
+        Method Name :   initiate_model_evaluation
+        Description :   This method compares the candidate with the production model on the test set
+                        with paired bootstrap confidence intervals. The candidate is accepted when there
+                        is no production model, or when the lower confidence bound of its improvement
+                        in the promotion metric is above min_improvement
+
+        Output      :   Returns model evaluation artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.debug("Entered initiate_model_evaluation method of ModelEvaluation class")
+        try:
+            config = self.model_eval_config
+            models = {CANDIDATE: load_model_artifact(self.model_trainer_artifact.trained_model_file_path)}
+            production_model_file_path = self.get_production_model_file_path()
+            if production_model_file_path is not None:
+                models[PRODUCTION] = load_model_artifact(production_model_file_path)
+            else:
+                logging.info("No production model found, the candidate is accepted if it can be evaluated")
+
+            predictions, y_true = self.score_test_set(models)
+            # the production model is the baseline the candidate's differences are computed against
+            ordered = {name: predictions[name] for name in (PRODUCTION, CANDIDATE) if name in predictions}
+            evaluator = BootstrapEvaluator(n_resamples=config.n_resamples, confidence_level=config.confidence_level,
+                                           false_negative_cost=config.false_negative_cost,
+                                           false_positive_cost=config.false_positive_cost,
+                                           n_jobs=config.n_jobs, random_state=config.random_state)
+            with step("bootstrap"):
+                report = evaluator.evaluate(y_true, ordered)
+
+            metric = config.promotion_metric
+            improved_score = None
+            is_model_accepted = True
+            if PRODUCTION in ordered:
+                difference = report["differences"][f"{CANDIDATE}-{PRODUCTION}"][metric]
+                improved_score = difference["value"]
+                lower_bound = difference["ci"][0]
+                is_model_accepted = lower_bound is not None and lower_bound > config.min_improvement
+            report["decision"] = {
+                "promotion_metric": metric,
+                "min_improvement": config.min_improvement,
+                "is_model_accepted": is_model_accepted,
+                "trained_model_file_path": self.model_trainer_artifact.trained_model_file_path,
+                "production_model_file_path": production_model_file_path,
+            }
+            write_yaml_file(file_path=config.evaluation_report_file_path, content=report)
+            logging.info(f"Candidate {metric}: {report['models'][CANDIDATE][metric]}, "
+                         f"improvement over production: {improved_score}, accepted: {is_model_accepted}")
+
+            model_evaluation_artifact = ModelEvaluationArtifact(
+                is_model_accepted=is_model_accepted,
+                improved_score=improved_score,
+                trained_model_file_path=self.model_trainer_artifact.trained_model_file_path,
+                production_model_file_path=production_model_file_path,
+                evaluation_report_file_path=config.evaluation_report_file_path,
+            )
+            logging.info(f"Model evaluation artifact: {model_evaluation_artifact}")
+            return model_evaluation_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,89 @@
+import sys
+
+from insurance_fraud_detection.entity.artifact_entity import (DataTransformationArtifact, ModelEvaluationArtifact,
+                                                              ModelPusherArtifact)
+from insurance_fraud_detection.entity.config_entity import ModelPusherConfig
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import compute_file_hash, read_yaml_file, write_yaml_file
+from insurance_fraud_detection.utils.model_registry import ModelRegistry
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+
+class ModelPusher:
+    def __init__(self, model_pusher_config: ModelPusherConfig, model_evaluation_artifact: ModelEvaluationArtifact,
+                 data_transformation_artifact: DataTransformationArtifact):
+        """
+        :param model_pusher_config: Configuration for model pusher
+        :param model_evaluation_artifact: Output reference of model evaluation artifact stage
+        :param data_transformation_artifact: Output reference of data transformation artifact stage (preprocessor)
+        """
+        try:
+            self.model_pusher_config = model_pusher_config
+            self.model_evaluation_artifact = model_evaluation_artifact
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_registry = ModelRegistry(registry_dir=model_pusher_config.model_registry_dir)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_stage_fingerprint(self) -> str:
+        """
+        Fingerprint of the pusher stage: its config, the evaluation decision, the bundle it would push
+        and the code of the pusher modules.
+        """
+        try:
+            inputs = {
+                "evaluation_report": compute_file_hash(self.model_evaluation_artifact.evaluation_report_file_path),
+                "model": compute_file_hash(self.model_evaluation_artifact.trained_model_file_path),
+                "preprocessor": compute_file_hash(self.data_transformation_artifact.transformed_object_file_path),
+            }
+            code_modules = [sys.modules[module_name] for module_name in (__name__, ModelRegistry.__module__)]
+            return StageCache.fingerprint(self.model_pusher_config, inputs, code_modules)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def initiate_model_pusher(self) -> ModelPusherArtifact:
+        """
+        Method Name :   initiate_model_pusher
+        Description :   This method registers the accepted model and its preprocessor as a bundle of the model
+                        registry and promotes it to production. Serving processes watching the registry pick
+                        the new bundle up without a restart
+
+        Output      :   Returns model pusher artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.debug("Entered initiate_model_pusher method of ModelPusher class")
+        try:
+            config = self.model_pusher_config
+            model_version = model_file_path = None
+            previous_version = self.model_registry.current_version()
+            if self.model_evaluation_artifact.is_model_accepted:
+                evaluation_report = read_yaml_file(self.model_evaluation_artifact.evaluation_report_file_path)
+                model_version = self.model_registry.register(
+                    model_file_path=self.model_evaluation_artifact.trained_model_file_path,
+                    preprocessor_file_path=self.data_transformation_artifact.transformed_object_file_path,
+                    metadata={"decision": evaluation_report.get("decision"),
+                              "improved_score": self.model_evaluation_artifact.improved_score},
+                )
+                self.model_registry.promote(model_version)
+                model_file_path = self.model_registry.model_file_path(model_version)
+            else:
+                logging.info("Trained model was not accepted, production model is left unchanged")
+
+            write_yaml_file(file_path=config.push_report_file_path, content={
+                "is_model_pushed": model_version is not None,
+                "model_version": model_version,
+                "previous_version": previous_version,
+                "model_registry_dir": config.model_registry_dir,
+            })
+            model_pusher_artifact = ModelPusherArtifact(
+                is_model_pushed=model_version is not None,
+                model_version=model_version,
+                model_registry_dir=config.model_registry_dir,
+                model_file_path=model_file_path,
+                push_report_file_path=config.push_report_file_path,
+            )
+            logging.info(f"Model pusher artifact: {model_pusher_artifact}")
+            return model_pusher_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,165 @@
+import sys
+from dataclasses import asdict
+from typing import Tuple
+
+import numpy as np
+
+from insurance_fraud_detection.entity.artifact_entity import (ClassificationMetricArtifact, DataTransformationArtifact,
+                                                              ModelTrainerArtifact)
+from insurance_fraud_detection.entity.config_entity import ModelTrainerConfig
+from insurance_fraud_detection.entity.estimator import InsuranceFraudModel
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import (compute_file_hash, load_model_artifact, load_numpy_array_data,
+                                                        read_yaml_file, save_model_artifact, write_yaml_file)
+from insurance_fraud_detection.utils.run_metrics import instrumented_step
+from insurance_fraud_detection.utils.search_utils import SuccessiveHalvingSearch, expand_candidates, import_class
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+
+class ModelTrainer:
+    def __init__(self, data_transformation_artifact: DataTransformationArtifact,
+                 model_trainer_config: ModelTrainerConfig):
+        """
+        :param data_transformation_artifact: Output reference of data transformation artifact stage
+        :param model_trainer_config: Configuration for model training
+        """
+        try:
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_trainer_config = model_trainer_config
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_stage_fingerprint(self) -> str:
+        """
+        Fingerprint of the training stage: its config, the transformed data and preprocessor,
+        model.yaml and the code of the training modules.
+        """
+        try:
+            inputs = {
+                "train": compute_file_hash(self.data_transformation_artifact.transformed_train_file_path),
+                "test": compute_file_hash(self.data_transformation_artifact.transformed_test_file_path),
+                "preprocessor": compute_file_hash(self.data_transformation_artifact.transformed_object_file_path),
+                "model_config": compute_file_hash(self.model_trainer_config.model_config_file_path),
+            }
+            code_modules = [sys.modules[module_name] for module_name in
+                            (__name__, SuccessiveHalvingSearch.__module__, InsuranceFraudModel.__module__)]
+            return StageCache.fingerprint(self.model_trainer_config, inputs, code_modules)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @instrumented_step()
+    def search_best_model(self) -> dict:
+        """
+        Method Name :   search_best_model
+        Description :   This method runs the budgeted hyperparameter search over the candidates of
+                        model.yaml and writes the search report
+
+        Output      :   search report with the best candidate
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.model_trainer_config
+            candidates = expand_candidates(read_yaml_file(file_path=config.model_config_file_path))
+            search = SuccessiveHalvingSearch(
+                candidates=candidates,
+                train_file_path=self.data_transformation_artifact.transformed_train_file_path,
+                scoring=config.scoring,
+                strategy=config.search_strategy,
+                n_folds=config.n_folds,
+                factor=config.halving_factor,
+                min_samples=config.min_samples,
+                time_budget=config.time_budget or None,
+                max_fits=config.max_fits or None,
+                n_jobs=config.n_jobs,
+                random_state=config.random_state,
+                cache_file_path=config.search_cache_file_path,
+            )
+            report = search.run()
+            write_yaml_file(file_path=config.search_report_file_path, content=report)
+            return report
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @instrumented_step()
+    def get_model_object_and_report(self, train: np.ndarray,
+                                    test: np.ndarray) -> Tuple[object, ClassificationMetricArtifact, dict]:
+        """
+        Method Name :   get_model_object_and_report
+        Description :   This method searches the best candidate, refits it on the whole train set and
+                        scores it on the test set, with the classification metrics and with the scorer
+                        of the search
+
+        Output      :   Returns the fitted model, its metric artifact and the best candidate with its
+                        test_score
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            report = self.search_best_model()
+            best = report["best"]
+            logging.info(f"Refitting {best['model_name']} with {best['params']} on the full train set")
+
+            x_train, y_train = train[:, :-1], train[:, -1].astype(np.int64)
+            x_test, y_test = test[:, :-1], test[:, -1].astype(np.int64)
+            model = import_class(best["class"])(**best["params"])
+            model.fit(x_train, y_train)
+
+            from sklearn.metrics import accuracy_score, f1_score, get_scorer, precision_score, recall_score
+
+            y_pred = model.predict(x_test)
+            metric_artifact = ClassificationMetricArtifact(
+                f1_score=float(f1_score(y_test, y_pred, zero_division=0)),
+                precision_score=float(precision_score(y_test, y_pred, zero_division=0)),
+                recall_score=float(recall_score(y_test, y_pred, zero_division=0)),
+                accuracy_score=float(accuracy_score(y_test, y_pred)),
+            )
+            best = {**best, "test_score": float(get_scorer(report["scoring"])(model, x_test, y_test))}
+            return model, metric_artifact, best
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        """
+        Method Name :   initiate_model_trainer
+        Description :   This method initiates the model trainer steps
+
+        Output      :   Returns model trainer artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.debug("Entered initiate_model_trainer method of ModelTrainer class")
+        try:
+            train_arr = load_numpy_array_data(self.data_transformation_artifact.transformed_train_file_path,
+                                              mmap_mode="r")
+            test_arr = load_numpy_array_data(self.data_transformation_artifact.transformed_test_file_path,
+                                             mmap_mode="r")
+
+            trained_model, metric_artifact, best = self.get_model_object_and_report(train=train_arr, test=test_arr)
+            logging.info(f"Test metrics of the best model: {metric_artifact}")
+
+            # the acceptance threshold applies to the test score of the scorer the search used
+            logging.info(f"Test {self.model_trainer_config.scoring} of the best model: {best['test_score']}")
+            if best["test_score"] < self.model_trainer_config.expected_score:
+                logging.info("No best model found with score more than base score")
+                raise Exception("No best model found with score more than base score")
+
+            preprocessing_obj = load_model_artifact(
+                file_path=self.data_transformation_artifact.transformed_object_file_path)
+            insurance_fraud_model = InsuranceFraudModel(preprocessing_object=preprocessing_obj,
+                                                        trained_model_object=trained_model)
+            logging.info("Created insurance fraud model object with preprocessor and model")
+            save_model_artifact(self.model_trainer_config.trained_model_file_path, insurance_fraud_model,
+                                compress=self.model_trainer_config.artifact_compression,
+                                file_format=self.model_trainer_config.artifact_format,
+                                metadata={"model_name": best["model_name"], "params": best["params"],
+                                          "metrics": asdict(metric_artifact),
+                                          "test_score": {self.model_trainer_config.scoring: best["test_score"]}})
+
+            model_trainer_artifact = ModelTrainerArtifact(
+                trained_model_file_path=self.model_trainer_config.trained_model_file_path,
+                metric_artifact=metric_artifact,
+                search_report_file_path=self.model_trainer_config.search_report_file_path,
+            )
+            logging.info(f"Model trainer artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
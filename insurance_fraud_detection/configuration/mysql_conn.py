@@ -1,71 +1,273 @@
 import sys
 import os
-import pymysql
-import certifi
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Optional
+
 from insurance_fraud_detection.logger import logging
 from insurance_fraud_detection.exception import CustomException
 # importing environment variables for MySQL connection
 from insurance_fraud_detection.constants import (DATABASE_NAME,
                                                 HOST,
-                                                USER,    
-                                                PASSWORD)
+                                                USER,
+                                                PASSWORD,
+                                                MYSQL_POOL_MAX_SIZE,
+                                                MYSQL_POOL_TIMEOUT,
+                                                MYSQL_POOL_PING_INTERVAL,
+                                                MYSQL_CONNECT_TIMEOUT)
 
 import warnings
-warnings.filterwarnings("ignore")
 
+# pymysql is imported on first connection: most entry points never talk to MySQL
+if TYPE_CHECKING:
+    import pymysql
+
+
+class MySQLConnectionPool:
+    """
+    Class Name :   MySQLConnectionPool
+    Description :  Bounded, thread-safe pool of pymysql connections.
+
+                   Connections are created lazily up to max_size. A connection that has been idle
+                   longer than ping_interval is pinged on checkout and reconnected when the server
+                   dropped it. When every connection is checked out, acquire waits up to timeout
+                   seconds and then raises TimeoutError.
+    """
+
+    def __init__(self, host: str, user: str, password: str, database_name: str,
+                 max_size: int = MYSQL_POOL_MAX_SIZE, timeout: float = MYSQL_POOL_TIMEOUT,
+                 ping_interval: float = MYSQL_POOL_PING_INTERVAL,
+                 connect_timeout: int = MYSQL_CONNECT_TIMEOUT) -> None:
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database_name = database_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect_timeout = connect_timeout
 
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, last returned at)
+        self._size = 0  # connections currently open, idle or checked out
+        self._closed = False
+        self._metrics = {
+            "created": 0,
+            "checkouts": 0,
+            "returns": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "peak_in_use": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _connect(self) -> "pymysql.connections.Connection":
+        import pymysql
+
+        # autocommit so a pooled connection never keeps reading an old transaction snapshot
+        return pymysql.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            db=self.database_name,
+            connect_timeout=self.connect_timeout,
+            autocommit=True,
+        )
+
+    def _ensure_alive(self, connection: "pymysql.connections.Connection") -> "pymysql.connections.Connection":
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Exception:
+            logging.info("Pooled MySQL connection is stale, reconnecting")
+            with self._lock:
+                self._metrics["reconnects"] += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return self._connect()
+
+    def acquire(self, timeout: Optional[float] = None) -> "pymysql.connections.Connection":
+        """
+        Check a connection out of the pool; it must be given back with release().
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("MySQL connection pool is closed")
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    create = False
+                    break
+                if self._size < self.max_size:
+                    # reserve the slot now, the connection itself is opened outside the lock
+                    self._size += 1
+                    connection, last_used = None, None
+                    create = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise TimeoutError(f"MySQL connection pool exhausted: {self.max_size} connections "
+                                       f"in use for more than {timeout} seconds")
+                if not waited:
+                    self._metrics["waits"] += 1
+                    waited = True
+                start = time.monotonic()
+                self._lock.wait(remaining)
+                self._metrics["wait_seconds"] += time.monotonic() - start
+
+        try:
+            if create:
+                connection = self._connect()
+            elif time.monotonic() - last_used > self.ping_interval:
+                connection = self._ensure_alive(connection)
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            if create:
+                self._metrics["created"] += 1
+            self._metrics["checkouts"] += 1
+            in_use = self._size - len(self._idle)
+            self._metrics["peak_in_use"] = max(self._metrics["peak_in_use"], in_use)
+        return connection
+
+    def release(self, connection: "pymysql.connections.Connection", discard: bool = False) -> None:
+        """
+        Return a connection to the pool. Broken connections should be discarded.
+        """
+        with self._lock:
+            self._metrics["returns"] += 1
+            if discard or self._closed:
+                self._size -= 1
+                self._metrics["discarded"] += 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+        if discard or self._closed:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator["pymysql.connections.Connection"]:
+        """
+        Context manager that checks a connection out and returns it afterwards.
+        The connection is discarded when the block raises a MySQL level error.
+        """
+        import pymysql
+
+        connection = self.acquire(timeout=timeout)
+        discard = False
+        try:
+            yield connection
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def stats(self) -> dict:
+        """
+        Pool usage metrics.
+        """
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["max_size"] = self.max_size
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        return stats
+
+    def close(self) -> None:
+        """
+        Close idle connections; checked out ones are closed when they are released.
+        """
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
 
-# making a secure (SSL/TLS) connection to a MySQL server.
-ca = certifi.where()
 
 class MySQLClient:
     """
     Class Name :   MySQLClient
-    Description :  This class establishes a connection to the MySQL database and can be used to export data 
-                   from the MySQL feature store. # SELECT * FROM mlops.insurancefraud_dataset;
+    Description :  This class gives access to the MySQL database through a process wide connection pool
+                   and can be used to export data from the MySQL feature store.
+                   # SELECT * FROM mlops.insurancefraud_dataset;
     """
-    logging.info("Connecting to MySQL database...")
-    client = None
+    pool: Optional[MySQLConnectionPool] = None
+    _pool_lock = threading.Lock()
 
     def __init__(self) -> None:
         try:
-            
-            # Check if the client is already initialized
-            if MySQLClient.client is None:
-                database_name = os.getenv(DATABASE_NAME)
-                host = os.getenv(HOST)
-                user = os.getenv(USER)
-                password = os.getenv(PASSWORD)
-                
-                # Validate that all required environment variables are set
-                if not all([host, user, password, database_name]):
-                    raise ValueError("Missing required environment variables.")
-
-                # Establishing the connection to the MySQL database
-                # Using SSL/TLS for secure connection
-                mydb = pymysql.connect(
-                    host=host,
-                    user=user,
-                    password=password,
-                    db=database_name
-                )
-
-                # Assigning the client to the class variable
-                MySQLClient.client = mydb
-
-            self.client = MySQLClient.client
-            self.database_name = os.getenv(DATABASE_NAME)
-            logging.info("MySQL database connection established successfully.")
-
-            
+
+            # Check if the pool is already initialized
+            if MySQLClient.pool is None:
+                with MySQLClient._pool_lock:
+                    if MySQLClient.pool is None:
+                        database_name = os.getenv(DATABASE_NAME)
+                        host = os.getenv(HOST)
+                        user = os.getenv(USER)
+                        password = os.getenv(PASSWORD)
+
+                        # Validate that all required environment variables are set
+                        if not all([host, user, password, database_name]):
+                            raise ValueError("Missing required environment variables.")
+
+                        # pandas warns on every read_sql_query over a plain DBAPI connection
+                        warnings.filterwarnings("ignore")
+                        logging.info("Creating MySQL connection pool...")
+                        MySQLClient.pool = MySQLConnectionPool(
+                            host=host,
+                            user=user,
+                            password=password,
+                            database_name=database_name
+                        )
+
+            self.pool = MySQLClient.pool
+            self.database_name = self.pool.database_name
 
         except Exception as e:
             raise CustomException(e, sys)
 
+    def connection(self, timeout: Optional[float] = None):
+        """
+        Context manager yielding a pooled connection:
+
+            with MySQLClient().connection() as conn:
+                pd.read_sql_query(query, conn)
+        """
+        return self.pool.connection(timeout=timeout)
+
 
 # if __name__ == "__main__":
 #     try:
 #         obj = MySQLClient()  # instantiate the class
-#         print("Client object:", obj.client)  # verify connection object
+#         with obj.connection() as conn:
+#             print("Connection object:", conn)  # verify connection object
+#         print("Pool stats:", obj.pool.stats())
 #     except Exception as e:
-#         print("Failed to connect:", str(e))
\ No newline at end of file
+#         print("Failed to connect:", str(e))
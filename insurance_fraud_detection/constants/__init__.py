@@ -9,9 +9,37 @@ USER = "USER"
 PASSWORD = "PASSWORD"
 TABLE_NAME = "TABLE_NAME"
 
+# MySQL connection pool
+MYSQL_POOL_MAX_SIZE: int = 8
+MYSQL_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection before giving up
+MYSQL_POOL_PING_INTERVAL: float = 30.0  # idle seconds after which a connection is pinged on checkout
+MYSQL_CONNECT_TIMEOUT: int = 10
+
+# Logging: JSON lines written by a background thread, see insurance_fraud_detection.logger
+LOG_DIR: str = "logs"
+LOG_LEVEL: str = "INFO"
+LOG_LEVEL_ENV: str = "LOG_LEVEL"  # environment variable overriding LOG_LEVEL
+LOG_MODULE_LEVELS: dict = {}  # e.g. {"insurance_fraud_detection.data_access": "DEBUG"}
+LOG_MODULE_LEVELS_ENV: str = "LOG_MODULE_LEVELS"  # e.g. "insurance_fraud_detection.data_access=DEBUG,uvicorn=WARNING"
+LOG_QUEUE_SIZE: int = 10_000  # queued records; records are dropped (and counted) rather than block the caller
+LOG_RATE_LIMIT_RECORDS: int = 20  # records a single call site may log per interval, 0 = unlimited
+LOG_RATE_LIMIT_INTERVAL: float = 1.0
+
 
 PIPELINE_NAME = "insuranceFraudDetection"
 ARTIFACT_DIR = "artifacts"
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+RUN_METRICS_DIR_NAME: str = "run_metrics"
+RUN_METRICS_LATEST_FILE_NAME: str = "latest.yaml"
+RUN_METRICS_PROFILE: str = ""  # "", "cprofile" or "sampling": profile every stage of a run
+RUN_METRICS_PROFILE_ENV: str = "PIPELINE_PROFILE"  # environment variable overriding RUN_METRICS_PROFILE
+RUN_METRICS_SAMPLING_INTERVAL: float = 0.005  # seconds between stack samples of the sampling profiler
+PIPELINE_STATE_DIR_NAME: str = "pipeline_state"  # node status and results of the last run, for --resume
+PIPELINE_MAX_WORKERS: int = 4  # independent stages run concurrently on this many threads
+# retries per stage name, e.g. {"data_ingestion": 2}; only for stages that are safe to run again after a failure
+PIPELINE_STAGE_RETRIES: dict = {}
+PIPELINE_STAGE_RETRY_DELAY: float = 10.0  # seconds before the first retry, doubled before every further one
+PIPELINE_STAGE_TIMEOUTS: dict = {}  # seconds per attempt of a stage, e.g. {"model_trainer": 7200}
 FILE_NAME = "raw_data.csv"
 
 TRAIN_FILE_NAME: str = "train.csv"
@@ -20,6 +48,9 @@ TEST_FILE_NAME: str = "test.csv"
 TARGET_COLUMN = "fraud_reported"
 CURRENT_YEAR = date.today().year
 PREPROCSSING_OBJECT_FILE_NAME = "preprocessing.pkl"
+MODEL_ARTIFACT_FORMAT: str = "pickle5"  # "pickle5" memory-maps the numpy buffers of a model on load,
+                                        # "joblib" is needed for compression
+MODEL_ARTIFACT_COMPRESSION: int = 0  # joblib compression of saved models; 0 keeps them memory-mappable
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 
 """
@@ -30,10 +61,157 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.25
+DATA_INGESTION_EXTRACTION_MODE: str = "batch"  # "batch" loads the whole table, "stream" reads it in chunks,
+                                                # "partitioned" reads key ranges in parallel
+DATA_INGESTION_CHUNK_SIZE: int = 50_000
+DATA_INGESTION_FEATURE_STORE_FORMAT: str = "parquet"  # "parquet" (typed, partitioned) or "csv"
+DATA_INGESTION_FEATURE_STORE_COMPRESSION: str = "snappy"
+DATA_INGESTION_MODE: str = "full"  # "full" re-exports the table, "incremental" only fetches rows past the watermark
+# incremental runs fetch rows with a larger value than the last one ingested, so the column must grow with
+# insertion order: a row inserted later with a smaller value is never fetched
+DATA_INGESTION_WATERMARK_COLUMN: str = "policy_number"
+DATA_INGESTION_STATE_DIR: str = "state"
+DATA_INGESTION_STATE_FILE_NAME: str = "ingestion_state.yaml"
+DATA_INGESTION_PARTITION_COLUMN: str = "policy_number"
+DATA_INGESTION_EXTRACTION_PARTITIONS: int = 16
+DATA_INGESTION_EXTRACTION_WORKERS: int = 4
+DATA_INGESTION_EXTRACTION_EXECUTOR: str = "process"  # "process" or "thread"
+DATA_INGESTION_EXTRACTION_REPORT_FILE_NAME: str = "extraction_report.yaml"
+DATA_INGESTION_SPLIT_STRATEGY: str = "hash"  # "hash" assigns rows by a hash of the key, "random" uses train_test_split
+                                              # (not with a full "stream"/"partitioned" run: it needs the whole table in memory)
+DATA_INGESTION_SPLIT_KEY_COLUMN: str = "policy_number"
+DATA_INGESTION_SPLIT_STRATIFY_COLUMN: str = TARGET_COLUMN  # every class gets test_ratio of its rows, "" disables
+                                                           # stratification
+DATA_INGESTION_SPLIT_SALT: str = ""
+DATA_INGESTION_RANDOM_STATE: int = 42
 
 """
 Data Validation realted contant start with DATA_VALIDATION VAR NAME
 """
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
-DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
\ No newline at end of file
+DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_REPORT_FILE_NAME: str = "validation_report.yaml"
+DATA_VALIDATION_DRIFT_ENGINE: str = "evidently"  # "evidently" or "native"
+DATA_VALIDATION_NUMERICAL_STATTEST: str = "ks"  # native engine: "ks" or "wasserstein"
+DATA_VALIDATION_CATEGORICAL_STATTEST: str = "chisquare"  # native engine: "chisquare" or "psi"
+DATA_VALIDATION_DRIFT_THRESHOLDS: dict = {"ks": 0.05, "wasserstein": 0.1, "chisquare": 0.05, "psi": 0.1}
+DATA_VALIDATION_DRIFT_SHARE: float = 0.5
+DATA_VALIDATION_DRIFT_WORKERS: int = 4
+DATA_VALIDATION_TASK_WORKERS: int = 2  # train and test are read and checked concurrently
+DATA_VALIDATION_USE_REFERENCE_PROFILE: bool = True  # native engine: compare against the cached training profile
+DATA_VALIDATION_REFERENCE_PROFILE_DIR: str = "reference_profile"
+DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME: str = "profile.json"
+DATA_VALIDATION_PROFILE_QUANTILES: int = 1001  # quantiles of the sketch of every numerical column
+DATA_VALIDATION_PROFILE_BINS: int = 50  # histogram bins of every numerical column
+
+
+"""
+Data Transformation related constant start with DATA_TRANSFORMATION VAR NAME
+"""
+DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
+DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
+DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_CHUNK_SIZE: int = 50_000
+DATA_TRANSFORMATION_YEAR_BINS: int = 5  # uniform bins of the policy bind year
+DATA_TRANSFORMATION_RANDOM_STATE: int = 42  # seed of the random-sample imputation of categories
+DATA_TRANSFORMATION_COMPILED_CHECK_ROWS: int = 200  # test rows the compiled preprocessor is checked on, 0 = off
+# train, test and the compiled check run concurrently after the fit, on at most one thread per CPU
+DATA_TRANSFORMATION_TASK_WORKERS: int = min(3, os.cpu_count() or 1)
+
+
+"""
+MODEL TRAINER related constant start with MODEL_TRAINER var name
+"""
+MODEL_TRAINER_DIR_NAME: str = "model_trainer"
+MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
+MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
+MODEL_TRAINER_EXPECTED_SCORE: float = 0.6  # least test score of MODEL_TRAINER_SCORING a trained model must reach
+MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = os.path.join("config", "model.yaml")
+# any sklearn scorer name, e.g. "average_precision" or "roc_auc"; about a quarter of the claims are fraud, so
+# accuracy would accept a model that never predicts fraud
+MODEL_TRAINER_SCORING: str = "f1"
+MODEL_TRAINER_SEARCH_STRATEGY: str = "successive_halving"  # or "exhaustive"
+MODEL_TRAINER_N_FOLDS: int = 3
+MODEL_TRAINER_HALVING_FACTOR: int = 3
+MODEL_TRAINER_MIN_SAMPLES: int = 200  # smallest subsample a successive halving rung is trained on
+MODEL_TRAINER_TIME_BUDGET: float = 1800.0  # seconds; no new fits are started afterwards
+MODEL_TRAINER_MAX_FITS: int = 0  # 0 = unlimited
+MODEL_TRAINER_N_JOBS: int = 0  # worker processes, 0 = one per CPU
+MODEL_TRAINER_RANDOM_STATE: int = 42
+MODEL_TRAINER_SEARCH_CACHE_FILE_NAME: str = "search_results.jsonl"
+MODEL_TRAINER_SEARCH_REPORT_FILE_NAME: str = "search_report.yaml"
+
+
+"""
+MODEL PUSHER related constant start with MODEL_PUSHER var name
+"""
+MODEL_PUSHER_DIR_NAME: str = "model_pusher"
+MODEL_PUSHER_REPORT_FILE_NAME: str = "push_report.yaml"
+MODEL_REGISTRY_DIR: str = "saved_models"  # local registry the production model is promoted into
+MODEL_REGISTRY_BUNDLE_DIR_NAME: str = "bundles"
+MODEL_REGISTRY_POINTER_FILE_NAME: str = "CURRENT"
+MODEL_REGISTRY_MODEL_FILE_NAME: str = MODEL_TRAINER_TRAINED_MODEL_NAME
+MODEL_REGISTRY_PREPROCESSOR_FILE_NAME: str = PREPROCSSING_OBJECT_FILE_NAME
+MODEL_REGISTRY_MAX_HISTORY: int = 20  # previous versions kept in the pointer for rollback
+
+
+"""
+Prediction service related constant
+"""
+APP_HOST: str = "0.0.0.0"
+APP_PORT: int = 8080
+PREDICTION_MODEL_FILE_PATH: str = os.path.join(ARTIFACT_DIR, MODEL_TRAINER_DIR_NAME, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                               MODEL_TRAINER_TRAINED_MODEL_NAME)
+PREDICTION_MAX_BATCH_SIZE: int = 256  # claims scored by one vectorized predict call
+PREDICTION_MAX_WAIT_MS: float = 2.0  # how long the first request of a micro-batch waits for others
+PREDICTION_MAX_REQUEST_RECORDS: int = 10_000  # claims accepted by one batch request
+PREDICTION_LATENCY_WINDOW: int = 10_000  # latest requests the latency percentiles are computed over
+PREDICTION_CACHE_SIZE: int = 100_000  # cached prediction results, 0 disables the cache
+PREDICTION_CACHE_TTL_SECONDS: float = 300.0
+PREDICTION_RELOAD_POLL_SECONDS: float = 5.0  # how often the service checks the registry for a new model, 0 = never
+
+
+"""
+Batch prediction related constant
+"""
+BATCH_PREDICTION_DIR_NAME: str = "batch_prediction"
+BATCH_PREDICTION_OUTPUT_DIR: str = "predictions"
+BATCH_PREDICTION_SOURCE: str = "feature_store"  # "feature_store" (parquet/csv) or "mysql"
+BATCH_PREDICTION_CHUNK_SIZE: int = 50_000
+BATCH_PREDICTION_N_JOBS: int = 0  # worker processes, 0 = one per CPU
+BATCH_PREDICTION_KEY_COLUMN: str = "policy_number"
+BATCH_PREDICTION_PROGRESS_FILE_NAME: str = "_progress.jsonl"
+BATCH_PREDICTION_RUN_FILE_NAME: str = "_run.json"
+
+
+"""
+MODEL EVALUATION related constant
+"""
+MODEL_EVALUATION_DIR_NAME: str = "model_evaluation"
+MODEL_EVALUATION_REPORT_FILE_NAME: str = "evaluation_report.yaml"
+MODEL_EVALUATION_CHUNK_SIZE: int = 50_000
+MODEL_EVALUATION_N_RESAMPLES: int = 1000
+MODEL_EVALUATION_CONFIDENCE_LEVEL: float = 0.95
+MODEL_EVALUATION_PROMOTION_METRIC: str = "f1"  # recall, precision, f1, pr_auc or cost
+# the candidate is accepted when the lower confidence bound of its improvement over production exceeds this
+MODEL_EVALUATION_MIN_IMPROVEMENT: float = 0.0
+MODEL_EVALUATION_FALSE_NEGATIVE_COST: float = 10.0  # cost of a missed fraud, relative to
+MODEL_EVALUATION_FALSE_POSITIVE_COST: float = 1.0  # the cost of investigating a legitimate claim
+MODEL_EVALUATION_N_JOBS: int = 0  # worker processes, 0 = one per CPU
+MODEL_EVALUATION_RANDOM_STATE: int = 42
+
+
+"""
+Benchmark related constant start with BENCHMARK var name
+"""
+BENCHMARK_DIR_NAME: str = "benchmarks"  # results of the end-to-end benchmark, one run metrics file per run
+BENCHMARK_MODEL_CONFIG_FILE_PATH: str = os.path.join("config", "benchmark_model.yaml")
+BENCHMARK_ROWS: int = 1_000_000
+BENCHMARK_DRIFT: float = 1.0  # drift strength of the batch the drift detection is benchmarked on
+BENCHMARK_ONLINE_RECORDS: int = 2_000  # single-claim predictions timed for the online latency
+BENCHMARK_TIME_BUDGET: float = 600.0  # seconds of hyperparameter search
+BENCHMARK_REGRESSION_THRESHOLD: float = 0.2  # relative slowdown against the baseline reported as regression
+BENCHMARK_STARTUP_REPEATS: int = 5  # cold starts per entry point of the startup benchmark
+BENCHMARK_STARTUP_TARGET_SECONDS: float = 0.8  # median cold start of a CLI stage, interpreter included
+BENCHMARK_STARTUP_SERVICE_TARGET_SECONDS: float = 2.0  # same for a serving worker, loading its model included
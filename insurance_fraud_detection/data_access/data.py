@@ -1,7 +1,9 @@
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Any, Iterator, List, Optional, Tuple
 from insurance_fraud_detection.configuration.mysql_conn import MySQLClient
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.logger import logging
@@ -11,18 +13,25 @@ class InsuranceData:
     """
     This class helps export the entire MySQL table as a pandas DataFrame.
     """
-    logging.info("Initializing MySQLClient for InsuranceData...")
     def __init__(self):
         """
         Initialize MySQLClient to interact with the MySQL database.
         """
         try:
-            
+            logging.info("Initializing MySQLClient for InsuranceData...")
             # Initialize MySQLClient to establish a connection
             self.mysql_client = MySQLClient()
         except Exception as e:
             raise CustomException(e, sys)
 
+    @staticmethod
+    def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Replace the '?' placeholder used in the source table with NaN.
+        """
+        df.replace({"?": np.nan}, inplace=True)
+        return df
+
     def export_collection_as_dataframe(self, table_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
         """
         Export entire MySQL table as a pandas DataFrame.
@@ -37,20 +46,239 @@ class InsuranceData:
             query = f"SELECT * FROM {db_name}.{table_name};"
 
             # Execute and load data
-            df = pd.read_sql_query(query, self.mysql_client.client)
-            logging.info(f"Data exported successfully from table '{table_name}'.")
-            logging.info(f"DataFrame shape: {df.shape}")
+            with self.mysql_client.connection() as connection:
+                df = pd.read_sql_query(query, connection)
+            logging.info("Data exported successfully from table '%s', shape %s", table_name, df.shape)
 
             # Clean up invalid values
-            df.replace({"?": np.nan}, inplace=True)
+            self.clean_dataframe(df)
             logging.info("Replaced '?' with NaN in DataFrame.")
-            logging.info(f"DataFrame after cleaning: {df.head()}")
 
             return df
 
         except Exception as e:
             raise CustomException(e, sys)
 
+    def export_collection_as_dataframe_chunks(self, table_name: str, chunk_size: int,
+                                              database_name: Optional[str] = None,
+                                              watermark_column: Optional[str] = None,
+                                              watermark_value: Optional[Any] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream a MySQL table as cleaned pandas DataFrames of at most `chunk_size` rows.
+
+        Rows are read through a server-side (unbuffered) cursor, so only one chunk
+        is held in memory at a time regardless of the table size.
+        When `watermark_column` is given rows are returned ordered by it, and only rows
+        strictly greater than `watermark_value` are returned when a value is given.
+        """
+        try:
+            if chunk_size <= 0:
+                raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+            db_name = database_name if database_name else self.mysql_client.database_name
+            query = f"SELECT * FROM {db_name}.{table_name}"
+            params = None
+            if watermark_column:
+                if watermark_value is not None:
+                    query += f" WHERE {watermark_column} > %s"
+                    params = (watermark_value,)
+                query += f" ORDER BY {watermark_column}"
+            logging.info(f"Streaming table '{db_name}.{table_name}' in chunks of {chunk_size} rows "
+                         f"(watermark: {watermark_column} > {watermark_value})")
+
+            from pymysql.cursors import SSCursor
+
+            with self.mysql_client.connection() as connection:
+                cursor = connection.cursor(SSCursor)
+                try:
+                    cursor.execute(query, params)
+                    columns = [column[0] for column in cursor.description]
+                    n_chunks = 0
+                    n_rows = 0
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        df = pd.DataFrame.from_records(rows, columns=columns)
+                        n_chunks += 1
+                        n_rows += len(df)
+                        yield self.clean_dataframe(df)
+                finally:
+                    # an unbuffered cursor must be drained/closed before the connection is reused
+                    cursor.close()
+
+            logging.info(f"Streamed {n_rows} rows in {n_chunks} chunks from table '{table_name}'.")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def export_columns_as_dataframe(self, table_name: str, columns: List[str],
+                                    database_name: Optional[str] = None) -> pd.DataFrame:
+        """
+        Export only the given columns of a MySQL table as a cleaned DataFrame, e.g. the split key and
+        stratify columns a HashSplitter is fitted on before the table is streamed.
+        """
+        try:
+            db_name = database_name if database_name else self.mysql_client.database_name
+            query = f"SELECT {', '.join(columns)} FROM {db_name}.{table_name}"
+            with self.mysql_client.connection() as connection:
+                df = pd.read_sql_query(query, connection)
+            return self.clean_dataframe(df)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_key_range(self, table_name: str, key_column: str, database_name: Optional[str] = None,
+                      lower_bound: Optional[Any] = None) -> Tuple[Any, Any]:
+        """
+        Smallest and largest value of key_column, optionally only above lower_bound (exclusive).
+        """
+        try:
+            db_name = database_name if database_name else self.mysql_client.database_name
+            query = f"SELECT MIN({key_column}), MAX({key_column}) FROM {db_name}.{table_name}"
+            params = None
+            if lower_bound is not None:
+                query += f" WHERE {key_column} > %s"
+                params = (lower_bound,)
+            with self.mysql_client.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return cursor.fetchone()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_table_signature(self, table_name: str, key_column: str, database_name: Optional[str] = None) -> dict:
+        """
+        Cheap signature of the table content (row count, key range and last update time)
+        used to decide whether a previous ingestion is still up to date.
+        """
+        try:
+            db_name = database_name if database_name else self.mysql_client.database_name
+            with self.mysql_client.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*), MIN({key_column}), MAX({key_column}) "
+                                   f"FROM {db_name}.{table_name}")
+                    n_rows, min_key, max_key = cursor.fetchone()
+                    cursor.execute("SELECT UPDATE_TIME FROM information_schema.tables "
+                                   "WHERE table_schema = %s AND table_name = %s", (db_name, table_name))
+                    row = cursor.fetchone()
+            return {
+                "table": f"{db_name}.{table_name}",
+                "rows": n_rows,
+                "min_key": min_key,
+                "max_key": max_key,
+                "update_time": str(row[0]) if row and row[0] is not None else None,
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def split_key_range(min_key: int, max_key: int, n_partitions: int) -> List[Tuple[int, int]]:
+        """
+        Split the inclusive integer range [min_key, max_key] into at most n_partitions
+        contiguous, non-overlapping inclusive ranges.
+        """
+        n_partitions = max(1, min(int(n_partitions), int(max_key) - int(min_key) + 1))
+        edges = np.linspace(int(min_key), int(max_key) + 1, n_partitions + 1).astype(np.int64)
+        return [(int(lo), int(hi) - 1) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+    def read_key_range(self, table_name: str, key_column: str, lower: Any, upper: Any,
+                       database_name: Optional[str] = None) -> pd.DataFrame:
+        """
+        Read the rows with lower <= key_column <= upper as a cleaned DataFrame.
+        """
+        try:
+            db_name = database_name if database_name else self.mysql_client.database_name
+            query = f"SELECT * FROM {db_name}.{table_name} WHERE {key_column} >= %s AND {key_column} <= %s"
+            with self.mysql_client.connection() as connection:
+                df = pd.read_sql_query(query, connection, params=(lower, upper))
+            return self.clean_dataframe(df)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def export_collection_as_partitions(self, table_name: str, key_column: str, n_partitions: int,
+                                        max_workers: int, database_name: Optional[str] = None,
+                                        lower_bound: Optional[Any] = None,
+                                        use_processes: bool = False,
+                                        ordered: bool = False) -> Iterator[Tuple[dict, pd.DataFrame]]:
+        """
+        Export a MySQL table by splitting it into key ranges on the integer key_column and reading
+        the ranges concurrently on max_workers connections (threads sharing the connection pool,
+        or worker processes with their own pool when use_processes is True).
+
+        Yields (partition report, DataFrame) pairs in completion order, or in key order when ordered
+        is True (finished partitions are then held back until the earlier ones are done); the report
+        holds the key range, the row count, the read time and the rows/sec of the partition.
+        Only rows with key_column > lower_bound are exported when lower_bound is given.
+        """
+        try:
+            db_name = database_name if database_name else self.mysql_client.database_name
+            min_key, max_key = self.get_key_range(table_name, key_column, db_name, lower_bound)
+            if min_key is None:
+                logging.info(f"No rows to export from '{db_name}.{table_name}'")
+                return
+            if not isinstance(min_key, (int, np.integer)):
+                raise ValueError(f"Partitioned extraction needs an integer key, "
+                                 f"'{key_column}' holds {type(min_key).__name__}")
+
+            ranges = self.split_key_range(min_key, max_key, n_partitions)
+            if not use_processes and max_workers > self.mysql_client.pool.max_size:
+                logging.info(f"Limiting partition workers to the pool size {self.mysql_client.pool.max_size}")
+                max_workers = self.mysql_client.pool.max_size
+            logging.info(f"Exporting '{db_name}.{table_name}' as {len(ranges)} partitions on '{key_column}' "
+                         f"with {max_workers} {'processes' if use_processes else 'threads'}")
+
+            executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            start = time.perf_counter()
+            n_rows = 0
+            with executor_class(max_workers=max_workers) as executor:
+                reader = None if use_processes else self
+                futures = {
+                    executor.submit(_read_partition, reader, table_name, key_column, lower, upper, db_name): index
+                    for index, (lower, upper) in enumerate(ranges)
+                }
+                finished = {}
+                next_partition = 0
+                for future in as_completed(futures):
+                    df, seconds = future.result()
+                    index = futures[future]
+                    lower, upper = ranges[index]
+                    report = {
+                        "partition": index,
+                        "lower": lower,
+                        "upper": upper,
+                        "rows": len(df),
+                        "seconds": round(seconds, 4),
+                        "rows_per_sec": round(len(df) / seconds, 1) if seconds > 0 else None,
+                    }
+                    logging.info("Partition %d exported", index, extra=report)
+                    n_rows += len(df)
+                    if not ordered:
+                        yield report, df
+                        continue
+                    finished[index] = (report, df)
+                    while next_partition in finished:
+                        yield finished.pop(next_partition)
+                        next_partition += 1
+
+            elapsed = time.perf_counter() - start
+            logging.info(f"Exported {n_rows} rows from '{table_name}' in {elapsed:.2f}s "
+                         f"({n_rows / elapsed if elapsed > 0 else 0:.1f} rows/sec overall)")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _read_partition(reader: Optional[InsuranceData], table_name: str, key_column: str, lower: Any,
+                    upper: Any, database_name: str) -> Tuple[pd.DataFrame, float]:
+    """
+    Read one key range; runs in a worker thread or process. Worker processes get reader=None
+    and open their own pool.
+    """
+    reader = reader if reader is not None else InsuranceData()
+    start = time.perf_counter()
+    df = reader.read_key_range(table_name, key_column, lower, upper, database_name)
+    return df, time.perf_counter() - start
+
 
 # if __name__ == "__main__":
 #     try:
@@ -59,4 +287,4 @@ class InsuranceData:
 #         df = insurance_data.export_collection_as_dataframe("insurancefraud_dataset")
 #         print(df.head())  # Display the first few rows of the DataFrame
 #     except Exception as e:
-#         print(f"Error: {str(e)}")
\ No newline at end of file
+#         print(f"Error: {str(e)}")
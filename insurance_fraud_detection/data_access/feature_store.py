@@ -0,0 +1,185 @@
+import os
+import shutil
+import sys
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from insurance_fraud_detection.constants import SCHEMA_FILE_PATH
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import read_yaml_file
+
+
+# schema.yaml dtype name -> arrow type used on disk
+ARROW_TYPES: Dict[str, pa.DataType] = {
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "object": pa.string(),
+}
+
+PART_FILE_TEMPLATE = "part-{:05d}.parquet"
+
+
+class FeatureStore:
+    """
+    Class Name :   FeatureStore
+    Description :  Reads and writes feature store files (raw data, train and test sets).
+
+                   "parquet" stores a partitioned dataset: file_path is a directory holding one
+                   compressed part file per write/append, typed with the dtypes declared under
+                   `columns` in schema.yaml, so reads need no type inference and can project columns.
+                   "csv" keeps the original single text file layout.
+    """
+
+    def __init__(self, file_path: str, file_format: Optional[str] = None, compression: Optional[str] = "snappy",
+                 schema_file_path: str = SCHEMA_FILE_PATH):
+        try:
+            self.file_path = file_path
+            self.file_format = file_format if file_format else self.infer_format(file_path)
+            if self.file_format not in ("csv", "parquet"):
+                raise ValueError(f"Unsupported feature store format: {self.file_format}")
+            self.compression = compression
+            self._schema_dtypes: Dict[str, str] = read_yaml_file(file_path=schema_file_path)["columns"]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def infer_format(file_path: str) -> str:
+        return "parquet" if file_path.rstrip(os.sep).endswith(".parquet") else "csv"
+
+    def arrow_schema(self, columns: List[str]) -> pa.Schema:
+        """
+        Build the on-disk arrow schema for the given columns from schema.yaml.
+        Columns unknown to schema.yaml are stored as strings.
+        """
+        return pa.schema([(column, ARROW_TYPES.get(self._schema_dtypes.get(column), pa.string()))
+                          for column in columns])
+
+    def exists(self) -> bool:
+        if self.file_format == "csv":
+            return os.path.isfile(self.file_path)
+        return len(self.list_parts()) > 0
+
+    def list_parts(self) -> List[str]:
+        if not os.path.isdir(self.file_path):
+            return []
+        return sorted(os.path.join(self.file_path, name) for name in os.listdir(self.file_path)
+                      if name.endswith(".parquet"))
+
+    def clear(self) -> None:
+        if os.path.isdir(self.file_path):
+            shutil.rmtree(self.file_path)
+        elif os.path.isfile(self.file_path):
+            os.remove(self.file_path)
+
+    def marker(self) -> int:
+        """
+        Position the store can be rolled back to with rollback(): the number of part files for parquet,
+        the file size in bytes for csv.
+        """
+        if self.file_format == "csv":
+            return os.path.getsize(self.file_path) if os.path.isfile(self.file_path) else 0
+        return len(self.list_parts())
+
+    def rollback(self, marker: int) -> None:
+        """
+        Drop everything appended after marker() returned marker, including a csv append or a parquet part
+        (its .tmp file) that was cut off half-way.
+        """
+        try:
+            if self.file_format == "csv":
+                if marker == 0:
+                    self.clear()
+                elif os.path.isfile(self.file_path) and os.path.getsize(self.file_path) > marker:
+                    with open(self.file_path, "r+b") as file:
+                        file.truncate(marker)
+                return
+            parts = self.list_parts()
+            if len(parts) > marker:
+                logging.info(f"Rolling back {len(parts) - marker} uncommitted parts of {self.file_path}")
+            for part in parts[marker:]:
+                os.remove(part)
+            if os.path.isdir(self.file_path):
+                for name in os.listdir(self.file_path):
+                    if name.endswith(".parquet.tmp"):
+                        os.remove(os.path.join(self.file_path, name))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        """
+        Replace the content of the feature store with the dataframe.
+        """
+        try:
+            logging.info(f"Writing {len(dataframe)} rows to {self.file_format} feature store: {self.file_path}")
+            self.clear()
+            self.append(dataframe)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def append(self, dataframe: pd.DataFrame) -> None:
+        """
+        Append the dataframe to the feature store; for parquet this adds a new partition file.
+        """
+        try:
+            if self.file_format == "csv":
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                write_header = not os.path.isfile(self.file_path)
+                dataframe.to_csv(self.file_path, mode="w" if write_header else "a",
+                                 index=False, header=write_header)
+                return
+
+            os.makedirs(self.file_path, exist_ok=True)
+            part_path = os.path.join(self.file_path, PART_FILE_TEMPLATE.format(len(self.list_parts())))
+            table = pa.Table.from_pandas(dataframe, schema=self.arrow_schema(list(dataframe.columns)),
+                                         preserve_index=False)
+            # write to a temporary name first so a crash never leaves a truncated part behind
+            tmp_path = part_path + ".tmp"
+            pq.write_table(table, tmp_path, compression=self.compression)
+            os.replace(tmp_path, part_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read the feature store, optionally only the given columns.
+        """
+        try:
+            if self.file_format == "csv":
+                return pd.read_csv(self.file_path, usecols=columns, dtype=self._csv_dtypes())
+            return ds.dataset(self.list_parts(), format="parquet").to_table(columns=columns).to_pandas()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def iter_batches(self, batch_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Read the feature store as DataFrames of at most batch_size rows.
+        """
+        try:
+            if self.file_format == "csv":
+                yield from pd.read_csv(self.file_path, usecols=columns, dtype=self._csv_dtypes(),
+                                       chunksize=batch_size)
+                return
+            dataset = ds.dataset(self.list_parts(), format="parquet")
+            for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+                if batch.num_rows:
+                    yield batch.to_pandas()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def count_rows(self) -> int:
+        try:
+            if self.file_format == "csv":
+                return sum(len(chunk) for chunk in pd.read_csv(self.file_path, usecols=[0], chunksize=1_000_000))
+            return sum(pq.ParquetFile(part).metadata.num_rows for part in self.list_parts())
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _csv_dtypes(self) -> Dict[str, str]:
+        # integer columns may hold NaN in text files, so only floats and strings are pinned
+        return {column: ("float64" if dtype == "float64" else "object")
+                for column, dtype in self._schema_dtypes.items() if dtype != "int64"}
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -12,4 +13,54 @@ class DataIngestionArtifact:
 class DataValidationArtifact:
     validation_status:bool
     message: str
-    drift_report_file_path: str
\ No newline at end of file
+    drift_report_file_path: str
+
+
+
+@dataclass
+class DataTransformationArtifact:
+    transformed_object_file_path: str
+    transformed_train_file_path: str
+    transformed_test_file_path: str
+
+
+
+@dataclass
+class ClassificationMetricArtifact:
+    f1_score: float
+    precision_score: float
+    recall_score: float
+    accuracy_score: float
+
+
+
+@dataclass
+class ModelTrainerArtifact:
+    trained_model_file_path: str
+    metric_artifact: ClassificationMetricArtifact
+    search_report_file_path: str
+
+    def __post_init__(self):
+        # artifacts restored from the stage cache carry the metrics as a plain dict
+        if isinstance(self.metric_artifact, dict):
+            self.metric_artifact = ClassificationMetricArtifact(**self.metric_artifact)
+
+
+
+@dataclass
+class ModelEvaluationArtifact:
+    is_model_accepted: bool
+    improved_score: Optional[float]  # None when there is no production model to compare with
+    trained_model_file_path: str
+    production_model_file_path: str
+    evaluation_report_file_path: str
+
+
+
+@dataclass
+class ModelPusherArtifact:
+    is_model_pushed: bool
+    model_version: Optional[str]  # registry version of the promoted bundle, None when nothing was pushed
+    model_registry_dir: str
+    model_file_path: Optional[str]
+    push_report_file_path: str
@@ -1,6 +1,6 @@
 import os
 from insurance_fraud_detection.constants import *
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 # TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
@@ -10,12 +10,30 @@ from datetime import datetime
 class TrainingPipelineConfig:
     pipeline_name: str = PIPELINE_NAME
     artifact_dir: str = os.path.join(ARTIFACT_DIR) #, TIMESTAMP)
+    stage_cache_dir: str = os.path.join(ARTIFACT_DIR, STAGE_CACHE_DIR_NAME)
+    pipeline_state_dir: str = os.path.join(ARTIFACT_DIR, PIPELINE_STATE_DIR_NAME)
+    max_workers: int = PIPELINE_MAX_WORKERS
+    stage_retries: dict = field(default_factory=lambda: dict(PIPELINE_STAGE_RETRIES))
+    stage_retry_delay: float = PIPELINE_STAGE_RETRY_DELAY
+    stage_timeouts: dict = field(default_factory=lambda: dict(PIPELINE_STAGE_TIMEOUTS))
     # timestamp: str = TIMESTAMP
 
 # Instantiate the pipeline configuration object
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
 
+@dataclass
+class RunMetricsConfig:
+    run_metrics_dir: str = os.path.join(training_pipeline_config.artifact_dir, RUN_METRICS_DIR_NAME)
+    latest_file_path: str = os.path.join(run_metrics_dir, RUN_METRICS_LATEST_FILE_NAME)
+    profile: str = field(default_factory=lambda: os.getenv(RUN_METRICS_PROFILE_ENV, RUN_METRICS_PROFILE))
+    sampling_interval: float = RUN_METRICS_SAMPLING_INTERVAL
+
+
+def _with_suffix(file_path: str, suffix: str) -> str:
+    return os.path.splitext(file_path)[0] + suffix
+
+
 
 @dataclass
 class DataIngestionConfig:
@@ -26,6 +44,32 @@ class DataIngestionConfig:
     testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
     table_name:str = DATA_INGESTION_TABLE_NAME
+    extraction_mode: str = DATA_INGESTION_EXTRACTION_MODE
+    chunk_size: int = DATA_INGESTION_CHUNK_SIZE
+    feature_store_format: str = DATA_INGESTION_FEATURE_STORE_FORMAT
+    feature_store_compression: str = DATA_INGESTION_FEATURE_STORE_COMPRESSION
+    ingestion_mode: str = DATA_INGESTION_MODE
+    watermark_column: str = DATA_INGESTION_WATERMARK_COLUMN
+    ingestion_state_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_STATE_DIR,
+                                                  DATA_INGESTION_STATE_FILE_NAME)
+    partition_column: str = DATA_INGESTION_PARTITION_COLUMN
+    extraction_partitions: int = DATA_INGESTION_EXTRACTION_PARTITIONS
+    extraction_workers: int = DATA_INGESTION_EXTRACTION_WORKERS
+    extraction_executor: str = DATA_INGESTION_EXTRACTION_EXECUTOR
+    extraction_report_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_STATE_DIR,
+                                                    DATA_INGESTION_EXTRACTION_REPORT_FILE_NAME)
+    split_strategy: str = DATA_INGESTION_SPLIT_STRATEGY
+    split_key_column: str = DATA_INGESTION_SPLIT_KEY_COLUMN
+    split_stratify_column: str = DATA_INGESTION_SPLIT_STRATIFY_COLUMN
+    split_salt: str = DATA_INGESTION_SPLIT_SALT
+    random_state: int = DATA_INGESTION_RANDOM_STATE
+
+    def __post_init__(self):
+        # the file names in constants carry a .csv suffix; parquet stores are directories named *.parquet
+        if self.feature_store_format == "parquet":
+            self.feature_store_file_path = _with_suffix(self.feature_store_file_path, ".parquet")
+            self.training_file_path = _with_suffix(self.training_file_path, ".parquet")
+            self.testing_file_path = _with_suffix(self.testing_file_path, ".parquet")
     
     
     
@@ -33,4 +77,112 @@ class DataIngestionConfig:
 class DataValidationConfig:
     data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
     drift_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR,
-                                               DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
\ No newline at end of file
+                                               DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
+    validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    drift_engine: str = DATA_VALIDATION_DRIFT_ENGINE
+    numerical_stattest: str = DATA_VALIDATION_NUMERICAL_STATTEST
+    categorical_stattest: str = DATA_VALIDATION_CATEGORICAL_STATTEST
+    drift_thresholds: dict = field(default_factory=lambda: dict(DATA_VALIDATION_DRIFT_THRESHOLDS))
+    drift_share: float = DATA_VALIDATION_DRIFT_SHARE
+    drift_workers: int = DATA_VALIDATION_DRIFT_WORKERS
+    task_workers: int = DATA_VALIDATION_TASK_WORKERS
+    use_reference_profile: bool = DATA_VALIDATION_USE_REFERENCE_PROFILE
+    reference_profile_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REFERENCE_PROFILE_DIR,
+                                                    DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME)
+    profile_quantiles: int = DATA_VALIDATION_PROFILE_QUANTILES
+    profile_bins: int = DATA_VALIDATION_PROFILE_BINS
+
+
+
+@dataclass
+class DataTransformationConfig:
+    data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
+    transformed_train_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                    TRAIN_FILE_NAME.replace("csv", "npy"))
+    transformed_test_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                   TEST_FILE_NAME.replace("csv", "npy"))
+    transformed_object_file_path: str = os.path.join(data_transformation_dir,
+                                                     DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+                                                     PREPROCSSING_OBJECT_FILE_NAME)
+    chunk_size: int = DATA_TRANSFORMATION_CHUNK_SIZE
+    n_year_bins: int = DATA_TRANSFORMATION_YEAR_BINS
+    artifact_format: str = MODEL_ARTIFACT_FORMAT
+    artifact_compression: int = MODEL_ARTIFACT_COMPRESSION
+    random_state: int = DATA_TRANSFORMATION_RANDOM_STATE
+    compiled_check_rows: int = DATA_TRANSFORMATION_COMPILED_CHECK_ROWS
+    task_workers: int = DATA_TRANSFORMATION_TASK_WORKERS
+
+
+
+@dataclass
+class ModelTrainerConfig:
+    model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
+    trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                                MODEL_TRAINER_TRAINED_MODEL_NAME)
+    expected_score: float = MODEL_TRAINER_EXPECTED_SCORE
+    artifact_format: str = MODEL_ARTIFACT_FORMAT
+    artifact_compression: int = MODEL_ARTIFACT_COMPRESSION
+    model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    scoring: str = MODEL_TRAINER_SCORING
+    search_strategy: str = MODEL_TRAINER_SEARCH_STRATEGY
+    n_folds: int = MODEL_TRAINER_N_FOLDS
+    halving_factor: int = MODEL_TRAINER_HALVING_FACTOR
+    min_samples: int = MODEL_TRAINER_MIN_SAMPLES
+    time_budget: float = MODEL_TRAINER_TIME_BUDGET
+    max_fits: int = MODEL_TRAINER_MAX_FITS
+    n_jobs: int = MODEL_TRAINER_N_JOBS
+    random_state: int = MODEL_TRAINER_RANDOM_STATE
+    search_cache_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_SEARCH_CACHE_FILE_NAME)
+    search_report_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_SEARCH_REPORT_FILE_NAME)
+
+
+
+@dataclass
+class InsuranceFraudPredictorConfig:
+    model_file_path: str = PREDICTION_MODEL_FILE_PATH
+    max_batch_size: int = PREDICTION_MAX_BATCH_SIZE
+    max_wait_ms: float = PREDICTION_MAX_WAIT_MS
+    max_request_records: int = PREDICTION_MAX_REQUEST_RECORDS
+    latency_window: int = PREDICTION_LATENCY_WINDOW
+    cache_size: int = PREDICTION_CACHE_SIZE
+    cache_ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS
+    # the promoted model of the registry is served when there is one, model_file_path otherwise
+    model_registry_dir: str = MODEL_REGISTRY_DIR
+    reload_poll_seconds: float = PREDICTION_RELOAD_POLL_SECONDS
+
+
+@dataclass
+class BatchPredictionConfig:
+    batch_prediction_dir: str = os.path.join(training_pipeline_config.artifact_dir, BATCH_PREDICTION_DIR_NAME)
+    output_dir: str = os.path.join(batch_prediction_dir, BATCH_PREDICTION_OUTPUT_DIR)
+    model_file_path: str = PREDICTION_MODEL_FILE_PATH
+    source: str = BATCH_PREDICTION_SOURCE
+    # the ingestion feature store unless another parquet/csv feature store is given
+    input_file_path: str = field(default_factory=lambda: DataIngestionConfig().feature_store_file_path)
+    table_name: str = DATA_INGESTION_TABLE_NAME
+    chunk_size: int = BATCH_PREDICTION_CHUNK_SIZE
+    n_jobs: int = BATCH_PREDICTION_N_JOBS
+    key_column: str = BATCH_PREDICTION_KEY_COLUMN
+
+
+@dataclass
+class ModelEvaluationConfig:
+    model_evaluation_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_EVALUATION_DIR_NAME)
+    evaluation_report_file_path: str = os.path.join(model_evaluation_dir, MODEL_EVALUATION_REPORT_FILE_NAME)
+    model_registry_dir: str = MODEL_REGISTRY_DIR
+    chunk_size: int = MODEL_EVALUATION_CHUNK_SIZE
+    n_resamples: int = MODEL_EVALUATION_N_RESAMPLES
+    confidence_level: float = MODEL_EVALUATION_CONFIDENCE_LEVEL
+    promotion_metric: str = MODEL_EVALUATION_PROMOTION_METRIC
+    min_improvement: float = MODEL_EVALUATION_MIN_IMPROVEMENT
+    false_negative_cost: float = MODEL_EVALUATION_FALSE_NEGATIVE_COST
+    false_positive_cost: float = MODEL_EVALUATION_FALSE_POSITIVE_COST
+    n_jobs: int = MODEL_EVALUATION_N_JOBS
+    random_state: int = MODEL_EVALUATION_RANDOM_STATE
+
+
+@dataclass
+class ModelPusherConfig:
+    model_pusher_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_PUSHER_DIR_NAME)
+    push_report_file_path: str = os.path.join(model_pusher_dir, MODEL_PUSHER_REPORT_FILE_NAME)
+    model_registry_dir: str = MODEL_REGISTRY_DIR
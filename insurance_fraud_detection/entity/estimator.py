@@ -0,0 +1,636 @@
+import datetime
+import hashlib
+import sys
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from scipy import sparse
+
+from insurance_fraud_detection.constants import TARGET_COLUMN
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+
+
+# incident hour -> period of the day, as hour_to_period in the feature engineering notebook
+HOUR_PERIOD_EDGES = [6, 12, 18]
+HOUR_PERIOD_LABELS = ["Night", "Morning", "Afternoon", "Evening"]
+# one-hot column order of the periods (sorted, like a fitted OneHotEncoder)
+HOUR_PERIOD_COLUMNS = sorted(HOUR_PERIOD_LABELS)
+
+
+class SchemaPreprocessor:
+    """
+    Class Name :   SchemaPreprocessor
+    Description :  Preprocessor of the insurance fraud features, built from schema.yaml. It reproduces the
+                   notebook's build_pipeline with transformers that can be fitted chunk by chunk:
+
+                   - date transform columns (policy_bind_date): year -> uniform bins + 1 -> scaled
+                   - hour transform columns (incident_hour_of_the_day): period of the day -> one-hot
+                   - numerical columns: mean imputation -> scaled
+                   - ordinal columns: random-sample imputation -> ordinal codes (ordinal_categories) -> scaled
+                   - nominal columns: random-sample imputation -> one-hot without the first category
+
+                   columns_to_drop and the target are dropped. fit_chunks makes two passes over the data
+                   (category / range statistics, then the scaler), and transform returns a float32 CSR matrix
+                   so the one-hot columns never take dense memory.
+
+                   The random sample of a missing value is drawn from a seed hashed from the record itself
+                   (its input columns and random_state), so a row gets the same features whatever frame or
+                   chunk it is transformed in, and CompiledPreprocessor reproduces them for a single record.
+    """
+
+    def __init__(self, schema_config: dict, n_year_bins: int = 5, random_state: int = 42,
+                 dtype: type = np.float32):
+        drop_columns = set(schema_config.get("columns_to_drop", []))
+        transform_columns = [column for column in schema_config.get("transform_columns", [])
+                             if column not in drop_columns]
+        # a transform column stored as text is a date, an integer one is an hour of the day
+        self.date_columns: List[str] = [column for column in transform_columns
+                                        if schema_config["columns"][column] == "object"]
+        self.hour_columns: List[str] = [column for column in transform_columns if column not in self.date_columns]
+        self.ordinal_columns: List[str] = [column for column in schema_config.get("ordinal_columns", [])
+                                           if column not in drop_columns]
+        self.ordinal_categories: Dict[str, list] = {column: list(schema_config["ordinal_categories"][column])
+                                                    for column in self.ordinal_columns}
+        excluded = drop_columns | set(transform_columns) | set(self.ordinal_columns) | {TARGET_COLUMN}
+        self.numerical_columns: List[str] = [column for column in schema_config.get("numerical_columns", [])
+                                             if column not in excluded]
+        self.nominal_columns: List[str] = [column for column in schema_config.get("nominal_columns", [])
+                                           if column not in excluded]
+        self.n_year_bins = n_year_bins
+        self.random_state = random_state
+        self.dtype = dtype
+        self.is_fitted = False
+
+    @property
+    def input_columns(self) -> List[str]:
+        """
+        Columns of the raw data the preprocessor reads.
+        """
+        return (self.date_columns + self.hour_columns + self.numerical_columns
+                + self.ordinal_columns + self.nominal_columns)
+
+    def _reset_statistics(self) -> None:
+        self._numerical_sums = np.zeros(len(self.numerical_columns))
+        self._numerical_counts = np.zeros(len(self.numerical_columns))
+        self._year_sums = np.zeros(len(self.date_columns))
+        self._year_counts = np.zeros(len(self.date_columns))
+        self._year_min = np.full(len(self.date_columns), np.inf)
+        self._year_max = np.full(len(self.date_columns), -np.inf)
+        self._ordinal_counts = {column: np.zeros(len(self.ordinal_categories[column]), dtype=np.int64)
+                                for column in self.ordinal_columns}
+        self._nominal_counts: Dict[str, pd.Series] = {column: pd.Series(dtype=np.int64)
+                                                      for column in self.nominal_columns}
+
+    def _years(self, dataframe: DataFrame) -> np.ndarray:
+        years = np.empty((len(dataframe), len(self.date_columns)))
+        for index, column in enumerate(self.date_columns):
+            years[:, index] = pd.to_datetime(dataframe[column], errors="coerce").dt.year.to_numpy(dtype=float)
+        return years
+
+    def _ordinal_codes(self, series: pd.Series) -> np.ndarray:
+        """
+        Position of every value in its ordinal category list, -1 for missing or unknown values.
+        """
+        mapping = {category: code for code, category in enumerate(self.ordinal_categories[series.name])}
+        return series.map(mapping).fillna(-1).to_numpy(dtype=np.int64)
+
+    def _collect(self, dataframe: DataFrame) -> None:
+        """
+        First fitting pass: imputation values, category frequencies and the year range.
+        """
+        numerical = dataframe[self.numerical_columns].to_numpy(dtype=float)
+        self._numerical_sums += np.nansum(numerical, axis=0)
+        self._numerical_counts += np.sum(~np.isnan(numerical), axis=0)
+
+        years = self._years(dataframe)
+        self._year_sums += np.nansum(years, axis=0)
+        self._year_counts += np.sum(~np.isnan(years), axis=0)
+        if len(years):
+            self._year_min = np.fmin(self._year_min, np.nanmin(years, axis=0, initial=np.inf))
+            self._year_max = np.fmax(self._year_max, np.nanmax(years, axis=0, initial=-np.inf))
+
+        for column in self.ordinal_columns:
+            codes = self._ordinal_codes(dataframe[column])
+            self._ordinal_counts[column] += np.bincount(codes[codes >= 0],
+                                                        minlength=len(self.ordinal_categories[column]))
+        for column in self.nominal_columns:
+            counts = dataframe[column].dropna().astype(str).value_counts()
+            self._nominal_counts[column] = self._nominal_counts[column].add(counts, fill_value=0)
+
+    def _finish_statistics(self) -> None:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.numerical_means_ = np.nan_to_num(self._numerical_sums / self._numerical_counts)
+            self.year_means_ = np.nan_to_num(self._year_sums / self._year_counts)
+        self.year_edges_ = []
+        for index in range(len(self.date_columns)):
+            low, high = self._year_min[index], self._year_max[index]
+            if not np.isfinite(low):
+                low = high = 0.0
+            self.year_edges_.append(np.linspace(low, high, self.n_year_bins + 1))
+
+        self.ordinal_frequencies_ = {}
+        for column, counts in self._ordinal_counts.items():
+            total = counts.sum()
+            self.ordinal_frequencies_[column] = counts / total if total else None
+
+        self.nominal_categories_ = {}
+        self.nominal_frequencies_ = {}
+        for column, counts in self._nominal_counts.items():
+            counts = counts.sort_index()
+            self.nominal_categories_[column] = counts.index.tolist()
+            total = counts.sum()
+            self.nominal_frequencies_[column] = (counts.to_numpy() / total) if total else None
+
+        self.feature_names_ = (
+            [f"{column}_year_bin" for column in self.date_columns]
+            + [f"{column}_{period}" for column in self.hour_columns for period in HOUR_PERIOD_COLUMNS]
+            + list(self.numerical_columns)
+            + list(self.ordinal_columns)
+            + [f"{column}_{category}" for column in self.nominal_columns
+               for category in self.nominal_categories_[column][1:]]
+        )
+
+    def _imputation_seeds(self, dataframe: DataFrame) -> np.ndarray:
+        """
+        Imputation seed of every row (see _record_seed), 0 for the rows without a value to impute.
+        """
+        needs_imputation = np.zeros(len(dataframe), dtype=bool)
+        for column in self.ordinal_columns:
+            needs_imputation |= self._ordinal_codes(dataframe[column]) < 0
+        for column in self.nominal_columns:
+            needs_imputation |= dataframe[column].isna().to_numpy()
+        seeds = np.zeros(len(dataframe), dtype=np.uint64)
+        if needs_imputation.any():
+            rows = dataframe[self.input_columns][needs_imputation]
+            texts = []
+            for column in self.input_columns:
+                values = rows[column]
+                if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                    # numpy formats floats as repr does, so this equals _canonical of every value
+                    numbers = values.to_numpy(dtype=float, na_value=np.nan)
+                    texts.append(np.where(np.isnan(numbers), "", numbers.astype(str)).tolist())
+                else:
+                    texts.append([_canonical(value) for value in values])
+            seeds[needs_imputation] = [_record_seed(values, self.random_state) for values in zip(*texts)]
+        return seeds
+
+    def _dense_features(self, dataframe: DataFrame, seeds: np.ndarray) -> np.ndarray:
+        """
+        Unscaled dense block: binned years, imputed numerical columns and ordinal codes.
+        """
+        n_rows = len(dataframe)
+        years = self._years(dataframe)
+        year_bins = np.empty_like(years)
+        for index in range(len(self.date_columns)):
+            column_years = np.where(np.isnan(years[:, index]), self.year_means_[index], years[:, index])
+            bins = np.searchsorted(self.year_edges_[index][1:-1], column_years, side="right")
+            year_bins[:, index] = np.clip(bins, 0, self.n_year_bins - 1) + 1
+
+        numerical = dataframe[self.numerical_columns].to_numpy(dtype=float)
+        missing = np.isnan(numerical)
+        if missing.any():
+            numerical[missing] = np.broadcast_to(self.numerical_means_, numerical.shape)[missing]
+
+        ordinal = np.empty((n_rows, len(self.ordinal_columns)))
+        for index, column in enumerate(self.ordinal_columns):
+            codes = self._ordinal_codes(dataframe[column])
+            missing = codes < 0
+            frequencies = self.ordinal_frequencies_[column]
+            if missing.any() and frequencies is not None:
+                codes[missing] = _sample(frequencies, _uniforms(seeds[missing], index))
+            # nothing to sample from when the column was empty during fit
+            ordinal[:, index] = np.where(codes < 0, 0, codes)
+
+        return np.hstack([year_bins, numerical, ordinal])
+
+    def _one_hot(self, dataframe: DataFrame, seeds: np.ndarray) -> sparse.csr_matrix:
+        """
+        Sparse one-hot block of the hour periods and the nominal columns.
+        """
+        n_rows = len(dataframe)
+        rows, columns = [], []
+        offset = 0
+        for column in self.hour_columns:
+            hours = pd.to_numeric(dataframe[column], errors="coerce").to_numpy(dtype=float)
+            periods = np.searchsorted(HOUR_PERIOD_EDGES, hours, side="right")
+            # period index -> sorted one-hot column
+            positions = np.array([HOUR_PERIOD_COLUMNS.index(label) for label in HOUR_PERIOD_LABELS])[periods]
+            valid = ~np.isnan(hours) & (hours >= 0) & (hours < 24)
+            rows.append(np.flatnonzero(valid))
+            columns.append(offset + positions[valid])
+            offset += len(HOUR_PERIOD_COLUMNS)
+
+        for index, column in enumerate(self.nominal_columns, start=len(self.ordinal_columns)):
+            categories = self.nominal_categories_[column]
+            values = dataframe[column]
+            codes = pd.Categorical(values.where(values.isna(), values.astype(str)), categories=categories).codes.copy()
+            missing = values.isna().to_numpy()
+            frequencies = self.nominal_frequencies_[column]
+            if missing.any() and frequencies is not None:
+                codes[missing] = _sample(frequencies, _uniforms(seeds[missing], index))
+            # the first category is dropped, unknown categories get no column
+            keep = codes >= 1
+            rows.append(np.flatnonzero(keep))
+            columns.append(offset + codes[keep] - 1)
+            offset += max(len(categories) - 1, 0)
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+        data = np.ones(len(rows), dtype=self.dtype)
+        return sparse.csr_matrix((data, (rows, columns)), shape=(n_rows, offset), dtype=self.dtype)
+
+    def fit_chunks(self, chunks: Callable[[], Iterable[DataFrame]]) -> "SchemaPreprocessor":
+        """
+        Fit on data that is read chunk by chunk. chunks() must return a fresh iterable of DataFrames on
+        every call, it is called once per fitting pass.
+        """
+        try:
+            self._reset_statistics()
+            n_rows = 0
+            for chunk in chunks():
+                self._collect(chunk)
+                n_rows += len(chunk)
+            if n_rows == 0:
+                raise ValueError("Cannot fit the preprocessor on an empty dataset")
+            self._finish_statistics()
+
+            # scikit-learn is only needed to fit; a fitted preprocessor imports it when it is unpickled
+            from sklearn.preprocessing import StandardScaler
+
+            self.scaler_ = StandardScaler()
+            for chunk in chunks():
+                if len(chunk):
+                    self.scaler_.partial_fit(self._dense_features(chunk, self._imputation_seeds(chunk)))
+            self.is_fitted = True
+            logging.info(f"Fitted preprocessor on {n_rows} rows, {self.n_features_} output features")
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def fit(self, dataframe: DataFrame, y: Optional[pd.Series] = None) -> "SchemaPreprocessor":
+        return self.fit_chunks(lambda: [dataframe])
+
+    def transform(self, dataframe: DataFrame) -> sparse.csr_matrix:
+        """
+        Transform a frame or chunk into a float32 CSR matrix with the columns of get_feature_names_out().
+        """
+        try:
+            if not self.is_fitted:
+                raise ValueError("SchemaPreprocessor is not fitted yet")
+            seeds = self._imputation_seeds(dataframe)
+            dense = self.scaler_.transform(self._dense_features(dataframe, seeds)).astype(self.dtype)
+            one_hot = self._one_hot(dataframe, seeds)
+
+            n_dates, n_numerical = len(self.date_columns), len(self.numerical_columns)
+            n_hours = len(self.hour_columns) * len(HOUR_PERIOD_COLUMNS)
+            blocks = [
+                sparse.csr_matrix(dense[:, :n_dates]),
+                one_hot[:, :n_hours],
+                sparse.csr_matrix(dense[:, n_dates:]),
+                one_hot[:, n_hours:],
+            ]
+            return sparse.hstack(blocks, format="csr", dtype=self.dtype)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def fit_transform(self, dataframe: DataFrame, y: Optional[pd.Series] = None) -> sparse.csr_matrix:
+        return self.fit(dataframe).transform(dataframe)
+
+    def get_feature_names_out(self) -> List[str]:
+        return list(self.feature_names_)
+
+    def compile(self) -> "CompiledPreprocessor":
+        """
+        Single-record fast path of the fitted preprocessor, see CompiledPreprocessor.
+        """
+        return CompiledPreprocessor(self)
+
+    @property
+    def n_features_(self) -> int:
+        return len(self.feature_names_)
+
+
+class CompiledPreprocessor:
+    """
+    Class Name :   CompiledPreprocessor
+    Description :  Single-record fast path of a fitted SchemaPreprocessor. The fitted state is turned once
+                   into lookup tables (ordinal and one-hot category -> output column, year bin edges, hour
+                   periods, imputation values and scaler coefficients), and a record (a dict of column ->
+                   value) is written straight into a preallocated float32 vector, without pandas.
+
+                   transform_record(record) equals the row of the record in preprocessor.transform of any
+                   frame, including the random-sample imputation: both draw the sample of a missing value
+                   from the seed hashed from the record (_record_seed) and the position of the column.
+    """
+
+    def __init__(self, preprocessor: SchemaPreprocessor):
+        if not preprocessor.is_fitted:
+            raise ValueError("Only a fitted SchemaPreprocessor can be compiled")
+        self.input_columns = preprocessor.input_columns
+        self.n_features = preprocessor.n_features_
+        self.dtype = preprocessor.dtype
+        self.n_year_bins = preprocessor.n_year_bins
+        self.random_state = preprocessor.random_state
+
+        n_dates = len(preprocessor.date_columns)
+        n_hour_features = len(preprocessor.hour_columns) * len(HOUR_PERIOD_COLUMNS)
+        n_scaled = n_dates + len(preprocessor.numerical_columns) + len(preprocessor.ordinal_columns)
+        # output position of every scaled value: dates first, numerical and ordinal after the hour one-hots
+        self._scaled_positions = np.array(list(range(n_dates))
+                                          + [n_hour_features + index for index in range(n_dates, n_scaled)])
+        self._scaler_mean = preprocessor.scaler_.mean_
+        self._scaler_scale = preprocessor.scaler_.scale_
+
+        self._dates = [(column, preprocessor.year_edges_[index][1:-1].tolist(), preprocessor.year_means_[index])
+                       for index, column in enumerate(preprocessor.date_columns)]
+        period_positions = [HOUR_PERIOD_COLUMNS.index(label) for label in HOUR_PERIOD_LABELS]
+        self._hours = [(column, [n_dates + index * len(HOUR_PERIOD_COLUMNS) + position
+                                 for position in period_positions])
+                       for index, column in enumerate(preprocessor.hour_columns)]
+        self._numerical = list(zip(preprocessor.numerical_columns, preprocessor.numerical_means_.tolist()))
+        self._ordinals = [(column, {category: code for code, category in enumerate(categories)},
+                           _sampling_cdf(preprocessor.ordinal_frequencies_[column]))
+                          for column, categories in preprocessor.ordinal_categories.items()]
+
+        self._nominals = []
+        offset = n_dates + n_hour_features + len(preprocessor.numerical_columns) + len(preprocessor.ordinal_columns)
+        for column in preprocessor.nominal_columns:
+            categories = preprocessor.nominal_categories_[column]
+            # the first category is dropped: it has no output column
+            positions = [None] + [offset + code - 1 for code in range(1, len(categories))]
+            self._nominals.append((column, {category: positions[code] for code, category in enumerate(categories)},
+                                   positions, _sampling_cdf(preprocessor.nominal_frequencies_[column])))
+            offset += max(len(categories) - 1, 0)
+
+    def transform_record(self, record: dict, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Feature vector of one record, written into out (a float32 vector of n_features) when given.
+        """
+        if out is None:
+            out = np.zeros(self.n_features, dtype=self.dtype)
+        else:
+            out[:] = 0
+        scaled = []
+        for column, inner_edges, year_mean in self._dates:
+            year = _year(record.get(column))
+            if year != year:
+                year = year_mean
+            scaled.append(min(bisect_right(inner_edges, year), self.n_year_bins - 1) + 1)
+        for column, positions in self._hours:
+            hour = _number(record.get(column))
+            if 0 <= hour < 24:
+                out[positions[bisect_right(HOUR_PERIOD_EDGES, hour)]] = 1
+        for column, mean in self._numerical:
+            value = _number(record.get(column))
+            scaled.append(mean if value != value else value)
+
+        # hashed only for the records that have a value to impute
+        seed = None
+        for index, (column, codes, cdf) in enumerate(self._ordinals):
+            code = _lookup(codes, record.get(column), -1)
+            if code < 0:
+                if cdf is not None:
+                    if seed is None:
+                        seed = self._record_seed(record)
+                    code = min(bisect_right(cdf, _uniform(seed, index)), len(cdf) - 1)
+                else:
+                    code = 0
+            scaled.append(code)
+        out[self._scaled_positions] = (np.array(scaled) - self._scaler_mean) / self._scaler_scale
+
+        for index, (column, category_positions, positions, cdf) in enumerate(self._nominals,
+                                                                            start=len(self._ordinals)):
+            value = record.get(column)
+            if _missing(value):
+                if cdf is None:
+                    continue
+                if seed is None:
+                    seed = self._record_seed(record)
+                position = positions[min(bisect_right(cdf, _uniform(seed, index)), len(cdf) - 1)]
+            else:
+                # unknown categories get no column
+                position = category_positions.get(str(value))
+            if position is not None:
+                out[position] = 1
+        return out
+
+    def _record_seed(self, record: dict) -> int:
+        return _record_seed([_canonical(record.get(column)) for column in self.input_columns], self.random_state)
+
+    def transform_records(self, records: List[dict]) -> np.ndarray:
+        """
+        Dense float32 feature matrix of records, every row transformed as a single record.
+        """
+        features = np.empty((len(records), self.n_features), dtype=self.dtype)
+        for index, record in enumerate(records):
+            self.transform_record(record, out=features[index])
+        return features
+
+    def verify(self, preprocessor: SchemaPreprocessor, dataframe: DataFrame) -> int:
+        """
+        Check every row of dataframe against its row in preprocessor.transform of the whole frame, as batch
+        prediction transforms it; raises a ValueError naming the first row and features that differ,
+        returns the number of rows checked.
+        """
+        expected_features = preprocessor.transform(dataframe).toarray()
+        for index, record in enumerate(dataframe.to_dict("records")):
+            expected = expected_features[index]
+            actual = self.transform_record(record)
+            if not np.array_equal(expected, actual):
+                names = np.asarray(preprocessor.get_feature_names_out())[expected != actual]
+                raise ValueError(f"Compiled preprocessor differs from transform on row {index}: {list(names)}")
+        return len(dataframe)
+
+
+def _sampling_cdf(frequencies: Optional[np.ndarray]) -> Optional[List[float]]:
+    # a category is sampled by searching a uniform number in the normalised cumulative sum
+    if frequencies is None:
+        return None
+    cdf = np.asarray(frequencies, dtype=float).cumsum()
+    cdf /= cdf[-1]
+    return cdf.tolist()
+
+
+def _sample(frequencies: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+    """
+    Category codes drawn with the given frequencies, one per uniform number (vectorised bisect_right
+    on _sampling_cdf, as CompiledPreprocessor samples).
+    """
+    cdf = np.asarray(_sampling_cdf(frequencies))
+    return np.minimum(np.searchsorted(cdf, uniforms, side="right"), len(cdf) - 1)
+
+
+def _canonical(value) -> str:
+    """
+    Text of one input value for _record_seed: numbers as the repr of their float, so 3, 3.0 and
+    np.int64(3) are the same value, missing values as an empty string
+    """
+    if _missing(value):
+        return ""
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+        return repr(float(value))
+    return str(value)
+
+
+def _record_seed(values: Iterable[str], random_state: int) -> int:
+    """
+    64-bit imputation seed of a record from the _canonical text of its input columns
+    """
+    digest = hashlib.blake2b("\x1f".join(values).encode(), digest_size=8, key=str(random_state).encode())
+    return int.from_bytes(digest.digest(), "little")
+
+
+_UINT64_MASK = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def _uniform(seed: int, index: int) -> float:
+    """
+    Uniform number in [0, 1) of the imputed column at index for a record seed (splitmix64)
+    """
+    z = (seed + (index + 1) * _GOLDEN_GAMMA) & _UINT64_MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _UINT64_MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _UINT64_MASK
+    z ^= z >> 31
+    return (z >> 11) / float(1 << 53)
+
+
+def _uniforms(seeds: np.ndarray, index: int) -> np.ndarray:
+    """
+    _uniform of every seed in an uint64 array
+    """
+    with np.errstate(over="ignore"):
+        z = seeds.astype(np.uint64) + np.uint64(((index + 1) * _GOLDEN_GAMMA) & _UINT64_MASK)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _missing(value) -> bool:
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+
+def _lookup(table: dict, value, default):
+    try:
+        return table.get(value, default)
+    except TypeError:
+        return default
+
+
+def _number(value) -> float:
+    """
+    value as a float, NaN when missing or not numeric (pd.to_numeric(errors="coerce") of one value)
+    """
+    if _missing(value):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _year(value) -> float:
+    """
+    Year of a date value, NaN when missing or not a date (pd.to_datetime(errors="coerce") of one value)
+    """
+    if _missing(value):
+        return np.nan
+    if (isinstance(value, str) and len(value) >= 10 and value[4] == "-" and value[7] == "-"
+            and (len(value) == 10 or value[10] in " T")):
+        try:
+            return float(datetime.date.fromisoformat(value[:10]).year)
+        except ValueError:
+            pass
+    year = pd.to_datetime(pd.Series([value]), errors="coerce").dt.year.iloc[0]
+    return float(year)
+
+
+class InsuranceFraudModel:
+    """
+    Class Name :   InsuranceFraudModel
+    Description :  Trained model bundled with its fitted preprocessor, so predictions are made on raw
+                   feature dataframes. predict returns 1 for fraud and 0 otherwise.
+    """
+
+    def __init__(self, preprocessing_object: SchemaPreprocessor, trained_model_object: object):
+        self.preprocessing_object = preprocessing_object
+        self.trained_model_object = trained_model_object
+
+    def predict(self, dataframe: DataFrame) -> np.ndarray:
+        try:
+            logging.info("Using the trained model to get predictions")
+            transformed_feature = self.preprocessing_object.transform(dataframe)
+            return self.trained_model_object.predict(_model_input(self.trained_model_object, transformed_feature))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict_proba(self, dataframe: DataFrame) -> np.ndarray:
+        """
+        Fraud probability of every row
+        """
+        try:
+            transformed_feature = self.preprocessing_object.transform(dataframe)
+            return self.trained_model_object.predict_proba(
+                _model_input(self.trained_model_object, transformed_feature))[:, 1]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict_with_proba(self, dataframe: DataFrame) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Predictions and fraud probabilities (None when the model has no predict_proba) of every row,
+        transforming the dataframe only once
+        """
+        try:
+            return self._predict_features(self.preprocessing_object.transform(dataframe))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict_records_with_proba(self, records: List[dict]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        predict_with_proba for records (dicts of column -> value) on the compiled preprocessor: every
+        record is transformed as if it were scored alone, without building a DataFrame
+        """
+        try:
+            return self._predict_features(self.compile().transform_records(records))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def compile(self) -> CompiledPreprocessor:
+        """
+        Compiled preprocessor of the model, built on first use
+        """
+        if getattr(self, "_compiled_preprocessor", None) is None:
+            self._compiled_preprocessor = self.preprocessing_object.compile()
+        return self._compiled_preprocessor
+
+    def _predict_features(self, features) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        model_input = _model_input(self.trained_model_object, features)
+        labels = self.trained_model_object.predict(model_input)
+        probabilities = None
+        if hasattr(self.trained_model_object, "predict_proba"):
+            probabilities = self.trained_model_object.predict_proba(model_input)[:, 1]
+        return labels, probabilities
+
+    def __getstate__(self):
+        # the compiled preprocessor is derived from the fitted one, it is rebuilt after loading
+        state = self.__dict__.copy()
+        state.pop("_compiled_preprocessor", None)
+        return state
+
+    def __repr__(self):
+        return f"{type(self.trained_model_object).__name__}()"
+
+    def __str__(self):
+        return f"{type(self.trained_model_object).__name__}()"
+
+
+def _model_input(model: object, features: sparse.csr_matrix):
+    """
+    Models are trained on the dense transformed arrays; hand them dense rows as well.
+    """
+    return features.toarray() if sparse.issparse(features) else features
@@ -1,21 +1,77 @@
+import atexit
 import logging
 import os
+import sys
+import threading
 from datetime import datetime
-from from_root import from_root
+from typing import Optional
 
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"  # Creates a timestamped log filename
+from insurance_fraud_detection.constants import (LOG_DIR, LOG_LEVEL, LOG_LEVEL_ENV, LOG_MODULE_LEVELS,
+                                                 LOG_MODULE_LEVELS_ENV, LOG_QUEUE_SIZE, LOG_RATE_LIMIT_INTERVAL,
+                                                 LOG_RATE_LIMIT_RECORDS)
+from insurance_fraud_detection.logger.json_logging import QueueLogging
 
-log_dir = 'logs'  # Directory for logs
+# Importing the package has no side effects: the log file, its directory and the writer thread are
+# created by init_logging(), which every entry point (main.py, app.py, the stage and CLI scripts) calls
+# first. Modules must not log at import time: a logging.info() call before init_logging() makes the
+# logging module run basicConfig(), which init_logging() then has to take out again.
+queue_logging: Optional[QueueLogging] = None
+_init_lock = threading.Lock()
 
-# Correct way to join paths: first get the root path, then join with log_dir and LOG_FILE
-logs_path = os.path.join(from_root(), log_dir, LOG_FILE)
 
-# Ensure the log directory exists before logging starts
-os.makedirs(os.path.join(from_root(), log_dir), exist_ok=True)
+def _remove_implicit_handlers() -> None:
+    """
+    Remove the stderr handler that logging.basicConfig() adds to the root logger when a record is logged
+    through the module-level functions before any handler exists; it would write every record to stderr
+    synchronously next to the queue handler.
+    """
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if (type(handler) is logging.StreamHandler and handler.stream is sys.stderr
+                and handler.formatter is not None and handler.formatter._fmt == logging.BASIC_FORMAT):
+            root_logger.removeHandler(handler)
 
-logging.basicConfig(
-    filename=logs_path,
-    format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    datefmt="%m/%d/%Y %I:%M:%S %p"
-)
+
+def _module_levels() -> dict:
+    """
+    Per-module levels of the constants, overridden by e.g.
+    LOG_MODULE_LEVELS="insurance_fraud_detection.data_access=DEBUG,uvicorn=WARNING"
+    """
+    module_levels = dict(LOG_MODULE_LEVELS)
+    for item in os.environ.get(LOG_MODULE_LEVELS_ENV, "").split(","):
+        if "=" in item:
+            module, level = item.split("=", 1)
+            module_levels[module.strip()] = level.strip().upper()
+    return {module: logging.getLevelName(level) for module, level in module_levels.items()}
+
+
+def init_logging() -> QueueLogging:
+    """
+    Start writing the records of the process as JSON lines to a timestamped file under LOG_DIR of the
+    project root, from a background thread (see QueueLogging). Safe to call more than once: the first
+    call configures logging, later calls return the running QueueLogging. A stderr handler left by an
+    implicit basicConfig() is removed first.
+    """
+    global queue_logging
+    with _init_lock:
+        if queue_logging is None:
+            from from_root import from_root
+
+            root_dir = str(from_root())
+            log_dir = os.path.join(root_dir, LOG_DIR)
+            # Ensure the log directory exists before logging starts
+            os.makedirs(log_dir, exist_ok=True)
+            log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"  # Creates a timestamped log filename
+
+            _remove_implicit_handlers()
+            queue_logging = QueueLogging(
+                file_path=os.path.join(log_dir, log_file),
+                root_dir=root_dir,
+                level=logging.getLevelName(os.environ.get(LOG_LEVEL_ENV, LOG_LEVEL).upper()),
+                module_levels=_module_levels(),
+                queue_size=LOG_QUEUE_SIZE,
+                rate_limit_records=LOG_RATE_LIMIT_RECORDS,
+                rate_limit_interval=LOG_RATE_LIMIT_INTERVAL,
+            ).start()
+            atexit.register(queue_logging.stop)
+        return queue_logging
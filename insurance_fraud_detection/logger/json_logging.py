@@ -0,0 +1,230 @@
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Optional
+
+
+# attributes every LogRecord has; anything else on a record was passed with extra= and is kept as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+@lru_cache(maxsize=4096)
+def module_name(pathname: str, root_dir: str) -> str:
+    """
+    Dotted module name of a source file under root_dir, e.g. insurance_fraud_detection.data_access.data
+    """
+    relative_path = os.path.relpath(os.path.splitext(pathname)[0], root_dir)
+    if relative_path.startswith(".."):
+        return os.path.basename(relative_path)
+    return relative_path.replace(os.sep, ".")
+
+
+def record_module(record: logging.LogRecord, root_dir: str) -> str:
+    """
+    Module a record belongs to: its logger name for named loggers and, as the package logs through the
+    root logger, the module of the calling file otherwise
+    """
+    if record.name != "root":
+        return record.name
+    return module_name(record.pathname, root_dir)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Class Name :   JsonFormatter
+    Description :  Formats a record as one JSON object per line with the time, level, module, call site,
+                   message, the fields passed with extra= and the formatted exception, if any.
+    """
+
+    def __init__(self, root_dir: str):
+        super().__init__()
+        self.root_dir = root_dir
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "module": record_module(record, self.root_dir),
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Class Name :   ModuleLevelFilter
+    Description :  Applies a level per module: the level of the longest configured prefix of a record's
+                   module (e.g. "insurance_fraud_detection.data_access"), the default level otherwise.
+    """
+
+    def __init__(self, default_level: int, module_levels: Dict[str, int], root_dir: str):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+        self.root_dir = root_dir
+        self._levels: Dict[str, int] = {}
+
+    def level_of(self, module: str) -> int:
+        level = self._levels.get(module)
+        if level is None:
+            level = self.default_level
+            prefixes = [prefix for prefix in self.module_levels
+                        if module == prefix or module.startswith(prefix + ".")]
+            if prefixes:
+                level = self.module_levels[max(prefixes, key=len)]
+            self._levels[module] = level
+        return level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.level_of(record_module(record, self.root_dir))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Class Name :   RateLimitFilter
+    Description :  Lets at most max_records records per call site (file and line) through every interval
+                   seconds, so a message logged in a hot loop cannot flood the log. Records at max_level and
+                   above are never limited. The next record let through from a call site carries the number
+                   of records suppressed before it in its `suppressed` field.
+    """
+
+    def __init__(self, max_records: int = 20, interval: float = 1.0, max_level: int = logging.ERROR):
+        super().__init__()
+        self.max_records = max_records
+        self.interval = interval
+        self.max_level = max_level
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_records <= 0 or record.levelno >= self.max_level:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(site)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = 0 if window is None else window[2]
+                self._windows[site] = [now, 1, 0]
+            elif window[1] < self.max_records:
+                window[1] += 1
+                suppressed = window[2]
+                window[2] = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Class Name :   AsyncQueueHandler
+    Description :  Puts records on a bounded queue drained by a QueueListener on a background writer thread,
+                   so the calling thread never waits for formatting or disk I/O. Unlike QueueHandler the
+                   message is not formatted before the record is queued: msg % args is evaluated by the
+                   writer thread, so log with logging.info("... %s", value) rather than f-strings (args
+                   should not be mutated after the call). The queue is a lock-free SimpleQueue bounded by
+                   max_size: when it is full records are dropped and counted instead of blocking; the next
+                   queued record carries the count in `dropped`.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int = 10_000):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        self.queue.put_nowait(record)
+
+
+class QueueLogging:
+    """
+    Class Name :   QueueLogging
+    Description :  Wires the root logger to a file written by a background thread: root logger ->
+                   AsyncQueueHandler (module levels and rate limit applied in the calling thread) -> queue ->
+                   QueueListener -> FileHandler with JsonFormatter. A forked child process (the worker
+                   pools of the pipeline) gets its own queue and writer thread, appending to the same file.
+    """
+
+    def __init__(self, file_path: str, root_dir: str, level: int = logging.INFO,
+                 module_levels: Optional[Dict[str, int]] = None, queue_size: int = 10_000,
+                 rate_limit_records: int = 20, rate_limit_interval: float = 1.0):
+        self.file_path = file_path
+        self.root_dir = root_dir
+        self.level = level
+        self.module_levels = module_levels or {}
+        self.queue_size = queue_size
+        self.file_handler = logging.FileHandler(file_path, delay=True)
+        self.file_handler.setFormatter(JsonFormatter(root_dir))
+        self.queue_handler = AsyncQueueHandler(queue.SimpleQueue(), max_size=queue_size)
+        if self.module_levels:
+            # without module levels the level of the root logger is all there is to check
+            self.queue_handler.addFilter(ModuleLevelFilter(level, self.module_levels, root_dir))
+        if rate_limit_records > 0:
+            self.queue_handler.addFilter(RateLimitFilter(rate_limit_records, rate_limit_interval))
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def start(self) -> "QueueLogging":
+        root_logger = logging.getLogger()
+        # records of modules configured below the default level must get past the root logger
+        root_logger.setLevel(min([self.level, *self.module_levels.values()]))
+        root_logger.addHandler(self.queue_handler)
+        self._start_listener()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_in_child)
+        # multiprocessing children end with os._exit, which skips atexit: flush the queue on their exit
+        multiprocessing.util.register_after_fork(self, QueueLogging._register_finalizer)
+        return self
+
+    def _register_finalizer(self) -> None:
+        multiprocessing.util.Finalize(self, self.stop, exitpriority=0)
+
+    def _start_listener(self) -> None:
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, self.file_handler,
+                                                       respect_handler_level=True)
+        self.listener.start()
+
+    def _restart_in_child(self) -> None:
+        # the writer thread of the parent does not exist in a forked child
+        self.queue_handler.queue = queue.SimpleQueue()
+        self.queue_handler.dropped = 0
+        self._start_listener()
+
+    def stop(self) -> None:
+        """
+        Write the queued records and stop the writer thread
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.file_handler.close()
@@ -0,0 +1,310 @@
+"""
+Batch scoring of the whole claims book.
+
+    python -m insurance_fraud_detection.pipeline.batch_prediction_pipeline \
+        --source feature_store --input artifacts/data_ingestion/feature_store/raw_data.parquet \
+        --output artifacts/batch_prediction/predictions [--resume]
+
+Rows are streamed in chunks from a feature store (parquet or csv) or from the MySQL table, scored on a
+pool of worker processes that each load the model once, and written as one parquet part per chunk
+(part-00000.parquet, ...). Every finished chunk is appended to _progress.jsonl with its row count,
+key range and throughput, so a run that stopped on a failed chunk is continued with --resume.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from insurance_fraud_detection.constants import (BATCH_PREDICTION_PROGRESS_FILE_NAME, BATCH_PREDICTION_RUN_FILE_NAME,
+                                                 TARGET_COLUMN)
+from insurance_fraud_detection.data_access.data import InsuranceData
+from insurance_fraud_detection.data_access.feature_store import PART_FILE_TEMPLATE, FeatureStore
+from insurance_fraud_detection.entity.config_entity import BatchPredictionConfig
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.utils.main_utils import load_model_artifact, read_model_manifest
+
+
+# model of a scoring worker, loaded once per process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_file_path: str) -> None:
+    global _worker_model
+    _worker_model = load_model_artifact(model_file_path, mmap_mode="r")
+
+
+def _score_chunk(chunk_index: int, dataframe: pd.DataFrame, output_file_path: str,
+                 key_column: str) -> dict:
+    """
+    Score one chunk and write it as a parquet part; runs in a worker process.
+    """
+    start = time.perf_counter()
+    labels, probabilities = _worker_model.predict_with_proba(dataframe)
+    labels = np.asarray(labels)
+    columns = {
+        key_column: pa.array(dataframe[key_column].to_numpy(), type=pa.int64()),
+        TARGET_COLUMN: pa.array(np.where(labels == 1, "Y", "N"), type=pa.string()),
+        "fraud_probability": pa.array(probabilities if probabilities is not None else [None] * len(labels),
+                                      type=pa.float64()),
+    }
+    table = pa.table(columns)
+    # write to a temporary name first so a crash never leaves a truncated part behind
+    tmp_path = output_file_path + ".tmp"
+    pq.write_table(table, tmp_path, compression="snappy")
+    os.replace(tmp_path, output_file_path)
+    seconds = time.perf_counter() - start
+    return {
+        "chunk": chunk_index,
+        "rows": len(dataframe),
+        "first_key": int(dataframe[key_column].iloc[0]),
+        "last_key": int(dataframe[key_column].iloc[-1]),
+        "file": os.path.basename(output_file_path),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(len(dataframe) / seconds, 1) if seconds > 0 else None,
+    }
+
+
+class _Done:
+    """
+    Result holder with the Future interface, used when scoring runs in-process (n_jobs=1).
+    """
+
+    def __init__(self, function, args):
+        try:
+            self._result, self._error = function(*args), None
+        except Exception as e:
+            self._result, self._error = None, e
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class BatchPrediction:
+    """
+    Class Name :   BatchPrediction
+    Description :  Scores a feature store or the MySQL table chunk by chunk on worker processes and
+                   writes the predictions as parquet parts, resumable from its progress file.
+    """
+
+    def __init__(self, batch_prediction_config: BatchPredictionConfig = BatchPredictionConfig()):
+        try:
+            self.batch_prediction_config = batch_prediction_config
+            config = batch_prediction_config
+            if config.source not in ("feature_store", "mysql"):
+                raise ValueError(f"Unsupported batch prediction source: {config.source}")
+            self.n_jobs = config.n_jobs if config.n_jobs > 0 else (os.cpu_count() or 1)
+            self.progress_file_path = os.path.join(config.output_dir, BATCH_PREDICTION_PROGRESS_FILE_NAME)
+            self.run_file_path = os.path.join(config.output_dir, BATCH_PREDICTION_RUN_FILE_NAME)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run_settings(self) -> dict:
+        """
+        What a resumed run must share with the run it continues: the model and the chunking of the source.
+        """
+        config = self.batch_prediction_config
+        return {
+            "model_sha256": read_model_manifest(config.model_file_path)["sha256"],
+            "source": config.source,
+            "input": config.input_file_path if config.source == "feature_store" else config.table_name,
+            "chunk_size": config.chunk_size,
+            "key_column": config.key_column,
+        }
+
+    def read_progress(self) -> Dict[int, dict]:
+        """
+        Finished chunks of the output directory whose part file exists, by chunk index.
+        """
+        progress = {}
+        if os.path.exists(self.progress_file_path):
+            with open(self.progress_file_path) as file_obj:
+                for line in file_obj:
+                    if line.strip():
+                        report = json.loads(line)
+                        progress[report["chunk"]] = report
+        return {index: report for index, report in progress.items()
+                if os.path.exists(os.path.join(self.batch_prediction_config.output_dir, report["file"]))}
+
+    def prepare_output(self, resume: bool) -> Dict[int, dict]:
+        """
+        Start a fresh output directory, or check that the existing one was written by the same model
+        and chunking when resuming; returns the chunks already done.
+        """
+        output_dir = self.batch_prediction_config.output_dir
+        settings = self.run_settings()
+        if resume and os.path.exists(self.run_file_path):
+            with open(self.run_file_path) as file_obj:
+                previous = json.load(file_obj)
+            if previous != settings:
+                raise ValueError(f"Cannot resume {output_dir}: it was written with {previous}, "
+                                 f"this run uses {settings}. Rerun without --resume.")
+            done = self.read_progress()
+            logging.info(f"Resuming batch prediction in {output_dir}: {len(done)} chunks already scored")
+            return done
+        os.makedirs(output_dir, exist_ok=True)
+        # only files of a previous run are removed, never anything else in the directory
+        for name in os.listdir(output_dir):
+            if name.startswith("part-") or name in (BATCH_PREDICTION_PROGRESS_FILE_NAME,
+                                                    BATCH_PREDICTION_RUN_FILE_NAME):
+                os.remove(os.path.join(output_dir, name))
+        with open(self.run_file_path, "w") as file_obj:
+            json.dump(settings, file_obj, indent=2)
+        return {}
+
+    def iter_chunks(self, done: Dict[int, dict]) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """
+        Chunks of the source with their index. MySQL rows are read ordered by the key column, so a
+        resumed run starts after the last key of the leading finished chunks instead of re-reading them.
+        """
+        config = self.batch_prediction_config
+        if config.source == "feature_store":
+            chunks = FeatureStore(config.input_file_path).iter_batches(batch_size=config.chunk_size)
+            yield from enumerate(chunks)
+            return
+
+        first_index = 0
+        while first_index in done:
+            first_index += 1
+        watermark_value = done[first_index - 1]["last_key"] if first_index else None
+        chunks = InsuranceData().export_collection_as_dataframe_chunks(
+            table_name=config.table_name, chunk_size=config.chunk_size,
+            watermark_column=config.key_column, watermark_value=watermark_value)
+        for offset, chunk in enumerate(chunks):
+            yield first_index + offset, chunk
+
+    def initiate_batch_prediction(self, resume: bool = False) -> dict:
+        """
+        Method Name :   initiate_batch_prediction
+        Description :   This method scores the whole source. Up to 2 chunks per worker are in flight, so
+                        memory stays bounded by the chunk size. When a chunk fails no new chunks are
+                        started, the running ones are finished and recorded, and the error is raised.
+
+        Output      :   Returns the run summary (rows, chunks, throughput)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.debug("Entered initiate_batch_prediction method of BatchPrediction class")
+        try:
+            config = self.batch_prediction_config
+            done = self.prepare_output(resume)
+            source_name = config.input_file_path if config.source == "feature_store" else config.table_name
+            logging.info(f"Scoring {config.source} '{source_name}' in chunks of {config.chunk_size} rows "
+                         f"on {self.n_jobs} workers")
+
+            executor = None
+            if self.n_jobs > 1:
+                executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                               initargs=(config.model_file_path,))
+            else:
+                _init_worker(config.model_file_path)
+
+            start = time.perf_counter()
+            n_rows = n_chunks = n_skipped = 0
+            running: Dict[Future, int] = {}
+            failure: Optional[Tuple[int, Exception]] = None
+
+            def collect(block: bool) -> None:
+                nonlocal n_rows, n_chunks, failure
+                if not running:
+                    return
+                finished, _ = (wait(list(running), return_when=FIRST_COMPLETED) if block and executor
+                               else (list(running), None))
+                for future in finished:
+                    chunk_index = running.pop(future)
+                    try:
+                        report = future.result()
+                    except Exception as e:
+                        logging.error("Chunk %d failed: %s", chunk_index, e)
+                        if failure is None:
+                            failure = (chunk_index, e)
+                        continue
+                    with open(self.progress_file_path, "a") as file_obj:
+                        file_obj.write(json.dumps(report) + "\n")
+                    n_rows += report["rows"]
+                    n_chunks += 1
+                    logging.info("Chunk %d scored", chunk_index, extra=report)
+
+            try:
+                for chunk_index, chunk in self.iter_chunks(done):
+                    if chunk_index in done:
+                        previous = done[chunk_index]
+                        if (len(chunk) != previous["rows"]
+                                or int(chunk[config.key_column].iloc[0]) != previous["first_key"]):
+                            raise ValueError(f"Chunk {chunk_index} of the source changed since it was scored; "
+                                             f"rerun without --resume")
+                        n_skipped += 1
+                        continue
+                    output_file_path = os.path.join(config.output_dir, PART_FILE_TEMPLATE.format(chunk_index))
+                    args = (chunk_index, chunk, output_file_path, config.key_column)
+                    if executor is None:
+                        running[_Done(_score_chunk, args)] = chunk_index
+                    else:
+                        running[executor.submit(_score_chunk, *args)] = chunk_index
+                    while len(running) >= 2 * self.n_jobs or (executor is None and running):
+                        collect(block=True)
+                    if failure is not None:
+                        break
+                while running:
+                    collect(block=True)
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+
+            elapsed = time.perf_counter() - start
+            summary = {
+                "output_dir": config.output_dir,
+                "rows": n_rows,
+                "chunks": n_chunks,
+                "skipped_chunks": n_skipped,
+                "seconds": round(elapsed, 2),
+                "rows_per_sec": round(n_rows / elapsed, 1) if elapsed > 0 else None,
+            }
+            if failure is not None:
+                chunk_index, error = failure
+                raise RuntimeError(f"Chunk {chunk_index} failed ({error}); {n_chunks} chunks were scored, "
+                                   f"rerun with --resume to continue") from error
+            logging.info(f"Batch prediction finished: {summary}")
+            return summary
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+def main(argv=None) -> dict:
+    defaults = BatchPredictionConfig()
+    parser = argparse.ArgumentParser(description="Score the claims book in parallel chunks")
+    parser.add_argument("--source", choices=["feature_store", "mysql"], default=defaults.source)
+    parser.add_argument("--input", default=defaults.input_file_path,
+                        help="feature store (parquet directory or csv file) for --source feature_store")
+    parser.add_argument("--table", default=defaults.table_name, help="MySQL table for --source mysql")
+    parser.add_argument("--output", default=defaults.output_dir, help="directory of the parquet parts")
+    parser.add_argument("--model", default=defaults.model_file_path)
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size)
+    parser.add_argument("--workers", type=int, default=defaults.n_jobs, help="0 = one per CPU")
+    parser.add_argument("--key-column", default=defaults.key_column)
+    parser.add_argument("--resume", action="store_true",
+                        help="continue a previous run in --output instead of starting over")
+    args = parser.parse_args(argv)
+    init_logging()
+
+    config = BatchPredictionConfig(output_dir=args.output, model_file_path=args.model, source=args.source,
+                                   input_file_path=args.input, table_name=args.table,
+                                   chunk_size=args.chunk_size, n_jobs=args.workers, key_column=args.key_column)
+    logging.info(f"Batch prediction config: {asdict(config)}")
+    summary = BatchPrediction(batch_prediction_config=config).initiate_batch_prediction(resume=args.resume)
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel, create_model, root_validator
+
+from insurance_fraud_detection.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from insurance_fraud_detection.entity.config_entity import InsuranceFraudPredictorConfig
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import load_model_artifact, read_model_manifest, read_yaml_file
+from insurance_fraud_detection.utils.model_registry import ModelRegistry, ModelRegistryWatcher
+from insurance_fraud_detection.utils.prediction_cache import PredictionCache
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+
+SCHEMA_TYPES = {"int64": int, "float64": float, "object": str}
+
+
+def build_claim_model(schema_config: dict, required_columns: List[str]) -> Type[BaseModel]:
+    """
+    Pydantic model of one claim built from schema.yaml: a field per column (except the target) typed
+    from `columns`, with the `allowed_values` and `value_ranges` checks of the schema. The columns the
+    model reads are required but may be null (missing values are imputed), all others are optional.
+    """
+    fields = {}
+    for column, dtype in schema_config["columns"].items():
+        if column == TARGET_COLUMN:
+            continue
+        default = ... if column in required_columns else None
+        fields[column] = (Optional[SCHEMA_TYPES.get(dtype, str)], default)
+
+    allowed_values = {column: {str(value) for value in values}
+                      for column, values in schema_config.get("allowed_values", {}).items() if column in fields}
+    value_ranges = {column: bounds for column, bounds in schema_config.get("value_ranges", {}).items()
+                    if column in fields}
+
+    def check_schema_domains(cls, values):
+        errors = []
+        for column, allowed in allowed_values.items():
+            value = values.get(column)
+            if value is not None and str(value) not in allowed:
+                errors.append(f"{column}: {value!r} is not one of the allowed values")
+        for column, (lower, upper) in value_ranges.items():
+            value = values.get(column)
+            if value is None:
+                continue
+            if (lower is not None and value < lower) or (upper is not None and value > upper):
+                errors.append(f"{column}: {value} is outside [{lower}, {upper}]")
+        if errors:
+            raise ValueError("; ".join(errors))
+        return values
+
+    # schema column names such as capital-gains are not identifiers, so fields are built dynamically
+    return create_model(
+        "InsuranceClaim",
+        __validators__={"check_schema_domains": root_validator(skip_on_failure=True, allow_reuse=True)(
+            check_schema_domains)},
+        **fields,
+    )
+
+
+class InsuranceFraudClassifier:
+    """
+    Class Name :   InsuranceFraudClassifier
+    Description :  Loads the trained InsuranceFraudModel (preprocessor + model) once and scores claims,
+                   remembering recent results in a PredictionCache keyed by the claim and the model version.
+                   The production bundle of the model registry is served when there is one; watch() reloads
+                   it in the background whenever another bundle is promoted. The loaded model and its version
+                   are swapped as one reference, so a batch that is being scored finishes on the model it
+                   started with and no request is dropped during a reload.
+    """
+
+    def __init__(self, prediction_pipeline_config: InsuranceFraudPredictorConfig = InsuranceFraudPredictorConfig()):
+        try:
+            self.prediction_pipeline_config = prediction_pipeline_config
+            self.schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self.model_registry = ModelRegistry(registry_dir=prediction_pipeline_config.model_registry_dir)
+            # (model, version) of the model being served
+            self._served: Optional[Tuple[object, str]] = None
+            self._load_lock = threading.Lock()
+            self.model_file_path: Optional[str] = None
+            self.cache = None
+            if prediction_pipeline_config.cache_size > 0:
+                self.cache = PredictionCache(max_size=prediction_pipeline_config.cache_size,
+                                             ttl_seconds=prediction_pipeline_config.cache_ttl_seconds)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def model(self):
+        return None if self._served is None else self._served[0]
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return None if self._served is None else self._served[1]
+
+    def load(self, version: Optional[str] = None) -> "InsuranceFraudClassifier":
+        """
+        Load a bundle of the model registry (the production one unless version is given), or the model
+        artifact of the config when nothing was promoted yet, memory-mapping its arrays. The model is
+        loaded and compiled before it replaces the served one.
+        """
+        try:
+            with self._load_lock:
+                version = version or self.model_registry.current_version()
+                if version is not None:
+                    model_file_path = self.model_registry.model_file_path(version)
+                else:
+                    model_file_path = self.prediction_pipeline_config.model_file_path
+                    version = read_model_manifest(model_file_path)["sha256"]
+                if self.model_version == version:
+                    return self
+                model = load_model_artifact(model_file_path, mmap_mode="r")
+                model.compile()
+                self._served = (model, version)
+                self.model_file_path = model_file_path
+                if self.cache is not None:
+                    # results of the previous model must not be served for the new one
+                    self.cache.invalidate(version)
+            logging.info(f"Loaded model {model} ({version[:12]}) from {model_file_path}")
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def watch(self) -> Optional[ModelRegistryWatcher]:
+        """
+        Start reloading the model whenever the production bundle of the registry changes;
+        None when reloading is disabled
+        """
+        poll_seconds = self.prediction_pipeline_config.reload_poll_seconds
+        if poll_seconds <= 0:
+            return None
+        return ModelRegistryWatcher(self.model_registry, on_change=lambda version: self.load(version),
+                                    poll_seconds=poll_seconds, current_version=self.model_version).start()
+
+    @property
+    def input_columns(self) -> List[str]:
+        return list(self.model.preprocessing_object.input_columns)
+
+    def predict(self, dataframe: "DataFrame") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Method Name :   predict
+        Description :   This method scores a dataframe of claims
+
+        Output      :   fraud labels (1/0) and fraud probabilities (None when the model has no predict_proba)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self._served is None:
+                self.load()
+            labels, probabilities = self.model.predict_with_proba(dataframe)
+            return np.asarray(labels).astype(np.int64), probabilities
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def lookup(self, records: List[dict]) -> List[Optional[dict]]:
+        """
+        Cached result of every record, None for the records that have to be scored
+        """
+        if self.cache is None:
+            return [None] * len(records)
+        columns = self.input_columns
+        return [None if prediction is None else _result(record, prediction)
+                for record, prediction in zip(records, self.cache.get_many(
+                    [self.cache.key(record, columns) for record in records]))]
+
+    def predict_records(self, records: List[dict], lookup: bool = True) -> List[dict]:
+        """
+        Score claims given as dicts of column -> value, returning one result dict per claim. The records
+        go through the compiled preprocessor, so a claim gets the same score whatever batch it is in.
+        Results are served from and stored in the prediction cache; lookup=False skips the lookup for
+        records the caller already looked up.
+        """
+        if not records:
+            return []
+        if self._served is None:
+            self.load()
+        # the model and version this batch is scored with, even if a reload swaps them meanwhile
+        model, model_version = self._served
+        keys = predictions = None
+        if self.cache is not None:
+            columns = list(model.preprocessing_object.input_columns)
+            keys = [self.cache.key(record, columns, model_version=model_version) for record in records]
+            predictions = self.cache.get_many(keys) if lookup else [None] * len(records)
+        else:
+            predictions = [None] * len(records)
+
+        missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            try:
+                labels, probabilities = model.predict_records_with_proba([records[index] for index in missing])
+            except Exception as e:
+                raise CustomException(e, sys)
+            for position, index in enumerate(missing):
+                prediction = ("Y" if labels[position] == 1 else "N",
+                              None if probabilities is None else round(float(probabilities[position]), 6))
+                predictions[index] = prediction
+                if keys is not None:
+                    self.cache.put(keys[index], prediction)
+        return [_result(record, prediction) for record, prediction in zip(records, predictions)]
+
+
+def _result(record: dict, prediction: Tuple[str, Optional[float]]) -> dict:
+    return {"policy_number": record.get("policy_number"), TARGET_COLUMN: prediction[0],
+            "fraud_probability": prediction[1]}
+
+
+class LatencyTracker:
+    """
+    Class Name :   LatencyTracker
+    Description :  Latencies of the latest requests and sizes of the latest micro-batches, summarised
+                   as percentiles for the /metrics endpoint.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.records = 0
+        self.errors = 0
+        self.started_at = time.time()
+
+    def record_request(self, latency_ms: float, n_records: int) -> None:
+        self.latencies_ms.append(latency_ms)
+        self.requests += 1
+        self.records += n_records
+
+    def record_batch(self, n_records: int) -> None:
+        self.batch_sizes.append(n_records)
+
+    def summary(self) -> dict:
+        latencies = np.fromiter(self.latencies_ms, dtype=float)
+        batch_sizes = np.fromiter(self.batch_sizes, dtype=float)
+        summary = {
+            "requests": self.requests,
+            "records": self.records,
+            "errors": self.errors,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "window": len(latencies),
+        }
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            summary.update({"latency_ms_p50": round(float(p50), 3), "latency_ms_p90": round(float(p90), 3),
+                            "latency_ms_p99": round(float(p99), 3),
+                            "latency_ms_max": round(float(latencies.max()), 3)})
+        if len(batch_sizes):
+            summary.update({"batches": len(batch_sizes), "batch_size_mean": round(float(batch_sizes.mean()), 2),
+                            "batch_size_max": int(batch_sizes.max())})
+        return summary
+
+
+class MicroBatcher:
+    """
+    Class Name :   MicroBatcher
+    Description :  Combines concurrent prediction requests into micro-batches. The first waiting request
+                   opens a batch that is closed after max_wait_ms or when it holds max_batch_size claims;
+                   the batch is scored with one vectorized call on a worker thread, so the event loop keeps
+                   accepting requests (which form the next batch) while the model runs.
+    """
+
+    def __init__(self, predict_fn: Callable[[List[dict]], List[dict]], max_batch_size: int = 256,
+                 max_wait_ms: float = 2.0, tracker: Optional[LatencyTracker] = None):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.tracker = tracker
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, records: List[dict]) -> List[dict]:
+        """
+        Score records as part of the next micro-batch
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[List[dict], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        n_records = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while n_records < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            n_records += len(item[0])
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for request_records, _ in batch for record in request_records]
+            if self.tracker is not None:
+                self.tracker.record_batch(len(records))
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_fn, records)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            start = 0
+            for request_records, future in batch:
+                if not future.done():
+                    future.set_result(results[start:start + len(request_records)])
+                start += len(request_records)
+
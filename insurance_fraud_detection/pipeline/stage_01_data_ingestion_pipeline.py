@@ -1,8 +1,11 @@
 import sys
-from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.logger import init_logging, logging
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.components.data_ingestion import DataIngestion
-from insurance_fraud_detection.entity.config_entity import DataIngestionConfig
+from insurance_fraud_detection.entity.config_entity import DataIngestionConfig, training_pipeline_config
+from insurance_fraud_detection.entity.artifact_entity import DataIngestionArtifact
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
+from insurance_fraud_detection.utils.stage_cache import StageCache
 
 STAGE_NAME = "Data Ingestion stage"
 
@@ -10,11 +13,19 @@ class DataIngestionTrainingPipeline:
     def __init__(self):
         pass
 
-    def main(self, return_artifact: bool = False):
+    def main(self, return_artifact: bool = False, force_rerun: bool = False):
         try:
             data_ingestion_config = DataIngestionConfig()
             data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            stage_cache = StageCache(cache_dir=training_pipeline_config.stage_cache_dir)
+            data_ingestion_artifact = stage_cache.run(
+                stage_name="data_ingestion",
+                fingerprint=data_ingestion.get_stage_fingerprint(),
+                stage=data_ingestion.initiate_data_ingestion,
+                artifact_class=DataIngestionArtifact,
+                output_paths=lambda artifact: [artifact.trained_file_path, artifact.test_file_path],
+                force_rerun=force_rerun,
+            )
             logging.info(f"Data Ingestion Artifact: {data_ingestion_artifact}")
 
             if return_artifact:
@@ -26,9 +37,11 @@ class DataIngestionTrainingPipeline:
 
 if __name__ == '__main__':
     try:
+        init_logging()
+        RunMetrics(run_name="data_ingestion").start(finish_at_exit=True)
         logging.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
         pipeline = DataIngestionTrainingPipeline()
-        pipeline.main()
+        pipeline.main(force_rerun="--force" in sys.argv[1:])
         logging.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
     except Exception as e:
         logging.exception(e)
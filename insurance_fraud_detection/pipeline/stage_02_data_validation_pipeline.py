@@ -1,9 +1,12 @@
 import sys
-from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.logger import init_logging, logging
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.components.data_validation import DataValidation
-from insurance_fraud_detection.entity.config_entity import DataValidationConfig
+from insurance_fraud_detection.entity.config_entity import DataValidationConfig, training_pipeline_config
+from insurance_fraud_detection.entity.artifact_entity import DataValidationArtifact
 from insurance_fraud_detection.pipeline.stage_01_data_ingestion_pipeline import DataIngestionTrainingPipeline
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
+from insurance_fraud_detection.utils.stage_cache import StageCache
 
 STAGE_NAME = "Data Validation stage"
 
@@ -11,28 +14,41 @@ class DataValidationTrainingPipeline:
     def __init__(self):
         pass
 
-    def main(self, data_ingestion_artifact):
+    def main(self, data_ingestion_artifact, force_rerun: bool = False):
         try:
             data_validation_config = DataValidationConfig()
             data_validation = DataValidation(
                 data_ingestion_artifact=data_ingestion_artifact,
                 data_validation_config=data_validation_config
             )
-            data_validation_artifact = data_validation.initiate_data_validation()
+            stage_cache = StageCache(cache_dir=training_pipeline_config.stage_cache_dir)
+            data_validation_artifact = stage_cache.run(
+                stage_name="data_validation",
+                fingerprint=data_validation.get_stage_fingerprint(),
+                stage=data_validation.initiate_data_validation,
+                artifact_class=DataValidationArtifact,
+                output_paths=lambda artifact: [artifact.drift_report_file_path,
+                                               data_validation_config.validation_report_file_path],
+                force_rerun=force_rerun,
+            )
             logging.info(f"Data Validation Artifact: {data_validation_artifact}")
+            return data_validation_artifact
         except Exception as e:
             raise CustomException(e, sys) from e
 
 
 if __name__ == '__main__':
     try:
+        init_logging()
+        RunMetrics(run_name="data_validation").start(finish_at_exit=True)
         logging.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        force_rerun = "--force" in sys.argv[1:]
 
         ingestion_pipeline = DataIngestionTrainingPipeline()
-        data_ingestion_artifact = ingestion_pipeline.main(return_artifact=True)
+        data_ingestion_artifact = ingestion_pipeline.main(return_artifact=True, force_rerun=force_rerun)
 
         validation_pipeline = DataValidationTrainingPipeline()
-        validation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact)
+        validation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact, force_rerun=force_rerun)
 
         logging.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
     except Exception as e:
@@ -0,0 +1,65 @@
+import sys
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.components.data_transformation import DataTransformation
+from insurance_fraud_detection.entity.config_entity import DataTransformationConfig, training_pipeline_config
+from insurance_fraud_detection.entity.artifact_entity import DataTransformationArtifact
+from insurance_fraud_detection.pipeline.stage_01_data_ingestion_pipeline import DataIngestionTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_02_data_validation_pipeline import DataValidationTrainingPipeline
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+STAGE_NAME = "Data Transformation stage"
+
+class DataTransformationTrainingPipeline:
+    def __init__(self):
+        pass
+
+    def main(self, data_ingestion_artifact, data_validation_artifact, force_rerun: bool = False):
+        try:
+            data_transformation_config = DataTransformationConfig()
+            data_transformation = DataTransformation(
+                data_ingestion_artifact=data_ingestion_artifact,
+                data_transformation_config=data_transformation_config,
+                data_validation_artifact=data_validation_artifact
+            )
+            stage_cache = StageCache(cache_dir=training_pipeline_config.stage_cache_dir)
+            data_transformation_artifact = stage_cache.run(
+                stage_name="data_transformation",
+                fingerprint=data_transformation.get_stage_fingerprint(),
+                stage=data_transformation.initiate_data_transformation,
+                artifact_class=DataTransformationArtifact,
+                output_paths=lambda artifact: [artifact.transformed_object_file_path,
+                                               artifact.transformed_train_file_path,
+                                               artifact.transformed_test_file_path],
+                force_rerun=force_rerun,
+            )
+            logging.info(f"Data Transformation Artifact: {data_transformation_artifact}")
+            return data_transformation_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+if __name__ == '__main__':
+    try:
+        init_logging()
+        RunMetrics(run_name="data_transformation").start(finish_at_exit=True)
+        logging.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        force_rerun = "--force" in sys.argv[1:]
+
+        ingestion_pipeline = DataIngestionTrainingPipeline()
+        data_ingestion_artifact = ingestion_pipeline.main(return_artifact=True, force_rerun=force_rerun)
+
+        validation_pipeline = DataValidationTrainingPipeline()
+        data_validation_artifact = validation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact,
+                                                            force_rerun=force_rerun)
+
+        transformation_pipeline = DataTransformationTrainingPipeline()
+        transformation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact,
+                                     data_validation_artifact=data_validation_artifact,
+                                     force_rerun=force_rerun)
+
+        logging.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logging.exception(e)
+        raise e
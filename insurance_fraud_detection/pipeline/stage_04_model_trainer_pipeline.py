@@ -0,0 +1,69 @@
+import sys
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.components.model_trainer import ModelTrainer
+from insurance_fraud_detection.entity.config_entity import ModelTrainerConfig, training_pipeline_config
+from insurance_fraud_detection.entity.artifact_entity import ModelTrainerArtifact
+from insurance_fraud_detection.pipeline.stage_01_data_ingestion_pipeline import DataIngestionTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_02_data_validation_pipeline import DataValidationTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_03_data_transformation_pipeline import DataTransformationTrainingPipeline
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+STAGE_NAME = "Model Trainer stage"
+
+class ModelTrainerTrainingPipeline:
+    def __init__(self):
+        pass
+
+    def main(self, data_transformation_artifact, force_rerun: bool = False):
+        try:
+            model_trainer_config = ModelTrainerConfig()
+            model_trainer = ModelTrainer(
+                data_transformation_artifact=data_transformation_artifact,
+                model_trainer_config=model_trainer_config
+            )
+            stage_cache = StageCache(cache_dir=training_pipeline_config.stage_cache_dir)
+            model_trainer_artifact = stage_cache.run(
+                stage_name="model_trainer",
+                fingerprint=model_trainer.get_stage_fingerprint(),
+                stage=model_trainer.initiate_model_trainer,
+                artifact_class=ModelTrainerArtifact,
+                output_paths=lambda artifact: [artifact.trained_model_file_path,
+                                               artifact.search_report_file_path],
+                force_rerun=force_rerun,
+            )
+            logging.info(f"Model Trainer Artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+if __name__ == '__main__':
+    try:
+        init_logging()
+        RunMetrics(run_name="model_trainer").start(finish_at_exit=True)
+        logging.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        force_rerun = "--force" in sys.argv[1:]
+
+        ingestion_pipeline = DataIngestionTrainingPipeline()
+        data_ingestion_artifact = ingestion_pipeline.main(return_artifact=True, force_rerun=force_rerun)
+
+        validation_pipeline = DataValidationTrainingPipeline()
+        data_validation_artifact = validation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact,
+                                                            force_rerun=force_rerun)
+
+        transformation_pipeline = DataTransformationTrainingPipeline()
+        data_transformation_artifact = transformation_pipeline.main(
+            data_ingestion_artifact=data_ingestion_artifact,
+            data_validation_artifact=data_validation_artifact,
+            force_rerun=force_rerun)
+
+        model_trainer_pipeline = ModelTrainerTrainingPipeline()
+        model_trainer_pipeline.main(data_transformation_artifact=data_transformation_artifact,
+                                    force_rerun=force_rerun)
+
+        logging.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logging.exception(e)
+        raise e
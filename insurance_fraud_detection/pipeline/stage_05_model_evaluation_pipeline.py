@@ -0,0 +1,75 @@
+import sys
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.components.model_evaluation import ModelEvaluation
+from insurance_fraud_detection.entity.config_entity import ModelEvaluationConfig, training_pipeline_config
+from insurance_fraud_detection.entity.artifact_entity import ModelEvaluationArtifact
+from insurance_fraud_detection.pipeline.stage_01_data_ingestion_pipeline import DataIngestionTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_02_data_validation_pipeline import DataValidationTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_03_data_transformation_pipeline import DataTransformationTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_04_model_trainer_pipeline import ModelTrainerTrainingPipeline
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+STAGE_NAME = "Model Evaluation stage"
+
+class ModelEvaluationTrainingPipeline:
+    def __init__(self):
+        pass
+
+    def main(self, data_ingestion_artifact, model_trainer_artifact, force_rerun: bool = False):
+        try:
+            model_evaluation_config = ModelEvaluationConfig()
+            model_evaluation = ModelEvaluation(
+                model_eval_config=model_evaluation_config,
+                data_ingestion_artifact=data_ingestion_artifact,
+                model_trainer_artifact=model_trainer_artifact
+            )
+            stage_cache = StageCache(cache_dir=training_pipeline_config.stage_cache_dir)
+            model_evaluation_artifact = stage_cache.run(
+                stage_name="model_evaluation",
+                fingerprint=model_evaluation.get_stage_fingerprint(),
+                stage=model_evaluation.initiate_model_evaluation,
+                artifact_class=ModelEvaluationArtifact,
+                output_paths=lambda artifact: [artifact.evaluation_report_file_path],
+                force_rerun=force_rerun,
+            )
+            logging.info(f"Model Evaluation Artifact: {model_evaluation_artifact}")
+            return model_evaluation_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+if __name__ == '__main__':
+    try:
+        init_logging()
+        RunMetrics(run_name="model_evaluation").start(finish_at_exit=True)
+        logging.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        force_rerun = "--force" in sys.argv[1:]
+
+        ingestion_pipeline = DataIngestionTrainingPipeline()
+        data_ingestion_artifact = ingestion_pipeline.main(return_artifact=True, force_rerun=force_rerun)
+
+        validation_pipeline = DataValidationTrainingPipeline()
+        data_validation_artifact = validation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact,
+                                                            force_rerun=force_rerun)
+
+        transformation_pipeline = DataTransformationTrainingPipeline()
+        data_transformation_artifact = transformation_pipeline.main(
+            data_ingestion_artifact=data_ingestion_artifact,
+            data_validation_artifact=data_validation_artifact,
+            force_rerun=force_rerun)
+
+        model_trainer_pipeline = ModelTrainerTrainingPipeline()
+        model_trainer_artifact = model_trainer_pipeline.main(data_transformation_artifact=data_transformation_artifact,
+                                                             force_rerun=force_rerun)
+
+        model_evaluation_pipeline = ModelEvaluationTrainingPipeline()
+        model_evaluation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact,
+                                       model_trainer_artifact=model_trainer_artifact,
+                                       force_rerun=force_rerun)
+
+        logging.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logging.exception(e)
+        raise e
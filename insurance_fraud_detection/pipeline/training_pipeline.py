@@ -1,18 +1,63 @@
 import sys
+from typing import Any, Callable, Dict, List, Optional
+
 from insurance_fraud_detection.logger import logging
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.components.data_ingestion import DataIngestion
 from insurance_fraud_detection.components.data_validation import DataValidation
-from insurance_fraud_detection.entity.config_entity import (DataIngestionConfig, DataValidationConfig)
+from insurance_fraud_detection.components.data_transformation import DataTransformation
+from insurance_fraud_detection.components.model_trainer import ModelTrainer
+from insurance_fraud_detection.components.model_evaluation import ModelEvaluation
+from insurance_fraud_detection.components.model_pusher import ModelPusher
+from insurance_fraud_detection.entity.config_entity import (DataIngestionConfig, DataValidationConfig,
+                                                            DataTransformationConfig, ModelTrainerConfig,
+                                                            ModelEvaluationConfig, ModelPusherConfig,
+                                                            RunMetricsConfig, training_pipeline_config)
+
+from insurance_fraud_detection.entity.artifact_entity import (DataIngestionArtifact, DataValidationArtifact,
+                                                              DataTransformationArtifact, ModelTrainerArtifact,
+                                                              ModelEvaluationArtifact, ModelPusherArtifact)
+from insurance_fraud_detection.utils.dag_executor import DagExecutor, DagNode
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
+from insurance_fraud_detection.utils.stage_cache import StageCache
+
+
+def stage_node(name: str, function: Callable[..., Any], inputs: Optional[Dict[str, str]] = None) -> DagNode:
+    """
+    DagNode of the pipeline stage name, with the retries and timeout configured for it in
+    training_pipeline_config; inputs maps argument name -> stage name
+    """
+    return DagNode(name=name, function=function, inputs=inputs or {},
+                   retries=training_pipeline_config.stage_retries.get(name, 0),
+                   retry_delay=training_pipeline_config.stage_retry_delay,
+                   timeout=training_pipeline_config.stage_timeouts.get(name))
+
 
-from insurance_fraud_detection.entity.artifact_entity import (DataIngestionArtifact, DataValidationArtifact)
+def run_stage_graph(nodes: List[DagNode], resume: bool = False) -> Dict[str, Any]:
+    """
+    Run the stage graph, every stage as soon as the artifacts it needs are there, recording the
+    artifacts in the pipeline state so that a failed run can be resumed from the last good stage
+    """
+    return DagExecutor(nodes, max_workers=training_pipeline_config.max_workers,
+                       state_dir=training_pipeline_config.pipeline_state_dir,
+                       name="training_pipeline").run(resume=resume)
 
 
 class TrainPipeline:
-    def __init__(self):
+    def __init__(self, force_rerun: bool = False):
+        """
+        :param force_rerun: run every stage even when its cached fingerprint is up to date
+        """
         logging.info("Initializing TrainPipeline class")
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
+        self.data_transformation_config = DataTransformationConfig()
+        self.model_trainer_config = ModelTrainerConfig()
+        self.model_evaluation_config = ModelEvaluationConfig()
+        self.model_pusher_config = ModelPusherConfig()
+        self.run_metrics_config = RunMetricsConfig()
+        self.stage_cache = StageCache(cache_dir=training_pipeline_config.stage_cache_dir)
+        self.force_rerun = force_rerun
         
 
     
@@ -21,14 +66,21 @@ class TrainPipeline:
         This method of TrainPipeline class is responsible for starting data ingestion component
         """
         try:
-            logging.info("Entered the start_data_ingestion method of TrainPipeline class")
+            logging.debug("Entered the start_data_ingestion method of TrainPipeline class")
             logging.info("Getting the data from MySQL database")
             
             data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            data_ingestion_artifact = self.stage_cache.run(
+                stage_name="data_ingestion",
+                fingerprint=data_ingestion.get_stage_fingerprint(),
+                stage=data_ingestion.initiate_data_ingestion,
+                artifact_class=DataIngestionArtifact,
+                output_paths=lambda artifact: [artifact.trained_file_path, artifact.test_file_path],
+                force_rerun=self.force_rerun,
+            )
             
-            logging.info("Got the train_set and test_set from mongodb")
-            logging.info("Exited the start_data_ingestion method of TrainPipeline class")
+            logging.info("Got the train_set and test_set from MySQL")
+            logging.debug("Exited the start_data_ingestion method of TrainPipeline class")
             return data_ingestion_artifact
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -38,14 +90,22 @@ class TrainPipeline:
         """
         This method of TrainPipeline class is responsible for starting data validation component
         """
-        logging.info("Entered the start_data_validation method of TrainPipeline class")
+        logging.debug("Entered the start_data_validation method of TrainPipeline class")
 
         try:
             data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
                                              data_validation_config=self.data_validation_config
                                              )
 
-            data_validation_artifact = data_validation.initiate_data_validation()
+            data_validation_artifact = self.stage_cache.run(
+                stage_name="data_validation",
+                fingerprint=data_validation.get_stage_fingerprint(),
+                stage=data_validation.initiate_data_validation,
+                artifact_class=DataValidationArtifact,
+                output_paths=lambda artifact: [artifact.drift_report_file_path,
+                                               self.data_validation_config.validation_report_file_path],
+                force_rerun=self.force_rerun,
+            )
 
             logging.info("Performed the data validation operation")
             
@@ -56,18 +116,124 @@ class TrainPipeline:
             raise CustomException(e, sys) from e
         
         
-
-    def run_pipeline(self, ) -> None:
+    def start_data_transformation(self, data_ingestion_artifact: DataIngestionArtifact,
+                                  data_validation_artifact: DataValidationArtifact) -> DataTransformationArtifact:
         """
-        This method of TrainPipeline class is responsible for running complete pipeline
+        This method of TrainPipeline class is responsible for starting data transformation component
         """
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
             if not data_validation_artifact.validation_status:
                 raise Exception(f"Data validation failed with message: {data_validation_artifact.message}")
-            
+            data_transformation = DataTransformation(data_ingestion_artifact=data_ingestion_artifact,
+                                                     data_transformation_config=self.data_transformation_config,
+                                                     data_validation_artifact=data_validation_artifact)
+            data_transformation_artifact = self.stage_cache.run(
+                stage_name="data_transformation",
+                fingerprint=data_transformation.get_stage_fingerprint(),
+                stage=data_transformation.initiate_data_transformation,
+                artifact_class=DataTransformationArtifact,
+                output_paths=lambda artifact: [artifact.transformed_object_file_path,
+                                               artifact.transformed_train_file_path,
+                                               artifact.transformed_test_file_path],
+                force_rerun=self.force_rerun,
+            )
+            return data_transformation_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+        """
+        This method of TrainPipeline class is responsible for starting model training
+        """
+        try:
+            model_trainer = ModelTrainer(data_transformation_artifact=data_transformation_artifact,
+                                         model_trainer_config=self.model_trainer_config)
+            model_trainer_artifact = self.stage_cache.run(
+                stage_name="model_trainer",
+                fingerprint=model_trainer.get_stage_fingerprint(),
+                stage=model_trainer.initiate_model_trainer,
+                artifact_class=ModelTrainerArtifact,
+                output_paths=lambda artifact: [artifact.trained_model_file_path,
+                                               artifact.search_report_file_path],
+                force_rerun=self.force_rerun,
+            )
+            return model_trainer_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def start_model_evaluation(self, data_ingestion_artifact: DataIngestionArtifact,
+                               model_trainer_artifact: ModelTrainerArtifact) -> ModelEvaluationArtifact:
+        """
+        This method of TrainPipeline class is responsible for comparing the trained model with the production model
+        """
+        try:
+            model_evaluation = ModelEvaluation(model_eval_config=self.model_evaluation_config,
+                                               data_ingestion_artifact=data_ingestion_artifact,
+                                               model_trainer_artifact=model_trainer_artifact)
+            model_evaluation_artifact = self.stage_cache.run(
+                stage_name="model_evaluation",
+                fingerprint=model_evaluation.get_stage_fingerprint(),
+                stage=model_evaluation.initiate_model_evaluation,
+                artifact_class=ModelEvaluationArtifact,
+                output_paths=lambda artifact: [artifact.evaluation_report_file_path],
+                force_rerun=self.force_rerun,
+            )
+            return model_evaluation_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def start_model_pusher(self, model_evaluation_artifact: ModelEvaluationArtifact,
+                           data_transformation_artifact: DataTransformationArtifact) -> ModelPusherArtifact:
+        """
+        This method of TrainPipeline class is responsible for promoting the accepted model in the model registry
+        """
+        try:
+            model_pusher = ModelPusher(model_pusher_config=self.model_pusher_config,
+                                       model_evaluation_artifact=model_evaluation_artifact,
+                                       data_transformation_artifact=data_transformation_artifact)
+            model_pusher_artifact = self.stage_cache.run(
+                stage_name="model_pusher",
+                fingerprint=model_pusher.get_stage_fingerprint(),
+                stage=model_pusher.initiate_model_pusher,
+                artifact_class=ModelPusherArtifact,
+                output_paths=lambda artifact: [artifact.push_report_file_path],
+                force_rerun=self.force_rerun,
+            )
+            return model_pusher_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+    def get_stage_graph(self) -> List[DagNode]:
+        """
+        This method of TrainPipeline class returns the stages of the pipeline with the artifacts each one needs
+        """
+        return [
+            stage_node("data_ingestion", self.start_data_ingestion),
+            stage_node("data_validation", self.start_data_validation,
+                       inputs={"data_ingestion_artifact": "data_ingestion"}),
+            stage_node("data_transformation", self.start_data_transformation,
+                       inputs={"data_ingestion_artifact": "data_ingestion",
+                               "data_validation_artifact": "data_validation"}),
+            stage_node("model_trainer", self.start_model_trainer,
+                       inputs={"data_transformation_artifact": "data_transformation"}),
+            stage_node("model_evaluation", self.start_model_evaluation,
+                       inputs={"data_ingestion_artifact": "data_ingestion",
+                               "model_trainer_artifact": "model_trainer"}),
+            stage_node("model_pusher", self.start_model_pusher,
+                       inputs={"model_evaluation_artifact": "model_evaluation",
+                               "data_transformation_artifact": "data_transformation"}),
+        ]
+
+    def run_pipeline(self, resume: bool = False) -> Dict[str, Any]:
+        """
+        This method of TrainPipeline class is responsible for running complete pipeline
+        and writing its run metrics artifact; with resume it continues the last failed run
+        from the stages that did not succeed
+        """
+        try:
+            with RunMetrics(config=self.run_metrics_config, run_name="training_pipeline").run():
+                return run_stage_graph(self.get_stage_graph(), resume=resume)
 
         except Exception as e:
             raise CustomException(e, sys)
-        
@@ -0,0 +1,106 @@
+"""
+Load-time benchmark of the model serialization formats.
+
+    python -m insurance_fraud_detection.utils.benchmark_model_load \
+        --model artifacts/model_trainer/trained_model/model.pkl --repeats 5
+
+The object is written as a dill pickle (save_object), as a pickle5 artifact and as joblib artifacts with
+and without compression (save_model_artifact), and every format is loaded repeats times in a fresh process each, so
+the numbers are cold-start times as a serving worker sees them. The module of the object is imported
+before the clock starts, so the times cover deserialization and not e.g. importing scikit-learn.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from insurance_fraud_detection.utils.main_utils import (load_model_artifact, load_object, save_model_artifact,
+                                                        save_object, write_yaml_file)
+
+
+# (name, writer, loader expression run in the child process)
+FORMATS = [
+    ("dill", lambda path, obj: save_object(path, obj),
+     "load_object({path!r})"),
+    ("pickle5", lambda path, obj: save_model_artifact(path, obj, file_format="pickle5"),
+     "load_model_artifact({path!r})"),
+    # the serving configuration: memory-mapped, checked against the quick hash of the manifest
+    ("pickle5+mmap", None,
+     "load_model_artifact({path!r}, mmap_mode='r')"),
+    ("pickle5+mmap+verify", None,
+     "load_model_artifact({path!r}, mmap_mode='r', verify=True)"),
+    ("joblib", lambda path, obj: save_model_artifact(path, obj, file_format="joblib"),
+     "load_model_artifact({path!r})"),
+    ("joblib+mmap", None,
+     "load_model_artifact({path!r}, mmap_mode='r')"),
+    ("joblib+compress3", lambda path, obj: save_model_artifact(path, obj, compress=3, file_format="joblib"),
+     "load_model_artifact({path!r})"),
+]
+
+CHILD_TEMPLATE = """
+import time
+import {module}
+from insurance_fraud_detection.utils.main_utils import load_model_artifact, load_object
+start = time.perf_counter()
+obj = {loader}
+print(time.perf_counter() - start)
+"""
+
+
+def _load_in_child(loader: str, module: str) -> float:
+    output = subprocess.run([sys.executable, "-c", CHILD_TEMPLATE.format(loader=loader, module=module)],
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def benchmark_model_load(obj: object, repeats: int = 5, work_dir: str = None) -> List[dict]:
+    """
+    Cold load time of obj in every format; returns one result row per format.
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="model_load_benchmark_")
+    results = []
+    path = None
+    for name, writer, loader in FORMATS:
+        if writer is not None:
+            path = os.path.join(work_dir, f"model.{name}")
+            start = time.perf_counter()
+            writer(path, obj)
+            save_seconds = time.perf_counter() - start
+        timings = sorted(_load_in_child(loader.format(path=path), type(obj).__module__) for _ in range(repeats))
+        results.append({
+            "format": name,
+            "size_bytes": os.path.getsize(path),
+            "save_seconds": round(save_seconds, 4),
+            "load_seconds_median": round(timings[len(timings) // 2], 4),
+            "load_seconds_min": round(timings[0], 4),
+        })
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark model artifact load times")
+    parser.add_argument("--model", required=True,
+                        help="model to benchmark: a model artifact with a manifest, or a dill pickle")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="optional yaml file for the results")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.model + ".manifest.json"):
+        obj = load_model_artifact(args.model)
+    else:
+        obj = load_object(args.model)
+    results = benchmark_model_load(obj, repeats=args.repeats)
+
+    print(f"{'format':<22}{'size MB':>10}{'save s':>10}{'load s (median)':>18}{'load s (min)':>14}")
+    for row in results:
+        print(f"{row['format']:<22}{row['size_bytes'] / 1e6:>10.2f}{row['save_seconds']:>10.3f}"
+              f"{row['load_seconds_median']:>18.4f}{row['load_seconds_min']:>14.4f}")
+    if args.output:
+        write_yaml_file(file_path=args.output, content={"model": args.model, "results": results})
+
+
+if __name__ == "__main__":
+    main()
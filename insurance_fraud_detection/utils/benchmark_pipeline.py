@@ -0,0 +1,383 @@
+"""
+End-to-end benchmark of the pipeline on synthetic claims: data generation, ingestion, validation,
+drift detection, transformation, training, and batch and online inference.
+
+    python -m insurance_fraud_detection.utils.benchmark_pipeline --rows 1000000
+    python -m insurance_fraud_detection.utils.benchmark_pipeline --rows 1000000 \
+        --baseline artifacts/benchmarks/baseline.yaml
+
+Every phase runs the real components on artifacts in a scratch directory, measured with run_metrics:
+the results (wall/CPU time, memory, I/O and rows/sec of every phase and of the steps inside it) are
+written to artifacts/benchmarks/<run id>/run_metrics.yaml and latest.yaml. With --baseline the run is
+compared with an earlier result file and the exit code is 1 when a phase or step got slower by more
+than --threshold, so the benchmark can gate a change. Compare runs of the same --rows on the same
+machine only.
+
+The source is generated into a parquet feature store, an SQLite database (a local stand-in for the MySQL
+table, read in chunks like the "stream" extraction) or the MySQL table of the environment variables,
+which is then ingested by the unchanged DataIngestion. Training searches the models of
+config/benchmark_model.yaml, a fixed set of candidates that scale to millions of rows.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from pandas import DataFrame
+
+from insurance_fraud_detection.components.data_ingestion import DataIngestion
+from insurance_fraud_detection.components.data_transformation import DataTransformation
+from insurance_fraud_detection.components.data_validation import DataValidation
+from insurance_fraud_detection.components.model_trainer import ModelTrainer
+from insurance_fraud_detection.constants import *
+from insurance_fraud_detection.data_access.feature_store import FeatureStore
+from insurance_fraud_detection.entity.config_entity import (BatchPredictionConfig, DataIngestionConfig,
+                                                            DataTransformationConfig, DataValidationConfig,
+                                                            InsuranceFraudPredictorConfig, ModelTrainerConfig,
+                                                            RunMetricsConfig, training_pipeline_config)
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.pipeline.batch_prediction_pipeline import BatchPrediction
+from insurance_fraud_detection.pipeline.prediction_pipeline import InsuranceFraudClassifier
+from insurance_fraud_detection.utils.main_utils import read_yaml_file
+from insurance_fraud_detection.utils.split_utils import HashSplitter
+from insurance_fraud_detection.utils.run_metrics import (RunMetrics, add_rows, annotate, compare_runs,
+                                                         print_comparison, step)
+from insurance_fraud_detection.utils.synthetic_data import (SyntheticClaimsGenerator, read_sqlite_chunks,
+                                                            write_feature_store, write_mysql, write_sqlite)
+
+
+SOURCES = ("feature_store", "sqlite", "mysql")
+BENCHMARK_TABLE_NAME = "benchmark_claims"
+
+
+class LocalSourceDataIngestion(DataIngestion):
+    """
+    Class Name :   LocalSourceDataIngestion
+    Description :  DataIngestion reading its source chunks from a local source (a feature store or an
+                   SQLite database) instead of MySQL; splitting and writing are those of DataIngestion.
+    """
+
+    def __init__(self, data_ingestion_config: DataIngestionConfig, source_chunks: Callable[[], Iterator[DataFrame]]):
+        super().__init__(data_ingestion_config=data_ingestion_config)
+        self.source_chunks = source_chunks
+
+    def iter_source_chunks(self, incremental: bool = False, watermark_value=None) -> Iterator[DataFrame]:
+        yield from self.source_chunks()
+
+    def iter_split_key_chunks(self, splitter: HashSplitter) -> Iterator[DataFrame]:
+        columns = [splitter.key_column, splitter.stratify_column]
+        for chunk in self.source_chunks():
+            yield chunk[columns]
+
+
+class PipelineBenchmark:
+    """
+    Class Name :   PipelineBenchmark
+    Description :  Runs every phase of the pipeline on n_rows synthetic claims in work_dir and records
+                   the run metrics of the phases.
+    """
+
+    def __init__(self, work_dir: str, n_rows: int = BENCHMARK_ROWS, source: str = "feature_store",
+                 chunk_size: int = DATA_INGESTION_CHUNK_SIZE, drift: float = BENCHMARK_DRIFT,
+                 drift_engine: str = DATA_VALIDATION_DRIFT_ENGINE,
+                 model_config_file_path: str = BENCHMARK_MODEL_CONFIG_FILE_PATH,
+                 time_budget: float = BENCHMARK_TIME_BUDGET, max_fits: int = 0, n_jobs: int = 0,
+                 online_records: int = BENCHMARK_ONLINE_RECORDS, seed: int = 42):
+        try:
+            if source not in SOURCES:
+                raise ValueError(f"source must be one of {SOURCES}, got {source}")
+            self.work_dir = work_dir
+            self.n_rows = n_rows
+            self.source = source
+            self.chunk_size = chunk_size
+            self.drift = drift
+            self.online_records = online_records
+            self.generator = SyntheticClaimsGenerator(seed=seed)
+            self.source_path = os.path.join(work_dir, "source",
+                                            "claims.db" if source == "sqlite" else "claims.parquet")
+
+            ingestion_dir = os.path.join(work_dir, DATA_INGESTION_DIR_NAME)
+            self.data_ingestion_config = DataIngestionConfig(
+                data_ingestion_dir=ingestion_dir,
+                feature_store_file_path=os.path.join(ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME),
+                training_file_path=os.path.join(ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME),
+                testing_file_path=os.path.join(ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME),
+                ingestion_state_file_path=os.path.join(ingestion_dir, DATA_INGESTION_STATE_DIR,
+                                                       DATA_INGESTION_STATE_FILE_NAME),
+                extraction_report_file_path=os.path.join(ingestion_dir, DATA_INGESTION_STATE_DIR,
+                                                         DATA_INGESTION_EXTRACTION_REPORT_FILE_NAME),
+                table_name=BENCHMARK_TABLE_NAME,
+                extraction_mode="stream",
+                ingestion_mode="full",
+                chunk_size=chunk_size,
+            )
+            validation_dir = os.path.join(work_dir, DATA_VALIDATION_DIR_NAME)
+            self.data_validation_config = self._validation_config(validation_dir, drift_engine)
+            # the drift detection phase writes its report next to, not over, the one of the validation
+            self.drift_detection_config = self._validation_config(os.path.join(work_dir, "drift_detection"),
+                                                                  drift_engine)
+            transformation_dir = os.path.join(work_dir, DATA_TRANSFORMATION_DIR_NAME)
+            self.data_transformation_config = DataTransformationConfig(
+                data_transformation_dir=transformation_dir,
+                transformed_train_file_path=os.path.join(transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                         TRAIN_FILE_NAME.replace("csv", "npy")),
+                transformed_test_file_path=os.path.join(transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                        TEST_FILE_NAME.replace("csv", "npy")),
+                transformed_object_file_path=os.path.join(transformation_dir,
+                                                          DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+                                                          PREPROCSSING_OBJECT_FILE_NAME),
+                chunk_size=chunk_size,
+            )
+            trainer_dir = os.path.join(work_dir, MODEL_TRAINER_DIR_NAME)
+            self.model_trainer_config = ModelTrainerConfig(
+                model_trainer_dir=trainer_dir,
+                trained_model_file_path=os.path.join(trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                                     MODEL_TRAINER_TRAINED_MODEL_NAME),
+                # the benchmark measures the search, whatever score the synthetic data allows
+                expected_score=0.0,
+                model_config_file_path=model_config_file_path,
+                time_budget=time_budget,
+                max_fits=max_fits,
+                n_jobs=n_jobs,
+                search_cache_file_path=os.path.join(trainer_dir, MODEL_TRAINER_SEARCH_CACHE_FILE_NAME),
+                search_report_file_path=os.path.join(trainer_dir, MODEL_TRAINER_SEARCH_REPORT_FILE_NAME),
+            )
+            batch_prediction_dir = os.path.join(work_dir, BATCH_PREDICTION_DIR_NAME)
+            self.batch_prediction_config = BatchPredictionConfig(
+                batch_prediction_dir=batch_prediction_dir,
+                output_dir=os.path.join(batch_prediction_dir, BATCH_PREDICTION_OUTPUT_DIR),
+                model_file_path=self.model_trainer_config.trained_model_file_path,
+                input_file_path=self.data_ingestion_config.testing_file_path,
+                chunk_size=chunk_size,
+                n_jobs=n_jobs,
+            )
+            self.predictor_config = InsuranceFraudPredictorConfig(
+                model_file_path=self.model_trainer_config.trained_model_file_path,
+                model_registry_dir=os.path.join(work_dir, MODEL_REGISTRY_DIR),
+                cache_size=0,
+                reload_poll_seconds=0,
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _validation_config(validation_dir: str, drift_engine: str) -> DataValidationConfig:
+        return DataValidationConfig(
+            data_validation_dir=validation_dir,
+            drift_report_file_path=os.path.join(validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR,
+                                                DATA_VALIDATION_DRIFT_REPORT_FILE_NAME),
+            validation_report_file_path=os.path.join(validation_dir, DATA_VALIDATION_REPORT_FILE_NAME),
+            reference_profile_file_path=os.path.join(validation_dir, DATA_VALIDATION_REFERENCE_PROFILE_DIR,
+                                                     DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME),
+            drift_engine=drift_engine,
+        )
+
+    def settings(self) -> dict:
+        return {
+            "rows": self.n_rows,
+            "source": self.source,
+            "chunk_size": self.chunk_size,
+            "drift": self.drift,
+            "drift_engine": self.data_validation_config.drift_engine,
+            "model_config": self.model_trainer_config.model_config_file_path,
+            "time_budget": self.model_trainer_config.time_budget,
+            "max_fits": self.model_trainer_config.max_fits,
+            "n_jobs": self.model_trainer_config.n_jobs,
+            "online_records": self.online_records,
+            "cpu_count": os.cpu_count(),
+        }
+
+    def generate_source(self) -> None:
+        chunks = self.generator.iter_chunks(self.n_rows, self.chunk_size, clean=self.source == "feature_store")
+        if self.source == "feature_store":
+            n_rows = write_feature_store(chunks, self.source_path)
+        elif self.source == "sqlite":
+            n_rows = write_sqlite(chunks, self.source_path, BENCHMARK_TABLE_NAME, self.generator.schema_config)
+        else:
+            n_rows = write_mysql(chunks, BENCHMARK_TABLE_NAME, self.generator.schema_config)
+        add_rows(rows_out=n_rows)
+
+    def get_data_ingestion(self) -> DataIngestion:
+        config = self.data_ingestion_config
+        if self.source == "feature_store":
+            source_store = FeatureStore(file_path=self.source_path)
+            return LocalSourceDataIngestion(config, lambda: source_store.iter_batches(batch_size=config.chunk_size))
+        if self.source == "sqlite":
+            return LocalSourceDataIngestion(config, lambda: read_sqlite_chunks(
+                self.source_path, BENCHMARK_TABLE_NAME, config.chunk_size, order_column=config.split_key_column))
+        return DataIngestion(data_ingestion_config=config)
+
+    def detect_drift(self, data_ingestion_artifact) -> bool:
+        """
+        Drift of a new batch of claims (the size of the test set, drifted with strength drift) against
+        the training data
+        """
+        data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
+                                         data_validation_config=self.drift_detection_config)
+        train_df = data_validation.read_data(file_path=data_ingestion_artifact.trained_file_path)
+        drifted = SyntheticClaimsGenerator(schema_config=self.generator.schema_config, drift=self.drift,
+                                           drift_start_row=self.n_rows, seed=self.generator.seed)
+        n_rows = FeatureStore(file_path=data_ingestion_artifact.test_file_path).count_rows()
+        current_df = next(drifted.iter_chunks(n_rows, n_rows, start_row=self.n_rows, clean=True))
+        drift_status = bool(data_validation.detect_dataset_drift(train_df, current_df))
+        add_rows(rows_in=len(train_df) + len(current_df))
+        return drift_status
+
+    def predict_online(self) -> dict:
+        """
+        Latency of single-claim predictions through the compiled path of the prediction service
+        """
+        classifier = InsuranceFraudClassifier(self.predictor_config).load()
+        records = next(FeatureStore(file_path=self.data_ingestion_config.testing_file_path).iter_batches(
+            batch_size=self.online_records, columns=classifier.input_columns))
+        records = records.astype(object).where(records.notna(), None).to_dict(orient="records")
+        latencies = []
+        for record in records:
+            start = time.perf_counter()
+            classifier.predict_records([record])
+            latencies.append(time.perf_counter() - start)
+        add_rows(rows_in=len(records), rows_out=len(records))
+        latencies_ms = np.array(latencies) * 1000
+        return {"latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+                "latency_p99_ms": round(float(np.percentile(latencies_ms, 99)), 3)}
+
+    def run(self, run_metrics_config: RunMetricsConfig) -> dict:
+        """
+        Method Name :   run
+        Description :   This method runs the benchmark phases and writes their run metrics
+
+        Output      :   run metrics of the benchmark
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            run_metrics = RunMetrics(config=run_metrics_config, run_name="benchmark", metadata=self.settings())
+            with run_metrics.run():
+                with step("generate"):
+                    self.generate_source()
+                with step("ingestion"):
+                    data_ingestion_artifact = self.get_data_ingestion().initiate_data_ingestion()
+                    add_rows(rows_in=self.n_rows, rows_out=self.n_rows)
+                with step("validation"):
+                    data_validation_artifact = DataValidation(
+                        data_ingestion_artifact=data_ingestion_artifact,
+                        data_validation_config=self.data_validation_config).initiate_data_validation()
+                    if not data_validation_artifact.validation_status:
+                        raise Exception(f"Validation of the synthetic data failed: {data_validation_artifact.message}")
+                with step("drift_detection"):
+                    annotate(drift_detected=self.detect_drift(data_ingestion_artifact))
+                with step("transformation"):
+                    data_transformation_artifact = DataTransformation(
+                        data_ingestion_artifact=data_ingestion_artifact,
+                        data_transformation_config=self.data_transformation_config,
+                        data_validation_artifact=data_validation_artifact).initiate_data_transformation()
+                with step("training"):
+                    model_trainer_artifact = ModelTrainer(
+                        data_transformation_artifact=data_transformation_artifact,
+                        model_trainer_config=self.model_trainer_config).initiate_model_trainer()
+                    annotate(f1_score=round(model_trainer_artifact.metric_artifact.f1_score, 4))
+                with step("batch_inference"):
+                    summary = BatchPrediction(self.batch_prediction_config).initiate_batch_prediction()
+                    add_rows(rows_in=summary["rows"], rows_out=summary["rows"])
+                with step("online_inference"):
+                    annotate(**self.predict_online())
+            report = run_metrics.as_dict()
+            logging.info("Benchmark finished", extra={"run_id": run_metrics.run_id})
+            return report
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+def print_report(report: dict) -> None:
+    print(f"{'phase':<20}{'wall s':>10}{'cpu s':>10}{'peak RSS MB':>14}{'rows/sec':>14}")
+    for name, metrics in report["stages"].items():
+        rows_per_sec = metrics.get("rows_per_sec")
+        print(f"{name:<20}{metrics['wall_seconds']:>10.2f}{metrics['cpu_seconds']:>10.2f}"
+              f"{metrics['peak_rss_mb'] or 0:>14.1f}{rows_per_sec if rows_per_sec is not None else '':>14}")
+
+
+def _remove_scratch(work_dir: str, remove_directory: bool) -> None:
+    """
+    Delete the artifacts of a run: the whole work_dir when the run created it, otherwise only the
+    entries inside the (empty before the run) directory
+    """
+    if remove_directory:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return
+    for name in os.listdir(work_dir):
+        path = os.path.join(work_dir, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline end to end on synthetic claims")
+    parser.add_argument("--rows", type=int, default=BENCHMARK_ROWS)
+    parser.add_argument("--source", choices=SOURCES, default="feature_store")
+    parser.add_argument("--chunk-size", type=int, default=DATA_INGESTION_CHUNK_SIZE)
+    parser.add_argument("--drift", type=float, default=BENCHMARK_DRIFT,
+                        help="drift strength of the batch of the drift detection phase")
+    parser.add_argument("--drift-engine", choices=["evidently", "native"], default=DATA_VALIDATION_DRIFT_ENGINE)
+    parser.add_argument("--model-config", default=BENCHMARK_MODEL_CONFIG_FILE_PATH)
+    parser.add_argument("--time-budget", type=float, default=BENCHMARK_TIME_BUDGET,
+                        help="seconds of hyperparameter search")
+    parser.add_argument("--max-fits", type=int, default=0, help="0 = unlimited")
+    parser.add_argument("--n-jobs", type=int, default=0, help="worker processes, 0 = one per CPU")
+    parser.add_argument("--online-records", type=int, default=BENCHMARK_ONLINE_RECORDS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", help="new or empty scratch directory of the artifacts, a temporary one "
+                                           "by default")
+    parser.add_argument("--keep-artifacts", action="store_true", help="do not delete the scratch artifacts")
+    parser.add_argument("--output-dir", default=os.path.join(training_pipeline_config.artifact_dir,
+                                                             BENCHMARK_DIR_NAME))
+    parser.add_argument("--profile", choices=["", "cprofile", "sampling"], default="",
+                        help="also profile every phase")
+    parser.add_argument("--baseline", help="earlier result file to compare with")
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    # every run starts from scratch, and only what the run created is deleted afterwards: an existing
+    # directory with content (e.g. the real artifacts) is never used
+    if args.work_dir and os.path.isdir(args.work_dir) and os.listdir(args.work_dir):
+        parser.error(f"--work-dir {args.work_dir} is not empty, pass a new or empty directory")
+    init_logging()
+    # read before the run, the baseline may be the latest.yaml this run replaces
+    baseline = read_yaml_file(args.baseline) if args.baseline else None
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    created_work_dir = not args.work_dir or not os.path.isdir(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    benchmark = PipelineBenchmark(work_dir=work_dir, n_rows=args.rows, source=args.source,
+                                  chunk_size=args.chunk_size, drift=args.drift, drift_engine=args.drift_engine,
+                                  model_config_file_path=args.model_config, time_budget=args.time_budget,
+                                  max_fits=args.max_fits, n_jobs=args.n_jobs, online_records=args.online_records,
+                                  seed=args.seed)
+    run_metrics_config = RunMetricsConfig(
+        run_metrics_dir=args.output_dir,
+        latest_file_path=os.path.join(args.output_dir, RUN_METRICS_LATEST_FILE_NAME),
+        profile=args.profile)
+    try:
+        report = benchmark.run(run_metrics_config)
+    finally:
+        if not args.keep_artifacts:
+            _remove_scratch(work_dir, remove_directory=created_work_dir)
+    print_report(report)
+    print(f"Results written to {run_metrics_config.latest_file_path}")
+
+    if baseline is None:
+        return 0
+    baseline_rows = (baseline.get("metadata") or {}).get("rows")
+    if baseline_rows != args.rows:
+        print(f"Warning: the baseline ran on {baseline_rows} rows, this run on {args.rows}")
+    rows: List[dict] = compare_runs(baseline, report, threshold=args.threshold)
+    print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Import-time and startup benchmark of the entry points.
+
+    python -m insurance_fraud_detection.utils.benchmark_startup --repeats 5 \
+        --model artifacts/model_trainer/trained_model/model.pkl
+
+Every entry point is started repeats times in a fresh interpreter that imports its module and runs its
+explicit initialization (init_logging; with --model the prediction service also loads that model), so
+the numbers are the cold starts a CLI stage or a serving worker sees. Each entry point also lists the
+heavy optional dependencies it must not load at startup: a stray top-level import then fails the
+benchmark even on a machine fast enough to stay under the target. After init_logging the root logger
+must hold only the queue handler of the JSON log; anything else, e.g. the stderr handler of an implicit
+basicConfig() run by a log call at import time, also fails the entry point. Exits with 1 when an entry
+point is over its target, loads one of those modules or leaves another log handler behind.
+
+The prediction service has a target of its own: the model it serves is a scikit-learn estimator, and
+importing scikit-learn alone loads pandas and scipy.stats, whichever module asks for it first.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional, Sequence
+
+from insurance_fraud_detection.constants import (BENCHMARK_STARTUP_REPEATS, BENCHMARK_STARTUP_SERVICE_TARGET_SECONDS,
+                                                 BENCHMARK_STARTUP_TARGET_SECONDS)
+from insurance_fraud_detection.utils.main_utils import write_yaml_file
+
+
+# (name, code run in the child process, target seconds, modules it must not load)
+ENTRY_POINTS = [
+    ("package", "import insurance_fraud_detection.logger, insurance_fraud_detection.utils.main_utils",
+     BENCHMARK_STARTUP_TARGET_SECONDS, ["pandas", "sklearn", "evidently", "pymysql", "dill", "joblib"]),
+    ("data_ingestion_stage", "import insurance_fraud_detection.pipeline.stage_01_data_ingestion_pipeline",
+     BENCHMARK_STARTUP_TARGET_SECONDS, ["sklearn", "evidently", "plotly", "pymysql", "dill"]),
+    ("data_validation_stage", "import insurance_fraud_detection.pipeline.stage_02_data_validation_pipeline",
+     BENCHMARK_STARTUP_TARGET_SECONDS, ["sklearn", "evidently", "plotly", "pymysql"]),
+    ("model_pusher_stage", "import insurance_fraud_detection.pipeline.stage_06_model_pusher_pipeline",
+     BENCHMARK_STARTUP_TARGET_SECONDS, ["sklearn", "evidently", "plotly", "pymysql"]),
+    ("training_pipeline", "import insurance_fraud_detection.pipeline.training_pipeline",
+     BENCHMARK_STARTUP_TARGET_SECONDS, ["sklearn", "evidently", "plotly", "pymysql"]),
+    ("batch_prediction", "import insurance_fraud_detection.pipeline.batch_prediction_pipeline",
+     BENCHMARK_STARTUP_TARGET_SECONDS, ["sklearn", "evidently", "plotly", "pymysql"]),
+    ("prediction_service", "import app",
+     BENCHMARK_STARTUP_SERVICE_TARGET_SECONDS, ["sklearn", "evidently", "plotly", "pymysql", "uvicorn"]),
+]
+
+# loads the model the way the lifespan of the service does, from a model file outside any registry
+SERVICE_MODEL_CODE = """import app
+from insurance_fraud_detection.entity.config_entity import InsuranceFraudPredictorConfig
+from insurance_fraud_detection.pipeline.prediction_pipeline import InsuranceFraudClassifier
+InsuranceFraudClassifier(InsuranceFraudPredictorConfig(model_file_path={model!r},
+                                                       model_registry_dir={registry_dir!r})).load()"""
+
+CHILD_TEMPLATE = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+from insurance_fraud_detection.logger import init_logging
+queue_logging = init_logging()
+seconds = time.perf_counter() - start
+import logging
+print(json.dumps({{"seconds": seconds,
+                   "loaded": [name for name in {forbidden!r} if name in sys.modules],
+                   "handlers": [type(handler).__name__ for handler in logging.getLogger().handlers
+                                if handler is not queue_logging.queue_handler]}}))
+"""
+
+
+def _start_in_child(code: str, forbidden: List[str]) -> dict:
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD_TEMPLATE.format(code=code, forbidden=forbidden)],
+                            check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # the wall time of the process includes starting the interpreter, as a worker or CLI call pays it
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def benchmark_startup(repeats: int = BENCHMARK_STARTUP_REPEATS, model_file_path: Optional[str] = None) -> List[dict]:
+    """
+    Cold start time of every entry point; returns one result row per entry point.
+    """
+    entry_points = list(ENTRY_POINTS)
+    if model_file_path:
+        code = SERVICE_MODEL_CODE.format(model=model_file_path, registry_dir=tempfile.mkdtemp(prefix="registry_"))
+        entry_points.append(("prediction_service+model", code, BENCHMARK_STARTUP_SERVICE_TARGET_SECONDS,
+                             ["evidently", "plotly", "pymysql", "uvicorn"]))
+
+    results = []
+    for name, code, target_seconds, forbidden in entry_points:
+        runs = [_start_in_child(code, forbidden) for _ in range(repeats)]
+        process_seconds = sorted(run["process_seconds"] for run in runs)
+        import_seconds = sorted(run["seconds"] for run in runs)
+        median = process_seconds[len(process_seconds) // 2]
+        loaded = sorted({module for run in runs for module in run["loaded"]})
+        handlers = sorted({handler for run in runs for handler in run["handlers"]})
+        results.append({
+            "entry_point": name,
+            "process_seconds_median": round(median, 4),
+            "process_seconds_min": round(process_seconds[0], 4),
+            "import_seconds_median": round(import_seconds[len(import_seconds) // 2], 4),
+            "target_seconds": target_seconds,
+            "unexpected_modules": loaded,
+            "unexpected_handlers": handlers,
+            "ok": median <= target_seconds and not loaded and not handlers,
+        })
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the import and startup time of the entry points")
+    parser.add_argument("--repeats", type=int, default=BENCHMARK_STARTUP_REPEATS)
+    parser.add_argument("--model", help="optional model artifact the prediction service is started with")
+    parser.add_argument("--output", help="optional yaml file for the results")
+    args = parser.parse_args(argv)
+
+    results = benchmark_startup(repeats=args.repeats, model_file_path=args.model)
+
+    print(f"{'entry point':<26}{'process s':>11}{'min s':>9}{'import s':>10}{'target s':>10}  status")
+    for row in results:
+        status = "ok" if row["ok"] else "FAIL"
+        if row["unexpected_modules"]:
+            status += f" (loads {', '.join(row['unexpected_modules'])})"
+        if row["unexpected_handlers"]:
+            status += f" (root handlers {', '.join(row['unexpected_handlers'])})"
+        print(f"{row['entry_point']:<26}{row['process_seconds_median']:>11.3f}{row['process_seconds_min']:>9.3f}"
+              f"{row['import_seconds_median']:>10.3f}{row['target_seconds']:>10.2f}  {status}")
+    if args.output:
+        write_yaml_file(file_path=args.output, content={"results": results})
+    return 0 if all(row["ok"] for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+import contextvars
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import load_object, read_yaml_file, save_object, write_yaml_file
+
+
+DAG_STATE_FILE_NAME = "dag_state.yaml"
+DAG_RESULTS_DIR_NAME = "results"
+# use_process nodes fork, so they need not be picklable and share the memory of the parent
+CAN_FORK = "fork" in multiprocessing.get_all_start_methods()
+
+
+@dataclass
+class DagNode:
+    """
+    Class Name :   DagNode
+    Description :  A task of a DagExecutor graph. function is called with the results of the nodes it
+                   depends on as keyword arguments: inputs maps argument name -> node name, so the edges
+                   of the graph are the data passed between the nodes. A failed attempt is retried up to
+                   retries times, waiting retry_delay seconds before the first retry and twice as long before
+                   every further one. timeout limits every attempt (seconds, None = no limit). With
+                   use_process the node runs in a child process, which is terminated when it times out; its
+                   result must be picklable (and its function and inputs too where fork is not available).
+    """
+    name: str
+    function: Callable[..., Any]
+    inputs: Dict[str, str] = field(default_factory=dict)
+    retries: int = 0
+    retry_delay: float = 1.0
+    timeout: Optional[float] = None
+    use_process: bool = False
+
+
+def _process_target(connection, function: Callable[..., Any], kwargs: dict) -> None:
+    try:
+        result = (True, function(**kwargs))
+    except BaseException:
+        # exceptions are not always picklable (CustomException is not), the traceback is
+        result = (False, traceback.format_exc())
+    try:
+        connection.send(result)
+    except Exception:
+        connection.send((False, traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+def run_in_process(function: Callable[..., Any], kwargs: dict, timeout: Optional[float] = None) -> Any:
+    """
+    Call function(**kwargs) in a child process and return its result; the child is terminated and
+    TimeoutError raised when it runs longer than timeout seconds
+    """
+    context = multiprocessing.get_context("fork" if CAN_FORK else None)
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_process_target, args=(sender, function, kwargs))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            process.terminate()
+            raise TimeoutError(f"{getattr(function, '__name__', function)} did not finish within {timeout} seconds")
+        try:
+            succeeded, payload = receiver.recv()
+        except EOFError:
+            process.join()
+            raise RuntimeError(f"Child process exited with code {process.exitcode} without a result")
+    finally:
+        receiver.close()
+        process.join()
+    if not succeeded:
+        raise RuntimeError(f"Failed in child process:\n{payload}")
+    return payload
+
+
+class DagExecutor:
+    """
+    Class Name :   DagExecutor
+    Description :  Runs a graph of DagNodes, every node as soon as the nodes it depends on are done, so
+                   independent nodes run concurrently on a pool of max_workers threads (child processes
+                   for use_process nodes). Nodes run in the run_metrics context of the caller, so their
+                   steps are recorded in the current run.
+
+                   With a state_dir the result and status of every node are recorded as they finish;
+                   run(resume=True) then reuses the results of the nodes that succeeded in the previous run
+                   of the same graph and only runs the failed and remaining ones. When a node fails for good
+                   no new nodes are started, the running ones are finished and the error is raised.
+
+                   A thread cannot be stopped: a thread node that times out is reported as failed while its
+                   attempt keeps running in the background, so it is not retried (two attempts would write
+                   the same outputs). Nodes that must be stopped and retried on timeout need use_process.
+    """
+
+    def __init__(self, nodes: List[DagNode], max_workers: int = 4, state_dir: Optional[str] = None,
+                 name: str = "dag"):
+        try:
+            self.nodes: Dict[str, DagNode] = {}
+            for node in nodes:
+                if node.name in self.nodes:
+                    raise ValueError(f"Duplicate node name: {node.name}")
+                self.nodes[node.name] = node
+            for node in nodes:
+                unknown = [dependency for dependency in node.inputs.values() if dependency not in self.nodes]
+                if unknown:
+                    raise ValueError(f"Node {node.name} depends on unknown nodes {unknown}")
+            self.order = self.topological_order()
+            self.max_workers = max(1, max_workers)
+            self.state_dir = state_dir
+            self.name = name
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def topological_order(self) -> List[str]:
+        """
+        Node names, every node after the nodes it depends on; raises ValueError on a cycle
+        """
+        order: List[str] = []
+        remaining = {name: set(node.inputs.values()) for name, node in self.nodes.items()}
+        while remaining:
+            ready = sorted(name for name, dependencies in remaining.items() if not dependencies - set(order))
+            if not ready:
+                raise ValueError(f"The graph has a cycle between {sorted(remaining)}")
+            order.extend(ready)
+            for name in ready:
+                del remaining[name]
+        return order
+
+    def graph_signature(self) -> str:
+        """
+        Hash of the nodes and their edges; a resumed run must have the signature of the run it continues
+        """
+        graph = {name: sorted(self.nodes[name].inputs.items()) for name in self.order}
+        return hashlib.sha256(json.dumps(graph, sort_keys=True).encode()).hexdigest()
+
+    def _state_file_path(self) -> str:
+        return os.path.join(self.state_dir, DAG_STATE_FILE_NAME)
+
+    def _result_file_path(self, name: str) -> str:
+        return os.path.join(self.state_dir, DAG_RESULTS_DIR_NAME, f"{name}.pkl")
+
+    def read_state(self) -> Dict[str, dict]:
+        """
+        Status of every node of the previous run, empty when there is none or it ran another graph
+        """
+        if self.state_dir is None or not os.path.exists(self._state_file_path()):
+            return {}
+        state = read_yaml_file(file_path=self._state_file_path()) or {}
+        if state.get("graph_signature") != self.graph_signature():
+            logging.info("The recorded run of %s ran another graph, starting over", self.name)
+            return {}
+        return state.get("nodes", {})
+
+    def _write_state(self, nodes: Dict[str, dict]) -> None:
+        if self.state_dir is None:
+            return
+        write_yaml_file(file_path=self._state_file_path(), content={
+            "name": self.name,
+            "graph_signature": self.graph_signature(),
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "nodes": nodes,
+        })
+
+    def _attempt(self, node: DagNode, kwargs: dict, attempt: int) -> Any:
+        if attempt > 1:
+            time.sleep(node.retry_delay * 2 ** (attempt - 2))
+        logging.info("Running node %s (attempt %d of %d)", node.name, attempt, node.retries + 1)
+        if node.use_process:
+            return run_in_process(node.function, kwargs, timeout=node.timeout)
+        return node.function(**kwargs)
+
+    def run(self, resume: bool = False) -> Dict[str, Any]:
+        """
+        Method Name :   run
+        Description :   This method runs the graph, continuing the previous run with resume=True
+
+        Output      :   result of every node by node name
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            results: Dict[str, Any] = {}
+            status: Dict[str, dict] = {name: {"status": "pending"} for name in self.order}
+            if resume:
+                for name, previous in self.read_state().items():
+                    if (name in status and previous.get("status") in ("succeeded", "resumed")
+                            and os.path.exists(self._result_file_path(name))):
+                        results[name] = load_object(self._result_file_path(name))
+                        status[name] = {**previous, "status": "resumed"}
+                if results:
+                    logging.info("Resuming %s, reusing the results of %s", self.name, sorted(results))
+            elif self.state_dir is not None and os.path.isdir(self.state_dir):
+                shutil.rmtree(self.state_dir)
+            self._write_state(status)
+
+            failure: Optional[tuple] = None
+            attempts: Dict[str, int] = {}
+            # future -> (node name, start of the attempt)
+            running: Dict[Future, tuple] = {}
+            abandoned: List[Future] = []
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+            def submit(name: str) -> None:
+                node = self.nodes[name]
+                attempts[name] = attempts.get(name, 0) + 1
+                kwargs = {argument: results[dependency] for argument, dependency in node.inputs.items()}
+                # run_metrics attributes steps through a context variable, which threads do not inherit
+                context = contextvars.copy_context()
+                future = executor.submit(context.run, self._attempt, node, kwargs, attempts[name])
+                running[future] = (name, time.monotonic())
+                status[name] = {"status": "running", "attempts": attempts[name]}
+
+            def fail(name: str, error: BaseException, retry: bool) -> None:
+                nonlocal failure
+                node = self.nodes[name]
+                if retry and attempts[name] <= node.retries and failure is None:
+                    logging.warning("Node %s failed (attempt %d), retrying: %s", name, attempts[name], error)
+                    submit(name)
+                    return
+                logging.error("Node %s failed after %d attempts: %s", name, attempts[name], error)
+                status[name] = {"status": "failed", "attempts": attempts[name], "error": repr(error)[:1000]}
+                if failure is None:
+                    failure = (name, error)
+
+            try:
+                while True:
+                    if failure is None:
+                        for name in self.order:
+                            if (status[name]["status"] == "pending"
+                                    and all(dependency in results
+                                            for dependency in self.nodes[name].inputs.values())):
+                                submit(name)
+                    if not running:
+                        break
+                    deadlines = [started + self.nodes[name].timeout for name, started in running.values()
+                                 if self.nodes[name].timeout is not None and not self.nodes[name].use_process]
+                    wait_seconds = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                    finished, _ = wait(list(running), timeout=wait_seconds, return_when=FIRST_COMPLETED)
+
+                    for future in finished:
+                        name, started = running.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            fail(name, e, retry=True)
+                            continue
+                        results[name] = result
+                        if self.state_dir is not None:
+                            save_object(self._result_file_path(name), result)
+                        status[name] = {"status": "succeeded", "attempts": attempts[name],
+                                        "seconds": round(time.monotonic() - started, 3)}
+                        logging.info("Node %s succeeded in %.2fs", name, time.monotonic() - started)
+                        self._write_state(status)
+
+                    now = time.monotonic()
+                    for future, (name, started) in list(running.items()):
+                        node = self.nodes[name]
+                        if node.timeout is not None and not node.use_process and now - started > node.timeout:
+                            running.pop(future)
+                            abandoned.append(future)
+                            fail(name, TimeoutError(f"Node {name} did not finish within {node.timeout} seconds"),
+                                 retry=False)
+                    self._write_state(status)
+            finally:
+                # a timed-out thread cannot be stopped; do not wait for it
+                executor.shutdown(wait=not abandoned, cancel_futures=True)
+
+            if failure is not None:
+                name, error = failure
+                not_run = [node for node in self.order if status[node]["status"] == "pending"]
+                raise RuntimeError(f"Node {name} of {self.name} failed: {error}. Not run: {not_run}. "
+                                   f"Rerun with resume to continue from the last good node") from error
+            return results
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+
+
+# smallest bin share used by PSI and chi-square so that empty bins do not divide by zero
+MIN_SHARE = 1e-4
+
+NUMERICAL_STATTESTS = ("ks", "wasserstein")
+CATEGORICAL_STATTESTS = ("chisquare", "psi")
+
+DEFAULT_THRESHOLDS = {
+    "ks": 0.05,  # p-value, drift when below
+    "wasserstein": 0.1,  # distance normed by the reference std, drift when above
+    "chisquare": 0.05,  # p-value, drift when below
+    "psi": 0.1,  # population stability index, drift when above
+}
+
+
+def kolmogorov_sf(x: float, terms: int = 100) -> float:
+    """
+    Survival function of the Kolmogorov distribution (asymptotic KS p-value).
+    """
+    if x <= 0:
+        return 1.0
+    k = np.arange(1, terms + 1)
+    p = 2.0 * np.sum((-1.0) ** (k - 1) * np.exp(-2.0 * (k * x) ** 2))
+    return float(min(max(p, 0.0), 1.0))
+
+
+def ks_2samp(reference: np.ndarray, current: np.ndarray) -> Tuple[float, float]:
+    """
+    Two-sample Kolmogorov-Smirnov statistic and asymptotic p-value.
+    """
+    reference = np.sort(reference)
+    current = np.sort(current)
+    n, m = len(reference), len(current)
+    values = np.concatenate([reference, current])
+    cdf_reference = np.searchsorted(reference, values, side="right") / n
+    cdf_current = np.searchsorted(current, values, side="right") / m
+    statistic = float(np.max(np.abs(cdf_reference - cdf_current)))
+    en = np.sqrt(n * m / (n + m))
+    return statistic, kolmogorov_sf((en + 0.12 + 0.11 / en) * statistic)
+
+
+def wasserstein_distance(reference: np.ndarray, current: np.ndarray) -> float:
+    """
+    First Wasserstein distance between two 1-D samples.
+    """
+    reference = np.sort(reference)
+    current = np.sort(current)
+    values = np.sort(np.concatenate([reference, current]))
+    deltas = np.diff(values)
+    cdf_reference = np.searchsorted(reference, values[:-1], side="right") / len(reference)
+    cdf_current = np.searchsorted(current, values[:-1], side="right") / len(current)
+    return float(np.sum(np.abs(cdf_reference - cdf_current) * deltas))
+
+
+def chisquare_test(reference_counts: np.ndarray, current_counts: np.ndarray) -> Tuple[float, float]:
+    """
+    Chi-square goodness of fit of the current category counts against the reference shares.
+    """
+    from scipy.special import chdtrc
+
+    if len(reference_counts) < 2:
+        return 0.0, 1.0
+    reference_share = np.clip(reference_counts / reference_counts.sum(), MIN_SHARE, None)
+    reference_share = reference_share / reference_share.sum()
+    expected = reference_share * current_counts.sum()
+    statistic = float(np.sum((current_counts - expected) ** 2 / expected))
+    return statistic, float(chdtrc(len(reference_counts) - 1, statistic))
+
+
+def population_stability_index(reference_counts: np.ndarray, current_counts: np.ndarray) -> float:
+    """
+    Population stability index between two count vectors over the same bins.
+    """
+    reference_share = np.clip(reference_counts / max(reference_counts.sum(), 1), MIN_SHARE, None)
+    current_share = np.clip(current_counts / max(current_counts.sum(), 1), MIN_SHARE, None)
+    return float(np.sum((current_share - reference_share) * np.log(current_share / reference_share)))
+
+
+def ks_against_quantiles(reference_quantiles: np.ndarray, reference_count: int,
+                         current: np.ndarray) -> Tuple[float, float]:
+    """
+    KS statistic and p-value of current against a reference summarised by evenly spaced quantiles.
+    The reference CDF is read off the quantile sketch, so the statistic is exact up to 1 / len(quantiles).
+    """
+    current = np.sort(current)
+    m = len(current)
+    points = np.concatenate([current, reference_quantiles])
+    cdf_reference = np.searchsorted(reference_quantiles, points, side="right") / len(reference_quantiles)
+    cdf_current = np.searchsorted(current, points, side="right") / m
+    statistic = float(np.max(np.abs(cdf_reference - cdf_current)))
+    en = np.sqrt(reference_count * m / (reference_count + m))
+    return statistic, kolmogorov_sf((en + 0.12 + 0.11 / en) * statistic)
+
+
+def wasserstein_against_quantiles(reference_quantiles: np.ndarray, current: np.ndarray) -> float:
+    """
+    Wasserstein distance as the mean gap between the reference and current quantile functions.
+    """
+    probabilities = np.linspace(0.0, 1.0, len(reference_quantiles))
+    return float(np.mean(np.abs(reference_quantiles - np.quantile(current, probabilities))))
+
+
+def numerical_profile(values: pd.Series, n_quantiles: int, n_bins: int) -> dict:
+    """
+    Count, moments, quantile sketch and histogram of a numerical column (NaN excluded).
+    """
+    values = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=np.float64)
+    if len(values) == 0:
+        return {"type": "num", "count": 0}
+    counts, edges = np.histogram(values, bins=n_bins)
+    return {
+        "type": "num",
+        "count": int(len(values)),
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        "min": float(np.min(values)),
+        "max": float(np.max(values)),
+        "quantiles": np.quantile(values, np.linspace(0.0, 1.0, n_quantiles)).tolist(),
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def categorical_profile(values: pd.Series) -> dict:
+    """
+    Count and category frequency table of a categorical column (NaN excluded).
+    """
+    frequencies = values.dropna().astype(str).value_counts()
+    return {
+        "type": "cat",
+        "count": int(frequencies.sum()),
+        "frequencies": {str(category): int(count) for category, count in frequencies.items()},
+    }
+
+
+class ReferenceProfile:
+    """
+    Class Name :   ReferenceProfile
+    Description :  Precomputed per-column summary of the reference (training) data used by the native
+                   drift engine: quantile sketches and histograms for numerical columns and frequency
+                   tables for categorical columns, tagged with a content hash (see cache_key) of the
+                   reference data and of everything else it was built from.
+    """
+
+    def __init__(self, columns: Dict[str, dict], content_hash: Optional[str] = None):
+        self.columns = columns
+        self.content_hash = content_hash
+
+    @staticmethod
+    def cache_key(data_hash: str, schema_hash: str, n_quantiles: int, n_bins: int) -> str:
+        """
+        Content hash of a profile: the hash of the reference data, of the schema that picks its columns
+        and the profile parameters, so a change of any of them rebuilds a cached profile
+        """
+        content = {"data": data_hash, "schema": schema_hash, "n_quantiles": n_quantiles, "n_bins": n_bins}
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def build(cls, dataframe: pd.DataFrame, numerical_columns: List[str], categorical_columns: List[str],
+              content_hash: Optional[str] = None, n_quantiles: int = 1001, n_bins: int = 50,
+              max_workers: Optional[int] = None) -> "ReferenceProfile":
+        tasks = [(column, lambda c: numerical_profile(dataframe[c], n_quantiles, n_bins))
+                 for column in numerical_columns if column in dataframe.columns]
+        tasks += [(column, lambda c: categorical_profile(dataframe[c]))
+                  for column in categorical_columns if column in dataframe.columns]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            profiles = list(executor.map(lambda task: task[1](task[0]), tasks))
+        return cls({column: profile for (column, _), profile in zip(tasks, profiles)}, content_hash)
+
+    def save(self, file_path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = file_path + ".tmp"
+            with open(tmp_path, "w") as file_obj:
+                json.dump({"content_hash": self.content_hash, "columns": self.columns}, file_obj)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path: str) -> "ReferenceProfile":
+        try:
+            with open(file_path) as file_obj:
+                content = json.load(file_obj)
+            return cls(content["columns"], content.get("content_hash"))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def aligned_category_counts(reference: pd.Series, current: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Category counts of both series over the union of their categories (NaN excluded).
+    """
+    reference_counts = reference.value_counts(dropna=True)
+    current_counts = current.value_counts(dropna=True)
+    categories = reference_counts.index.union(current_counts.index)
+    return (reference_counts.reindex(categories, fill_value=0).to_numpy(dtype=np.float64),
+            current_counts.reindex(categories, fill_value=0).to_numpy(dtype=np.float64))
+
+
+class NativeDriftDetector:
+    """
+    Class Name :   NativeDriftDetector
+    Description :  Column-wise data drift detection with NumPy, used instead of evidently's DataDriftPreset.
+
+                   Numerical columns get the KS test and the Wasserstein distance (normed by the reference
+                   standard deviation), categorical columns the chi-square test and the PSI. The configured
+                   stattest of each column type decides whether a column drifted, and the dataset drifts
+                   when the share of drifted columns reaches drift_share. Columns are processed in parallel.
+    """
+
+    def __init__(self, numerical_columns: List[str], categorical_columns: List[str],
+                 numerical_stattest: str = "ks", categorical_stattest: str = "chisquare",
+                 thresholds: Optional[Dict[str, float]] = None, drift_share: float = 0.5,
+                 max_workers: Optional[int] = None):
+        if numerical_stattest not in NUMERICAL_STATTESTS:
+            raise ValueError(f"numerical_stattest must be one of {NUMERICAL_STATTESTS}, got {numerical_stattest}")
+        if categorical_stattest not in CATEGORICAL_STATTESTS:
+            raise ValueError(f"categorical_stattest must be one of {CATEGORICAL_STATTESTS}, "
+                             f"got {categorical_stattest}")
+        self.numerical_columns = list(numerical_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.numerical_stattest = numerical_stattest
+        self.categorical_stattest = categorical_stattest
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.drift_share = drift_share
+        self.max_workers = max_workers
+
+    def _is_drifted(self, stattest: str, result: dict) -> bool:
+        if stattest in ("ks", "chisquare"):
+            return result[f"{stattest}_p_value"] < self.thresholds[stattest]
+        return result[stattest] >= self.thresholds[stattest]
+
+    def numerical_column_drift(self, reference: pd.Series, current: pd.Series) -> dict:
+        reference = pd.to_numeric(reference, errors="coerce").dropna().to_numpy(dtype=np.float64)
+        current = pd.to_numeric(current, errors="coerce").dropna().to_numpy(dtype=np.float64)
+        if len(reference) == 0 or len(current) == 0:
+            return {"column_type": "num", "stattest": self.numerical_stattest, "drift_detected": False}
+
+        ks_statistic, ks_p_value = ks_2samp(reference, current)
+        reference_std = float(np.std(reference))
+        distance = wasserstein_distance(reference, current)
+        # a constant reference column drifts as soon as the current values move at all
+        normed_distance = distance / reference_std if reference_std > 0 else (0.0 if distance == 0 else np.inf)
+        result = {
+            "column_type": "num",
+            "stattest": self.numerical_stattest,
+            "ks_statistic": ks_statistic,
+            "ks_p_value": ks_p_value,
+            "wasserstein": float(normed_distance),
+        }
+        result["drift_detected"] = bool(self._is_drifted(self.numerical_stattest, result))
+        return result
+
+    def numerical_column_drift_from_profile(self, reference_profile: dict, current: pd.Series) -> dict:
+        current = pd.to_numeric(current, errors="coerce").dropna().to_numpy(dtype=np.float64)
+        if reference_profile["count"] == 0 or len(current) == 0:
+            return {"column_type": "num", "stattest": self.numerical_stattest, "drift_detected": False}
+
+        reference_quantiles = np.asarray(reference_profile["quantiles"], dtype=np.float64)
+        ks_statistic, ks_p_value = ks_against_quantiles(reference_quantiles, reference_profile["count"], current)
+        reference_std = reference_profile["std"]
+        distance = wasserstein_against_quantiles(reference_quantiles, current)
+        normed_distance = distance / reference_std if reference_std > 0 else (0.0 if distance == 0 else np.inf)
+        result = {
+            "column_type": "num",
+            "stattest": self.numerical_stattest,
+            "ks_statistic": ks_statistic,
+            "ks_p_value": ks_p_value,
+            "wasserstein": float(normed_distance),
+        }
+        result["drift_detected"] = bool(self._is_drifted(self.numerical_stattest, result))
+        return result
+
+    def categorical_column_drift_from_profile(self, reference_profile: dict, current: pd.Series) -> dict:
+        reference = pd.Series(reference_profile["frequencies"], dtype=np.float64)
+        current = current.dropna().astype(str).value_counts()
+        categories = reference.index.union(current.index)
+        reference_counts = reference.reindex(categories, fill_value=0).to_numpy(dtype=np.float64)
+        current_counts = current.reindex(categories, fill_value=0).to_numpy(dtype=np.float64)
+        return self._categorical_result(reference_counts, current_counts)
+
+    def categorical_column_drift(self, reference: pd.Series, current: pd.Series) -> dict:
+        reference_counts, current_counts = aligned_category_counts(reference, current)
+        return self._categorical_result(reference_counts, current_counts)
+
+    def _categorical_result(self, reference_counts: np.ndarray, current_counts: np.ndarray) -> dict:
+        if reference_counts.sum() == 0 or current_counts.sum() == 0:
+            return {"column_type": "cat", "stattest": self.categorical_stattest, "drift_detected": False}
+
+        chisquare_statistic, chisquare_p_value = chisquare_test(reference_counts, current_counts)
+        result = {
+            "column_type": "cat",
+            "stattest": self.categorical_stattest,
+            "chisquare_statistic": chisquare_statistic,
+            "chisquare_p_value": chisquare_p_value,
+            "psi": population_stability_index(reference_counts, current_counts),
+        }
+        result["drift_detected"] = bool(self._is_drifted(self.categorical_stattest, result))
+        return result
+
+    def run(self, reference_df: pd.DataFrame, current_df: pd.DataFrame) -> dict:
+        """
+        Detect drift of current_df against reference_df.
+
+        Output      :   dict with dataset_drift, number_of_columns, number_of_drifted_columns,
+                        share_of_drifted_columns and the per column results under drift_by_columns
+        """
+        try:
+            tasks = []
+            for column in self.numerical_columns:
+                if column in reference_df.columns and column in current_df.columns:
+                    tasks.append((column, self.numerical_column_drift))
+            for column in self.categorical_columns:
+                if column in reference_df.columns and column in current_df.columns:
+                    tasks.append((column, self.categorical_column_drift))
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(
+                    lambda task: task[1](reference_df[task[0]], current_df[task[0]]), tasks))
+
+            drift_by_columns = {column: result for (column, _), result in zip(tasks, results)}
+            return self.summarize(drift_by_columns)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run_against_profile(self, reference_profile: ReferenceProfile, current_df: pd.DataFrame) -> dict:
+        """
+        Detect drift of current_df against a precomputed reference profile; only the
+        current data is scanned.
+        """
+        try:
+            tasks = []
+            for column in self.numerical_columns:
+                if column in reference_profile.columns and column in current_df.columns:
+                    tasks.append((column, self.numerical_column_drift_from_profile))
+            for column in self.categorical_columns:
+                if column in reference_profile.columns and column in current_df.columns:
+                    tasks.append((column, self.categorical_column_drift_from_profile))
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(
+                    lambda task: task[1](reference_profile.columns[task[0]], current_df[task[0]]), tasks))
+
+            drift_by_columns = {column: result for (column, _), result in zip(tasks, results)}
+            return self.summarize(drift_by_columns)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def summarize(self, drift_by_columns: Dict[str, dict]) -> dict:
+        number_of_columns = len(drift_by_columns)
+        number_of_drifted_columns = sum(result["drift_detected"] for result in drift_by_columns.values())
+        share = number_of_drifted_columns / number_of_columns if number_of_columns else 0.0
+        summary = {
+            "dataset_drift": bool(number_of_columns > 0 and share >= self.drift_share),
+            "number_of_columns": number_of_columns,
+            "number_of_drifted_columns": int(number_of_drifted_columns),
+            "share_of_drifted_columns": float(share),
+            "drift_by_columns": drift_by_columns,
+        }
+        logging.info(f"Native drift detection: {number_of_drifted_columns}/{number_of_columns} columns drifted")
+        return summary
@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+
+
+METRIC_NAMES = ["recall", "precision", "f1", "pr_auc", "cost"]
+# +1 when a higher value is better, -1 for losses
+METRIC_DIRECTIONS = {"recall": 1, "precision": 1, "f1": 1, "pr_auc": 1, "cost": -1}
+# index and weight matrices of a bootstrap block hold at most this many entries (~32 MB of int64 each)
+MAX_BLOCK_ENTRIES = 4_000_000
+
+
+class ScoredPredictions:
+    """
+    Class Name :   ScoredPredictions
+    Description :  Predictions of one model on the evaluation set, kept in descending score order so the
+                   metrics of any resample follow from how often each row was drawn: rank_ holds the
+                   position of every row in that order, and group_end_ the last position of the tie group
+                   of every position (sklearn's precision-recall thresholds are the distinct scores).
+    """
+
+    def __init__(self, y_true: np.ndarray, labels: np.ndarray, scores: Optional[np.ndarray] = None):
+        y_true = np.asarray(y_true).astype(np.int64)
+        labels = np.asarray(labels).astype(np.int64)
+        # without probabilities the labels are the only ranking there is
+        scores = np.asarray(scores if scores is not None else labels, dtype=np.float64)
+        order = np.argsort(-scores, kind="mergesort")
+        self.rank_ = np.empty(len(order), dtype=np.int64)
+        self.rank_[order] = np.arange(len(order))
+        sorted_scores = scores[order]
+        is_group_end = np.append(sorted_scores[1:] != sorted_scores[:-1], True)
+        self.group_end_ = np.minimum.accumulate(np.where(is_group_end, np.arange(len(order)), len(order))[::-1])[::-1]
+        self.positive_ = y_true[order]
+        self.true_positive_ = y_true[order] & labels[order]
+        self.false_positive_ = (1 - y_true[order]) & labels[order]
+
+
+def resample_metrics(predictions: ScoredPredictions, index: np.ndarray, false_negative_cost: float,
+                     false_positive_cost: float) -> Dict[str, np.ndarray]:
+    """
+    Metrics of every resample: index is a (n_resamples, n_rows) matrix of row indices, one resample per row.
+    recall / precision / f1 are 0 when undefined (zero_division=0), pr_auc is the average precision
+    (NaN for a resample without positives) and cost the mean of false_negative_cost * FN +
+    false_positive_cost * FP.
+    """
+    n_resamples, n_rows = index.shape
+    n_positions = len(predictions.rank_)
+    # how often every position (in score order) was drawn by every resample, with one bincount
+    positions = predictions.rank_[index] + n_positions * np.arange(n_resamples, dtype=np.int64)[:, None]
+    weights = np.bincount(positions.ravel(), minlength=n_resamples * n_positions).reshape(n_resamples, n_positions)
+
+    positives = weights @ predictions.positive_
+    tp = weights @ predictions.true_positive_
+    fp = weights @ predictions.false_positive_
+    fn = positives - tp
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(tp + fp > 0, tp / np.maximum(tp + fp, 1), 0.0)
+        recall = np.where(positives > 0, tp / np.maximum(positives, 1), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / np.maximum(2 * tp + fp + fn, 1), 0.0)
+
+        # average precision: every drawn positive contributes the precision at the end of its tie group
+        cumulative_positives = np.cumsum(weights * predictions.positive_, axis=1)
+        cumulative_drawn = np.cumsum(weights, axis=1)
+        precision_at = np.where(cumulative_drawn > 0, cumulative_positives / np.maximum(cumulative_drawn, 1), 0.0)
+        pr_auc = ((weights * predictions.positive_) * precision_at[:, predictions.group_end_]).sum(axis=1) / positives
+
+    cost = (false_negative_cost * fn + false_positive_cost * fp) / n_rows
+    return {"recall": recall, "precision": precision, "f1": f1, "pr_auc": pr_auc, "cost": cost}
+
+
+# evaluation data of a bootstrap worker, set once per process by _init_worker
+_worker_data: Optional[tuple] = None
+
+
+def _init_worker(n_rows: int, models: Dict[str, ScoredPredictions], false_negative_cost: float,
+                 false_positive_cost: float) -> None:
+    global _worker_data
+    _worker_data = (n_rows, models, false_negative_cost, false_positive_cost)
+
+
+def _bootstrap_block(seed: np.random.SeedSequence, n_resamples: int) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Metrics of n_resamples resamples for every model; all models see the same resamples (paired bootstrap).
+    """
+    n_rows, models, false_negative_cost, false_positive_cost = _worker_data
+    index = np.random.default_rng(seed).integers(0, n_rows, size=(n_resamples, n_rows))
+    return {name: resample_metrics(predictions, index, false_negative_cost, false_positive_cost)
+            for name, predictions in models.items()}
+
+
+class BootstrapEvaluator:
+    """
+    Class Name :   BootstrapEvaluator
+    Description :  Point metrics and paired bootstrap confidence intervals of one or more models scored on
+                   the same rows. Resamples are drawn as index matrices in blocks and the metrics of a whole
+                   block are computed with array operations; blocks run on n_jobs worker processes. Blocks
+                   are seeded from random_state independently of n_jobs, so results are reproducible.
+    """
+
+    def __init__(self, n_resamples: int = 1000, confidence_level: float = 0.95, false_negative_cost: float = 10.0,
+                 false_positive_cost: float = 1.0, n_jobs: int = 0, random_state: int = 42):
+        self.n_resamples = n_resamples
+        self.confidence_level = confidence_level
+        self.false_negative_cost = false_negative_cost
+        self.false_positive_cost = false_positive_cost
+        self.n_jobs = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+        self.random_state = random_state
+
+    def evaluate(self, y_true: np.ndarray, models: Dict[str, ScoredPredictions]) -> dict:
+        """
+        Report with, for every model and metric, the point estimate and the confidence interval, and for
+        every model after the first its paired difference to the first model (higher is better for every
+        metric, the cost difference is sign-flipped) with interval and share of resamples it is positive.
+        """
+        try:
+            start = time.perf_counter()
+            y_true = np.asarray(y_true).astype(np.int8)
+            n_rows = len(y_true)
+            if n_rows == 0:
+                raise ValueError("Cannot evaluate on an empty set")
+            point = {name: resample_metrics(predictions, np.arange(n_rows)[None, :],
+                                            self.false_negative_cost, self.false_positive_cost)
+                     for name, predictions in models.items()}
+
+            block_size = max(1, min(self.n_resamples, MAX_BLOCK_ENTRIES // n_rows))
+            sizes = [min(block_size, self.n_resamples - offset) for offset in range(0, self.n_resamples, block_size)]
+            seeds = np.random.SeedSequence(self.random_state).spawn(len(sizes))
+            init_args = (n_rows, models, self.false_negative_cost, self.false_positive_cost)
+            if self.n_jobs > 1 and len(sizes) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(sizes)), initializer=_init_worker,
+                                         initargs=init_args) as executor:
+                    blocks = list(executor.map(_bootstrap_block, seeds, sizes))
+            else:
+                _init_worker(*init_args)
+                blocks = [_bootstrap_block(seed, size) for seed, size in zip(seeds, sizes)]
+            samples = {name: {metric: np.concatenate([block[name][metric] for block in blocks])
+                              for metric in METRIC_NAMES} for name in models}
+
+            alpha = 1.0 - self.confidence_level
+            quantiles = [alpha / 2, 1 - alpha / 2]
+            report = {"n_rows": int(n_rows), "n_positives": int(y_true.sum()), "n_resamples": self.n_resamples,
+                      "confidence_level": self.confidence_level, "models": {}, "differences": {}}
+            for name in models:
+                report["models"][name] = {
+                    metric: {"value": _rounded(point[name][metric][0]),
+                             "ci": [_rounded(value) for value in np.nanquantile(samples[name][metric], quantiles)]}
+                    for metric in METRIC_NAMES}
+            baseline = next(iter(models))
+            for name in list(models)[1:]:
+                report["differences"][f"{name}-{baseline}"] = {}
+                for metric in METRIC_NAMES:
+                    direction = METRIC_DIRECTIONS[metric]
+                    difference = direction * (samples[name][metric] - samples[baseline][metric])
+                    report["differences"][f"{name}-{baseline}"][metric] = {
+                        "value": _rounded(direction * (point[name][metric][0] - point[baseline][metric][0])),
+                        "ci": [_rounded(value) for value in np.nanquantile(difference, quantiles)],
+                        "probability_better": _rounded(np.mean(difference[~np.isnan(difference)] > 0)),
+                    }
+            report["seconds"] = round(time.perf_counter() - start, 3)
+            logging.info(f"Bootstrapped {self.n_resamples} resamples of {n_rows} rows for {len(models)} models "
+                         f"in {report['seconds']}s")
+            return report
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+def _rounded(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, 6)
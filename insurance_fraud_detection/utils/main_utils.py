@@ -1,14 +1,23 @@
+import hashlib
+import json
 import os
+import platform
 import sys
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
 
 import numpy as np
-import dill
 import yaml
-from pandas import DataFrame
 
 from insurance_fraud_detection.exception import CustomException
 from insurance_fraud_detection.logger import logging
 
+# dill, joblib, pickle and pandas are imported where they are used: every entry point imports this module,
+# most of them never pickle anything
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
 
 def read_yaml_file(file_path: str) -> dict:
     try:
@@ -34,15 +43,39 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
 
 
 
+def compute_file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """
+    sha256 content hash of a file, or of every file under a directory
+    (e.g. a partitioned parquet dataset) taken in sorted order together with their relative names.
+    """
+    try:
+        digest = hashlib.sha256()
+        if os.path.isdir(path):
+            file_paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            file_paths = [path]
+        for file_path in file_paths:
+            if file_path != path:
+                digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as file_obj:
+                for block in iter(lambda: file_obj.read(block_size), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+
 def load_object(file_path: str) -> object:
-    logging.info("Entered the load_object method of utils")
+    logging.debug("Entered the load_object method of utils")
 
     try:
 
+        import dill
         with open(file_path, "rb") as file_obj:
             obj = dill.load(file_obj)
 
-        logging.info("Exited the load_object method of utils")
+        logging.debug("Exited the load_object method of utils")
 
         return obj
 
@@ -51,66 +84,496 @@ def load_object(file_path: str) -> object:
     
 
 
-def save_numpy_array_data(file_path: str, array: np.array):
+# size of the .npy header written by NumpyArrayWriter; fixed so the final shape can be patched in place
+NPY_HEADER_SIZE = 128
+
+
+def numpy_metadata_path(file_path: str) -> str:
+    """
+    Sidecar metadata file of a .npy file
+    """
+    return file_path + ".meta.json"
+
+
+def write_numpy_array_metadata(file_path: str, dtype: np.dtype, shape: tuple, sha256: str,
+                               columns: Optional[List[str]] = None) -> dict:
+    """
+    Write the sidecar metadata (dtype, shape, column names and sha256 of the array data) of a .npy file
+    """
+    try:
+        if columns is not None and len(shape) > 1 and len(columns) != shape[1]:
+            raise ValueError(f"{len(columns)} column names given for an array with {shape[1]} columns")
+        metadata = {
+            "dtype": np.dtype(dtype).str,
+            "shape": list(shape),
+            "columns": list(columns) if columns is not None else None,
+            "sha256": sha256,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with open(numpy_metadata_path(file_path), "w") as file_obj:
+            json.dump(metadata, file_obj, indent=2)
+        return metadata
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def read_numpy_array_metadata(file_path: str) -> Optional[dict]:
+    """
+    Sidecar metadata of a .npy file, None when the file has none
+    """
+    try:
+        metadata_path = numpy_metadata_path(file_path)
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path) as file_obj:
+            return json.load(file_obj)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def _array_data_hash(array: np.ndarray, block_rows: int = 65536) -> str:
+    """
+    sha256 of the C-ordered bytes of array, computed block by block so memmaps are not read at once
+    """
+    digest = hashlib.sha256()
+    if array.ndim == 0 or len(array) == 0:
+        digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+    for start in range(0, len(array), block_rows):
+        digest.update(np.ascontiguousarray(array[start:start + block_rows]).tobytes())
+    return digest.hexdigest()
+
+
+def save_numpy_array_data(file_path: str, array: np.array, columns: Optional[List[str]] = None,
+                          write_metadata: bool = False):
     """
     Save numpy array data to file
     file_path: str location of file to save
     array: np.array data to save
+    columns: optional column names stored in the sidecar metadata
+    write_metadata: write the sidecar metadata (dtype, shape, columns, sha256)
     """
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
         with open(file_path, 'wb') as file_obj:
             np.save(file_obj, array)
+        if write_metadata or columns is not None:
+            write_numpy_array_metadata(file_path, array.dtype, array.shape, _array_data_hash(array), columns)
     except Exception as e:
         raise CustomException(e, sys) from e
     
 
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None, verify: bool = False) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: None reads the array into memory; "r" (read-only) or "c" (copy-on-write) memory-map it, so
+               processes loading the same file share its pages instead of each holding a copy
+    verify: check the array against the sha256 of its sidecar metadata
     return: np.array data loaded
     """
     try:
-        with open(file_path, 'rb') as file_obj:
-            return np.load(file_obj)
+        array = np.load(file_path, mmap_mode=mmap_mode)
+        if verify:
+            metadata = read_numpy_array_metadata(file_path)
+            if metadata is None:
+                raise ValueError(f"No metadata to verify {file_path} against")
+            if list(array.shape) != metadata["shape"] or _array_data_hash(array) != metadata["sha256"]:
+                raise ValueError(f"{file_path} does not match its metadata, the file is corrupt or was modified")
+        return array
     except Exception as e:
         raise CustomException(e, sys) from e
 
 
+class NumpyArrayWriter:
+    """
+    Class Name :   NumpyArrayWriter
+    Description :  Builds a 2-D .npy file by appending row blocks, without holding the whole array or
+                   concatenating the blocks in memory.
+
+                   The header is written with a fixed size and rewritten with the final row count on
+                   close(). Rows go to a temporary file that replaces file_path only when the writer is
+                   closed without an error, and the sidecar metadata (dtype, shape, columns, sha256 of the
+                   data) is written next to it. The result loads with load_numpy_array_data(mmap_mode="r").
+
+                       with NumpyArrayWriter(path, n_columns=10) as writer:
+                           for block in blocks:
+                               writer.append(block)
+    """
+
+    def __init__(self, file_path: str, n_columns: int, dtype: np.dtype = np.float32,
+                 columns: Optional[List[str]] = None, write_metadata: bool = True):
+        try:
+            if columns is not None and len(columns) != n_columns:
+                raise ValueError(f"{len(columns)} column names given for {n_columns} columns")
+            self.file_path = file_path
+            self.n_columns = n_columns
+            self.dtype = np.dtype(dtype)
+            self.columns = columns
+            self.write_metadata = write_metadata
+            self.n_rows = 0
+            self._digest = hashlib.sha256()
+            self._tmp_path = file_path + ".tmp"
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            self._file = open(self._tmp_path, "wb")
+            self._write_header()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _write_header(self) -> None:
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False,
+                  "shape": (self.n_rows, self.n_columns)}
+        # magic string, version 1.0 and the uint16 header length take 10 bytes
+        text = repr(header).encode("latin1")
+        padding = NPY_HEADER_SIZE - 10 - len(text) - 1
+        if padding < 0:
+            raise ValueError(f"Array header does not fit in {NPY_HEADER_SIZE} bytes")
+        self._file.seek(0)
+        self._file.write(np.lib.format.magic(1, 0))
+        self._file.write(np.uint16(NPY_HEADER_SIZE - 10).tobytes())
+        self._file.write(text + b" " * padding + b"\n")
+
+    def append(self, block: np.ndarray) -> None:
+        """
+        Append the rows of a 2-D block (dense array or anything with toarray(), e.g. a sparse matrix)
+        """
+        try:
+            if hasattr(block, "toarray"):
+                block = block.toarray()
+            block = np.ascontiguousarray(block, dtype=self.dtype)
+            if block.ndim != 2 or block.shape[1] != self.n_columns:
+                raise ValueError(f"Expected a block with {self.n_columns} columns, got shape {block.shape}")
+            data = block.tobytes()
+            self._file.write(data)
+            self._digest.update(data)
+            self.n_rows += len(block)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def close(self) -> None:
+        """
+        Finish the file: write the final shape and move it into place
+        """
+        try:
+            if self._file.closed:
+                return
+            self._write_header()
+            self._file.close()
+            os.replace(self._tmp_path, self.file_path)
+            if self.write_metadata:
+                write_numpy_array_metadata(self.file_path, self.dtype, (self.n_rows, self.n_columns),
+                                           self._digest.hexdigest(), self.columns)
+            logging.info(f"Wrote array of shape {(self.n_rows, self.n_columns)} to {self.file_path}")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def abort(self) -> None:
+        """
+        Discard everything written so far
+        """
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self) -> "NumpyArrayWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 
 
 def save_object(file_path: str, obj: object) -> None:
-    logging.info("Entered the save_object method of utils")
+    logging.debug("Entered the save_object method of utils")
 
     try:
+        import dill
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, "wb") as file_obj:
             dill.dump(obj, file_obj)
 
-        logging.info("Exited the save_object method of utils")
+        logging.debug("Exited the save_object method of utils")
+
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+
+def model_manifest_path(file_path: str) -> str:
+    """
+    Manifest file of a model artifact
+    """
+    return file_path + ".manifest.json"
+
 
+# pickle5 artifact layout: magic, payload and index lengths, the protocol-5 pickle stream, a json index of
+# the out-of-band buffers, then the buffers themselves, each aligned for memory-mapping
+_PICKLE5_MAGIC = b"PKL5OOB\x00"
+_PICKLE5_HEADER = "<8sQQ"
+_PICKLE5_ALIGNMENT = 64
+# the quick hash covers the head of an artifact (at least the whole pickle stream) and this many bytes at its end
+QUICK_HASH_BLOCK_SIZE = 1 << 20
+
+
+def _dump_pickle5(obj: object, file_path: str) -> int:
+    """
+    Write obj as a protocol-5 pickle whose numpy buffers are stored out of band, as raw aligned blocks after
+    the pickle stream, so loading can map them instead of copying them. Returns the offset of the first
+    buffer, i.e. the size of the part of the file that is unpickled.
+    """
+    import pickle
+    import struct
+
+    buffers = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    index, offset = [], 0
+    for raw in raw_buffers:
+        offset = -(-offset // _PICKLE5_ALIGNMENT) * _PICKLE5_ALIGNMENT
+        index.append([offset, raw.nbytes])
+        offset += raw.nbytes
+    index_bytes = json.dumps(index).encode()
+    header = struct.pack(_PICKLE5_HEADER, _PICKLE5_MAGIC, len(payload), len(index_bytes))
+    head_size = len(header) + len(payload) + len(index_bytes)
+    data_start = -(-head_size // _PICKLE5_ALIGNMENT) * _PICKLE5_ALIGNMENT
+    with open(file_path, "wb") as file_obj:
+        file_obj.write(header)
+        file_obj.write(payload)
+        file_obj.write(index_bytes)
+        for (offset, _), raw in zip(index, raw_buffers):
+            file_obj.write(b"\0" * (data_start + offset - file_obj.tell()))
+            file_obj.write(raw)
+    return data_start
+
+
+def _load_pickle5(file_path: str, mmap_mode: Optional[str] = None) -> object:
+    """
+    Load an artifact written by _dump_pickle5. mmap_mode "r" maps the file read-only and "c" copy-on-write,
+    and the arrays of the object then point into the mapping; None reads the file into memory.
+    """
+    import mmap
+    import pickle
+    import struct
+
+    with open(file_path, "rb") as file_obj:
+        if mmap_mode:
+            access = {"r": mmap.ACCESS_READ, "c": mmap.ACCESS_COPY}[mmap_mode]
+            data = mmap.mmap(file_obj.fileno(), 0, access=access)
+        else:
+            data = bytearray(os.fstat(file_obj.fileno()).st_size)
+            file_obj.readinto(data)
+    view = memoryview(data)
+    magic, payload_size, index_size = struct.unpack_from(_PICKLE5_HEADER, view)
+    if magic != _PICKLE5_MAGIC:
+        raise ValueError(f"{file_path} is not a pickle5 model artifact")
+    start = struct.calcsize(_PICKLE5_HEADER)
+    index = json.loads(bytes(view[start + payload_size:start + payload_size + index_size]))
+    data_start = -(-(start + payload_size + index_size) // _PICKLE5_ALIGNMENT) * _PICKLE5_ALIGNMENT
+    buffers = [view[data_start + offset:data_start + offset + size] for offset, size in index]
+    return pickle.loads(view[start:start + payload_size], buffers=buffers)
+
+
+def compute_quick_hash(file_path: str, head_bytes: int = 0, block_size: int = QUICK_HASH_BLOCK_SIZE) -> str:
+    """
+    Cheap sha256 of a file checked on every load: the file size, its first max(head_bytes, block_size)
+    bytes and its last block_size bytes. For a pickle5 artifact head_bytes is the whole pickle stream,
+    so everything that is unpickled is covered; the bulk of the numpy buffers is covered by the full
+    sha256 only (verify_model_artifact).
+    """
+    try:
+        digest = hashlib.sha256()
+        size = os.path.getsize(file_path)
+        digest.update(str(size).encode())
+        head = max(head_bytes, block_size)
+        with open(file_path, "rb") as file_obj:
+            digest.update(file_obj.read(head))
+            if size > head:
+                file_obj.seek(max(head, size - block_size))
+                digest.update(file_obj.read())
+        return digest.hexdigest()
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def save_model_artifact(file_path: str, obj: object, compress: int = 0, metadata: Optional[dict] = None,
+                        file_format: str = "pickle5") -> dict:
+    """
+    Save a model or preprocessor next to a manifest with the sha256 of the file, a quick hash of it
+    (see compute_quick_hash), its format and the library versions it was written with.
+    The "pickle5" format keeps the numpy buffers of the object (tree arrays, coefficients, ...) out of band
+    as raw blocks that load_model_artifact can memory-map; "joblib" supports compression.
+    file_path: str location of the artifact
+    obj: object to save
+    compress: joblib compression level 0-9; compressed artifacts are smaller but cannot be memory-mapped
+    metadata: extra information stored in the manifest
+    file_format: "pickle5" or "joblib"
+    return: the manifest
+    """
+    logging.debug("Entered the save_model_artifact method of utils")
+    try:
+        if file_format not in ("pickle5", "joblib"):
+            raise ValueError(f"Unknown model artifact format: {file_format}")
+        if compress and file_format != "joblib":
+            raise ValueError(f"Compressed model artifacts need the joblib format, not {file_format}")
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_path = file_path + ".tmp"
+        head_bytes = 0
+        if file_format == "pickle5":
+            head_bytes = _dump_pickle5(obj, tmp_path)
+        else:
+            import joblib
+            joblib.dump(obj, tmp_path, compress=compress)
+        os.replace(tmp_path, file_path)
+
+        import sklearn
+        versions = {"python": platform.python_version(), "numpy": np.__version__, "scikit-learn": sklearn.__version__}
+        if file_format == "joblib":
+            versions["joblib"] = joblib.__version__
+        manifest = {
+            "format": file_format,
+            "file": os.path.basename(file_path),
+            "sha256": compute_file_hash(file_path),
+            "quick_sha256": compute_quick_hash(file_path, head_bytes=head_bytes),
+            "quick_hash_head_bytes": head_bytes,
+            "size_bytes": os.path.getsize(file_path),
+            "compress": compress,
+            "object_type": f"{type(obj).__module__}.{type(obj).__qualname__}",
+            "versions": versions,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "metadata": metadata or {},
+        }
+        with open(model_manifest_path(file_path), "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2, default=str)
+
+        logging.debug("Exited the save_model_artifact method of utils")
+        return manifest
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def read_model_manifest(file_path: str) -> dict:
+    """
+    Manifest of a model artifact
+    """
+    try:
+        with open(model_manifest_path(file_path)) as file_obj:
+            return json.load(file_obj)
     except Exception as e:
         raise CustomException(e, sys) from e
 
 
+def verify_model_artifact(file_path: str, manifest: Optional[dict] = None) -> dict:
+    """
+    Check an artifact against the sha256 of its manifest. This reads the whole file, so it is done when a
+    model is registered or promoted, or on request (load_model_artifact(verify=True)); every load checks
+    the quick hash instead.
+    file_path: str location of the artifact
+    manifest: the manifest of the artifact when it was already read
+    return: the manifest
+    """
+    try:
+        manifest = manifest if manifest is not None else read_model_manifest(file_path)
+        if compute_file_hash(file_path) != manifest["sha256"]:
+            raise ValueError(f"{file_path} does not match the sha256 of its manifest, refusing to load it")
+        return manifest
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def load_model_artifact(file_path: str, mmap_mode: Optional[str] = None, verify: bool = False) -> object:
+    """
+    Load an artifact written by save_model_artifact, after checking its size and quick hash against the
+    manifest, so a truncated, replaced or edited file (and any change of the pickle stream) is refused
+    wherever the artifact is loaded from.
+    file_path: str location of the artifact
+    mmap_mode: "r" memory-maps the numpy buffers of an uncompressed artifact instead of reading them,
+               so worker processes loading the same model share its pages
+    verify: also check the whole file against the sha256 of its manifest (see verify_model_artifact)
+    return: the loaded object
+    """
+    logging.debug("Entered the load_model_artifact method of utils")
+    try:
+        manifest = read_model_manifest(file_path)
+        file_format = manifest.get("format")
+        if file_format not in ("pickle5", "joblib"):
+            raise ValueError(f"Unsupported model artifact format: {file_format}")
+        if "size_bytes" in manifest and os.path.getsize(file_path) != manifest["size_bytes"]:
+            raise ValueError(f"{file_path} does not have the size of its manifest, refusing to load it")
+        if "quick_sha256" in manifest and compute_quick_hash(
+                file_path, head_bytes=manifest.get("quick_hash_head_bytes", 0)) != manifest["quick_sha256"]:
+            raise ValueError(f"{file_path} does not match the quick hash of its manifest, refusing to load it")
+        if verify:
+            verify_model_artifact(file_path, manifest)
+        if mmap_mode and manifest.get("compress"):
+            logging.info(f"{file_path} is compressed and cannot be memory-mapped, loading it into memory")
+            mmap_mode = None
+        if file_format == "pickle5":
+            obj = _load_pickle5(file_path, mmap_mode=mmap_mode)
+        else:
+            import joblib
+            obj = joblib.load(file_path, mmap_mode=mmap_mode)
+        logging.debug("Exited the load_model_artifact method of utils")
+        return obj
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+class LazyModelArtifact:
+    """
+    Class Name :   LazyModelArtifact
+    Description :  Handle on a model artifact that only reads the manifest up front and loads the object on
+                   first use (load() or any attribute access, e.g. predict), so workers start without paying
+                   for models they may never call. Loading is thread-safe and happens once.
+    """
+
+    def __init__(self, file_path: str, mmap_mode: Optional[str] = "r", verify: bool = False):
+        self.file_path = file_path
+        self.mmap_mode = mmap_mode
+        self.verify = verify
+        self.manifest = read_model_manifest(file_path)
+        self._obj = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._obj is not None
+
+    def load(self) -> object:
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = load_model_artifact(self.file_path, mmap_mode=self.mmap_mode, verify=self.verify)
+        return self._obj
+
+    def __getattr__(self, name: str):
+        # only called for attributes not found on the handle itself
+        if name.startswith("__") or name in ("_obj", "_lock"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
 
-def drop_columns(df: DataFrame, cols: list)-> DataFrame:
+def drop_columns(df: "DataFrame", cols: list)-> "DataFrame":
 
     """
     drop the columns form a pandas DataFrame
     df: pandas DataFrame
     cols: list of columns to be dropped
     """
-    logging.info("Entered drop_columns methon of utils")
+    logging.debug("Entered drop_columns methon of utils")
 
     try:
         df = df.drop(columns=cols, axis=1)
 
-        logging.info("Exited the drop_columns method of utils")
+        logging.debug("Exited the drop_columns method of utils")
         
         return df
     except Exception as e:
@@ -0,0 +1,330 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from insurance_fraud_detection.constants import (MODEL_REGISTRY_BUNDLE_DIR_NAME, MODEL_REGISTRY_DIR,
+                                                 MODEL_REGISTRY_MAX_HISTORY, MODEL_REGISTRY_MODEL_FILE_NAME,
+                                                 MODEL_REGISTRY_POINTER_FILE_NAME,
+                                                 MODEL_REGISTRY_PREPROCESSOR_FILE_NAME)
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.utils.main_utils import model_manifest_path, read_model_manifest, verify_model_artifact
+
+
+BUNDLE_FILE_NAME = "bundle.json"
+
+
+def _write_json_atomic(file_path: str, content: dict) -> None:
+    """
+    Write content to a temporary file next to file_path and rename it over file_path, so readers see
+    either the old or the new file and never a partial one.
+    """
+    directory = os.path.dirname(file_path) or "."
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(file_descriptor, "w") as file_obj:
+            json.dump(content, file_obj, indent=2, default=str)
+            file_obj.flush()
+            os.fsync(file_obj.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ModelRegistry:
+    """
+    Class Name :   ModelRegistry
+    Description :  Content-addressed local registry of model bundles.
+
+                   A bundle holds a model artifact and its preprocessor artifact (with their manifests) and is
+                   stored under bundles/<version>, where version is derived from the sha256 of both artifacts,
+                   so registering the same bundle twice is a no-op and a bundle never changes once written.
+                   The production version is named by the CURRENT pointer file, which is replaced atomically
+                   on promotion and rollback; serving processes only ever read immutable bundle files.
+                   The artifacts are checked against their sha256 when they are registered and again before
+                   a promotion or rollback, so serving processes load them without hashing them.
+    """
+
+    def __init__(self, registry_dir: str = MODEL_REGISTRY_DIR, max_history: int = MODEL_REGISTRY_MAX_HISTORY):
+        self.registry_dir = registry_dir
+        self.bundles_dir = os.path.join(registry_dir, MODEL_REGISTRY_BUNDLE_DIR_NAME)
+        self.pointer_file_path = os.path.join(registry_dir, MODEL_REGISTRY_POINTER_FILE_NAME)
+        self.max_history = max_history
+
+    def bundle_dir(self, version: str) -> str:
+        return os.path.join(self.bundles_dir, version)
+
+    def model_file_path(self, version: str) -> str:
+        return os.path.join(self.bundle_dir(version), MODEL_REGISTRY_MODEL_FILE_NAME)
+
+    def preprocessor_file_path(self, version: str) -> str:
+        return os.path.join(self.bundle_dir(version), MODEL_REGISTRY_PREPROCESSOR_FILE_NAME)
+
+    @staticmethod
+    def bundle_version(model_file_path: str, preprocessor_file_path: Optional[str] = None) -> str:
+        """
+        Content address of a bundle, computed from the sha256 recorded in the artifact manifests
+        """
+        digest = hashlib.sha256(read_model_manifest(model_file_path)["sha256"].encode())
+        if preprocessor_file_path is not None:
+            digest.update(read_model_manifest(preprocessor_file_path)["sha256"].encode())
+        return digest.hexdigest()[:16]
+
+    def list_versions(self) -> List[dict]:
+        """
+        Metadata of every registered bundle, oldest first
+        """
+        try:
+            if not os.path.isdir(self.bundles_dir):
+                return []
+            bundles = [self.read_bundle(version) for version in os.listdir(self.bundles_dir)
+                       if os.path.exists(os.path.join(self.bundle_dir(version), BUNDLE_FILE_NAME))]
+            return sorted(bundles, key=lambda bundle: bundle["registered_at"])
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def read_bundle(self, version: str) -> dict:
+        try:
+            with open(os.path.join(self.bundle_dir(version), BUNDLE_FILE_NAME)) as file_obj:
+                return json.load(file_obj)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def register(self, model_file_path: str, preprocessor_file_path: Optional[str] = None,
+                 metadata: Optional[dict] = None) -> str:
+        """
+        Method Name :   register
+        Description :   This method copies a model artifact (and its preprocessor) into a new bundle. The bundle
+                        is assembled in a temporary directory, its copies are checked against the sha256 of
+                        their manifests and it is renamed into place, so a bundle directory is either complete
+                        and verified or absent
+
+        Output      :   version of the bundle
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            version = self.bundle_version(model_file_path, preprocessor_file_path)
+            bundle_dir = self.bundle_dir(version)
+            if os.path.exists(bundle_dir):
+                logging.info(f"Bundle {version} is already registered in {self.registry_dir}")
+                return version
+
+            os.makedirs(self.bundles_dir, exist_ok=True)
+            temp_dir = tempfile.mkdtemp(dir=self.bundles_dir, prefix=".tmp-")
+            try:
+                files = {MODEL_REGISTRY_MODEL_FILE_NAME: model_file_path}
+                if preprocessor_file_path is not None:
+                    files[MODEL_REGISTRY_PREPROCESSOR_FILE_NAME] = preprocessor_file_path
+                for file_name, source_path in files.items():
+                    shutil.copy2(source_path, os.path.join(temp_dir, file_name))
+                    shutil.copy2(model_manifest_path(source_path), model_manifest_path(os.path.join(temp_dir, file_name)))
+                    verify_model_artifact(os.path.join(temp_dir, file_name))
+                bundle = {
+                    "version": version,
+                    "registered_at": datetime.now().isoformat(timespec="microseconds"),
+                    "files": {file_name: read_model_manifest(source_path)["sha256"]
+                              for file_name, source_path in files.items()},
+                    "sources": files,
+                    "metadata": metadata or {},
+                }
+                _write_json_atomic(os.path.join(temp_dir, BUNDLE_FILE_NAME), bundle)
+                os.rename(temp_dir, bundle_dir)
+            except BaseException:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                if os.path.exists(bundle_dir):
+                    # registered concurrently by another process, which is just as good
+                    return version
+                raise
+            logging.info(f"Registered bundle {version} in {self.registry_dir}")
+            return version
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def verify_bundle(self, version: str) -> None:
+        """
+        Check every artifact of a registered bundle against its sha256 before it goes into production
+        """
+        if not os.path.exists(os.path.join(self.bundle_dir(version), BUNDLE_FILE_NAME)):
+            raise ValueError(f"Bundle {version} is not registered in {self.registry_dir}")
+        for file_name in self.read_bundle(version)["files"]:
+            verify_model_artifact(os.path.join(self.bundle_dir(version), file_name))
+
+    def read_pointer(self) -> Optional[dict]:
+        """
+        Content of the CURRENT pointer, None when nothing was promoted yet
+        """
+        try:
+            with open(self.pointer_file_path) as file_obj:
+                return json.load(file_obj)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def current_version(self) -> Optional[str]:
+        pointer = self.read_pointer()
+        return None if pointer is None else pointer["version"]
+
+    def current_model_file_path(self) -> Optional[str]:
+        version = self.current_version()
+        return None if version is None else self.model_file_path(version)
+
+    def _swap_pointer(self, version: str, history: List[str], action: str) -> None:
+        _write_json_atomic(self.pointer_file_path, {
+            "version": version,
+            "history": history[-self.max_history:] if self.max_history > 0 else [],
+            "action": action,
+            "updated_at": datetime.now().isoformat(timespec="microseconds"),
+        })
+
+    def promote(self, version: str) -> None:
+        """
+        Method Name :   promote
+        Description :   This method makes a registered bundle the production version by atomically replacing
+                        the CURRENT pointer; the previous version is kept in the pointer history for rollback
+
+        Output      :   None
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            self.verify_bundle(version)
+            pointer = self.read_pointer()
+            history = [] if pointer is None else pointer["history"]
+            if pointer is not None:
+                if pointer["version"] == version:
+                    logging.info(f"Bundle {version} is already the production version")
+                    return
+                history = history + [pointer["version"]]
+            self._swap_pointer(version, history, action="promote")
+            logging.info(f"Promoted bundle {version} to production in {self.registry_dir}")
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def rollback(self, version: Optional[str] = None) -> str:
+        """
+        Method Name :   rollback
+        Description :   This method points CURRENT back to the previous production version, or to version when
+                        given (which must be in the history); the versions promoted after it leave the history
+
+        Output      :   version that is now in production
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            pointer = self.read_pointer()
+            if pointer is None or not pointer["history"]:
+                raise ValueError(f"No previous version to roll back to in {self.registry_dir}")
+            history = pointer["history"]
+            if version is None:
+                version = history[-1]
+            elif version not in history:
+                raise ValueError(f"Bundle {version} is not in the promotion history of {self.registry_dir}")
+            index = len(history) - 1 - history[::-1].index(version)
+            self.verify_bundle(version)
+            self._swap_pointer(version, history[:index], action="rollback")
+            logging.info(f"Rolled back {self.registry_dir} from {pointer['version']} to {version}")
+            return version
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+class ModelRegistryWatcher:
+    """
+    Class Name :   ModelRegistryWatcher
+    Description :  Polls the CURRENT pointer of a registry on a daemon thread and calls on_change(version)
+                   when another version was promoted or rolled back to. The callback runs on the watcher
+                   thread, so a serving process loads the new bundle in the background; a failed load is
+                   logged and not retried until the pointer changes again.
+    """
+
+    def __init__(self, registry: ModelRegistry, on_change: Callable[[str], None], poll_seconds: float = 5.0,
+                 current_version: Optional[str] = None):
+        self.registry = registry
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.current_version = current_version
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _pointer_signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.registry.pointer_file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def check(self) -> bool:
+        """
+        Call on_change when the pointer names a new version; returns whether it did
+        """
+        signature = self._pointer_signature()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        version = self.registry.current_version()
+        if version is None or version == self.current_version:
+            return False
+        logging.info(f"Registry {self.registry.registry_dir} switched to {version}, reloading")
+        previous_version, self.current_version = self.current_version, version
+        try:
+            self.on_change(version)
+        except Exception:
+            logging.exception(f"Loading bundle {version} failed, still serving {previous_version}")
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception:
+                logging.exception(f"Checking registry {self.registry.registry_dir} failed")
+
+    def start(self) -> "ModelRegistryWatcher":
+        self._signature = self._pointer_signature()
+        self._thread = threading.Thread(target=self._run, name="model-registry-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Inspect the registry and promote or roll back by hand:
+    python -m insurance_fraud_detection.utils.model_registry {list,promote,rollback} [version]
+    """
+    parser = argparse.ArgumentParser(description="Local model registry")
+    parser.add_argument("command", choices=["list", "promote", "rollback"])
+    parser.add_argument("version", nargs="?")
+    parser.add_argument("--registry", default=MODEL_REGISTRY_DIR)
+    args = parser.parse_args(argv)
+    init_logging()
+
+    registry = ModelRegistry(registry_dir=args.registry)
+    if args.command == "promote":
+        if args.version is None:
+            parser.error("promote needs a version")
+        registry.promote(args.version)
+    elif args.command == "rollback":
+        registry.rollback(args.version)
+    current = registry.current_version()
+    for bundle in registry.list_versions():
+        marker = "*" if bundle["version"] == current else " "
+        print(f"{marker} {bundle['version']}  {bundle['registered_at']}  {bundle['metadata']}")
+
+
+if __name__ == "__main__":
+    main()
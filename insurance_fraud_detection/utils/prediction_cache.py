@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Optional
+
+
+class PredictionCache:
+    """
+    Class Name :   PredictionCache
+    Description :  Bounded LRU cache of prediction results with a time-to-live, keyed by a canonical hash of
+                   the feature record and the model version. invalidate(model_version) drops every entry and
+                   makes later keys carry the new version, so a reloaded model never serves old results.
+                   Thread safe: the service reads it on the event loop and fills it on the predict thread.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl_seconds: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.model_version: Optional[str] = None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def key(self, record: dict, columns: Iterable[str], model_version: Optional[str] = None) -> str:
+        """
+        Hash of the model version (the cache's current one unless given) and the values of columns in
+        record, independent of the key order of record and of columns it holds besides the feature columns.
+        """
+        model_version = self.model_version if model_version is None else model_version
+        values = json.dumps([model_version] + [record.get(column) for column in columns],
+                            separators=(",", ":"), default=str)
+        return hashlib.blake2b(values.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        return [self.get(key) for key in keys]
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = self.clock() + self.ttl_seconds if self.ttl_seconds and self.ttl_seconds > 0 else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_version: Optional[str] = None) -> None:
+        """
+        Drop all entries, e.g. because a new model was loaded
+        """
+        with self._lock:
+            self._entries.clear()
+            self.model_version = model_version
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,449 @@
+import argparse
+import atexit
+import cProfile
+import functools
+import io
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from insurance_fraud_detection.entity.config_entity import RunMetricsConfig
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import read_yaml_file, write_yaml_file
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+PROFILERS = ("", "cprofile", "sampling")
+RUN_METRICS_FILE_NAME = "run_metrics.yaml"
+# metrics compared between runs, with the relative increase reported as a regression
+COMPARED_METRICS = ("wall_seconds", "cpu_seconds", "peak_rss_increase_mb", "bytes_read", "bytes_written")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# the step that resources and rows are currently attributed to
+_current_step: ContextVar[Optional["StepMetrics"]] = ContextVar("run_metrics_step", default=None)
+
+
+def _read_proc_io() -> Dict[str, int]:
+    """
+    Bytes this process read and wrote through system calls (rchar / wchar, including sockets, e.g. MySQL)
+    and from / to storage (read_bytes / write_bytes); empty where /proc/self/io does not exist
+    """
+    try:
+        with open("/proc/self/io") as file_obj:
+            counters = dict(line.split(": ") for line in file_obj.read().splitlines())
+        return {key: int(counters[key]) for key in ("rchar", "wchar", "read_bytes", "write_bytes")}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as file_obj:
+            return int(file_obj.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _children_cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _snapshot() -> dict:
+    return {
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "cpu_children": _children_cpu_seconds(),
+        "rss": _rss_bytes(),
+        "max_rss": _max_rss_bytes(),
+        "io": _read_proc_io(),
+    }
+
+
+def _mb(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value / 2 ** 20, 2)
+
+
+class StepMetrics:
+    """
+    Class Name :   StepMetrics
+    Description :  Resources used by one stage or sub-step of a run, summed over all calls of the step
+                   under the same parent: wall and CPU time (of this process and of the worker processes
+                   it waited for), resident memory, bytes read and written, and the rows the step reported
+                   with add_rows. Peak RSS is the high-water mark of the process when the step ended;
+                   peak_rss_increase_mb is how much the step itself raised it.
+    """
+
+    def __init__(self, name: str, parent: Optional["StepMetrics"] = None, run: Optional["RunMetrics"] = None):
+        self.name = name
+        self.parent = parent
+        self.run = run if run is not None else (parent.run if parent is not None else None)
+        self.children: Dict[str, StepMetrics] = {}
+        self.calls = 0
+        self.failures = 0
+        self.wall_seconds = self.cpu_seconds = self.cpu_children_seconds = 0.0
+        self.rss_start = self.rss_end = self.peak_rss = None
+        self.peak_rss_increase = 0
+        self.rows_in = self.rows_out = 0
+        self.io: Counter = Counter()
+        self.annotations: dict = {}
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def child(self, name: str) -> "StepMetrics":
+        with self._lock:
+            if name not in self.children:
+                self.children[name] = StepMetrics(name, parent=self)
+            return self.children[name]
+
+    def record(self, start: dict, end: dict) -> None:
+        with self._lock:
+            self.calls += 1
+            self.wall_seconds += end["wall"] - start["wall"]
+            self.cpu_seconds += end["cpu"] - start["cpu"]
+            self.cpu_children_seconds += end["cpu_children"] - start["cpu_children"]
+            if self.rss_start is None:
+                self.rss_start = start["rss"]
+            self.rss_end = end["rss"]
+            if end["max_rss"] is not None:
+                self.peak_rss = max(self.peak_rss or 0, end["max_rss"])
+                self.peak_rss_increase = max(self.peak_rss_increase, end["max_rss"] - start["max_rss"])
+            for key, value in end["io"].items():
+                self.io[key] += value - start["io"].get(key, value)
+
+    def as_dict(self) -> dict:
+        metrics = {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "cpu_children_seconds": round(self.cpu_children_seconds, 4),
+            "rss_start_mb": _mb(self.rss_start),
+            "rss_end_mb": _mb(self.rss_end),
+            "peak_rss_mb": _mb(self.peak_rss),
+            "peak_rss_increase_mb": _mb(self.peak_rss_increase),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.io.get("rchar"),
+            "bytes_written": self.io.get("wchar"),
+            "storage_bytes_read": self.io.get("read_bytes"),
+            "storage_bytes_written": self.io.get("write_bytes"),
+        }
+        rows = max(self.rows_in, self.rows_out)
+        if rows and self.wall_seconds > 0:
+            metrics["rows_per_sec"] = round(rows / self.wall_seconds, 1)
+        if self.failures:
+            metrics["failures"] = self.failures
+            metrics["error"] = self.error
+        if self.annotations:
+            metrics.update(self.annotations)
+        if self.children:
+            metrics["steps"] = {name: child.as_dict() for name, child in self.children.items()}
+        return metrics
+
+
+@contextmanager
+def step(name: str) -> Iterator[Optional[StepMetrics]]:
+    """
+    Measure the enclosed block as step name of the current step. Outside a run (see RunMetrics.start)
+    nothing is measured, so components can be instrumented unconditionally. The current step is held in
+    a context variable: blocks running on other threads or processes are not attributed to it.
+    """
+    parent = _current_step.get()
+    if parent is None:
+        yield None
+        return
+    metrics = parent.child(name)
+    token = _current_step.set(metrics)
+    # top-level steps are the stages, those are the ones profiled
+    profiler = parent.run.start_profiler(name) if parent.parent is None and parent.run is not None else None
+    start = _snapshot()
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics.failures += 1
+        metrics.error = repr(e)[:500]
+        raise
+    finally:
+        metrics.record(start, _snapshot())
+        if profiler is not None:
+            parent.run.stop_profiler(name, profiler)
+        _current_step.reset(token)
+
+
+def instrumented_step(name: Optional[str] = None) -> Callable:
+    """
+    Decorator measuring every call of the function as a step (named after the function by default)
+    """
+    def decorator(function: Callable) -> Callable:
+        step_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with step(step_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_rows(rows_in: int = 0, rows_out: int = 0) -> None:
+    """
+    Count rows read and produced by the current step
+    """
+    metrics = _current_step.get()
+    if metrics is not None:
+        with metrics._lock:
+            metrics.rows_in += int(rows_in)
+            metrics.rows_out += int(rows_out)
+
+
+def annotate(**values) -> None:
+    """
+    Attach values (e.g. cached=True) to the current step
+    """
+    metrics = _current_step.get()
+    if metrics is not None:
+        metrics.annotations.update(values)
+
+
+class _StackSampler:
+    """
+    Sampling profiler: a daemon thread records the stack of the profiled thread every interval seconds;
+    stacks are written in the collapsed format of flame graph tools, with the hottest frames summarised.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="run-metrics-sampler", daemon=True)
+
+    def start(self) -> "_StackSampler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, file_path_prefix: str) -> None:
+        with open(f"{file_path_prefix}.folded", "w") as file_obj:
+            for stack, count in self.stacks.most_common():
+                file_obj.write(f"{stack} {count}\n")
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        with open(f"{file_path_prefix}.txt", "w") as file_obj:
+            file_obj.write(f"{total} samples every {self.interval * 1000:.1f} ms\n")
+            for frame, count in leaves.most_common(30):
+                file_obj.write(f"{100 * count / total:6.2f}%  {frame}\n")
+
+
+class RunMetrics:
+    """
+    Class Name :   RunMetrics
+    Description :  Collects the StepMetrics of one pipeline run and writes them as the run metrics artifact
+                   (run_metrics_dir/<run id>/run_metrics.yaml, copied to latest.yaml), so runs can be
+                   compared with compare_runs. Stages are measured by StageCache.run, sub-steps by step() /
+                   instrumented_step in the components. With profile "cprofile" or "sampling" every stage
+                   is also profiled into the run directory.
+    """
+
+    def __init__(self, config: RunMetricsConfig = RunMetricsConfig(), run_name: str = "training_pipeline",
+                 metadata: Optional[dict] = None):
+        self.config = config
+        if self.config.profile not in PROFILERS:
+            raise ValueError(f"profile must be one of {PROFILERS}, got {self.config.profile}")
+        self.run_name = run_name
+        # settings of the run written with its metrics, e.g. the data size of a benchmark
+        self.metadata = metadata or {}
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.run_dir = os.path.join(self.config.run_metrics_dir, self.run_id)
+        self.root = StepMetrics(run_name, run=self)
+        self.started_at: Optional[datetime] = None
+        self._start: Optional[dict] = None
+        self._token = None
+        self._finished = False
+
+    def start(self, finish_at_exit: bool = False) -> "RunMetrics":
+        """
+        Attribute the steps of this context to the run; finish_at_exit writes the artifact when the
+        process exits, also when a stage raised
+        """
+        self.started_at = datetime.now()
+        self._start = _snapshot()
+        self._token = _current_step.set(self.root)
+        if finish_at_exit:
+            atexit.register(self.finish)
+        return self
+
+    @contextmanager
+    def run(self) -> Iterator["RunMetrics"]:
+        self.start()
+        try:
+            yield self
+        finally:
+            self.finish()
+
+    def start_profiler(self, stage_name: str):
+        if self.config.profile == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.config.profile == "sampling":
+            return _StackSampler(self.config.sampling_interval).start()
+        return None
+
+    def stop_profiler(self, stage_name: str, profiler) -> None:
+        try:
+            os.makedirs(self.run_dir, exist_ok=True)
+            file_path_prefix = os.path.join(self.run_dir, f"profile_{stage_name}")
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+                profiler.dump_stats(f"{file_path_prefix}.prof")
+                summary = io.StringIO()
+                pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+                with open(f"{file_path_prefix}.txt", "w") as file_obj:
+                    file_obj.write(summary.getvalue())
+            else:
+                profiler.stop()
+                profiler.write(file_path_prefix)
+            logging.info("Profile of stage %s written to %s", stage_name, self.run_dir)
+        except Exception:
+            logging.exception("Writing the profile of stage %s failed", stage_name)
+
+    def as_dict(self) -> dict:
+        metrics = self.root.as_dict()
+        return {
+            "run_id": self.run_id,
+            "run_name": self.run_name,
+            "started_at": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "pid": os.getpid(),
+            "python": sys.version.split()[0],
+            "profile": self.config.profile or None,
+            "metadata": self.metadata,
+            "totals": {key: value for key, value in metrics.items() if key not in ("steps", "calls")},
+            "stages": metrics.get("steps", {}),
+        }
+
+    def finish(self) -> Optional[str]:
+        """
+        Method Name :   finish
+        Description :   This method ends the run and writes the run metrics artifact
+
+        Output      :   path of the run metrics file
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        if self._finished or self._start is None:
+            return None
+        self._finished = True
+        try:
+            self.root.record(self._start, _snapshot())
+            if self._token is not None:
+                try:
+                    _current_step.reset(self._token)
+                except ValueError:
+                    # finished from another context (e.g. atexit), nothing to restore there
+                    pass
+            file_path = os.path.join(self.run_dir, RUN_METRICS_FILE_NAME)
+            write_yaml_file(file_path=file_path, content=self.as_dict())
+            shutil.copyfile(file_path, self.config.latest_file_path)
+            logging.info("Run metrics written to %s", file_path)
+            return file_path
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+def _flatten(stages: dict, prefix: str = "") -> Dict[str, dict]:
+    flat = {}
+    for name, metrics in stages.items():
+        path = f"{prefix}{name}"
+        flat[path] = metrics
+        flat.update(_flatten(metrics.get("steps", {}), prefix=f"{path}/"))
+    return flat
+
+
+def compare_runs(baseline: dict, current: dict, threshold: float = 0.2, min_seconds: float = 0.05,
+                 min_mb: float = 8.0, min_bytes: int = 2 ** 20) -> List[dict]:
+    """
+    Differences of the compared metrics of every step present in both runs, largest relative increase
+    first; a change is flagged as a regression when it grows by more than threshold (relative) and by
+    more than min_seconds, min_mb or min_bytes (absolute), so noise on small values is not flagged
+    """
+    min_increase = {"seconds": min_seconds, "mb": min_mb, "read": min_bytes, "written": min_bytes}
+    rows = []
+    baseline_steps, current_steps = _flatten(baseline["stages"]), _flatten(current["stages"])
+    for path in [path for path in current_steps if path in baseline_steps]:
+        for metric in COMPARED_METRICS:
+            before, after = baseline_steps[path].get(metric), current_steps[path].get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+            regression = change > threshold and after - before > min_increase[metric.rsplit("_", 1)[-1]]
+            rows.append({"step": path, "metric": metric, "baseline": before, "current": after,
+                         "change": round(change, 4) if change != float("inf") else None,
+                         "regression": regression})
+    return sorted(rows, key=lambda row: -(row["change"] if row["change"] is not None else float("inf")))
+
+
+def print_comparison(rows: List[dict]) -> None:
+    for row in rows:
+        change = "new" if row["change"] is None else f"{row['change']:+.1%}"
+        marker = "REGRESSION" if row["regression"] else ""
+        print(f"{row['step']:<60} {row['metric']:<22} {row['baseline']:>14} {row['current']:>14} {change:>9} {marker}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Compare two run metrics files:
+    python -m insurance_fraud_detection.utils.run_metrics baseline.yaml [current.yaml]
+    (current defaults to the latest run); exits with 1 when a step regressed
+    """
+    parser = argparse.ArgumentParser(description="Compare the run metrics of two pipeline runs")
+    parser.add_argument("baseline")
+    parser.add_argument("current", nargs="?", default=RunMetricsConfig().latest_file_path)
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative increase flagged as regression")
+    args = parser.parse_args(argv)
+
+    rows = compare_runs(read_yaml_file(args.baseline), read_yaml_file(args.current), threshold=args.threshold)
+    print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
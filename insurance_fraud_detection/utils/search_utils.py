@@ -0,0 +1,328 @@
+import hashlib
+import importlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import load_numpy_array_data, read_numpy_array_metadata
+
+
+def import_class(class_path: str) -> type:
+    """
+    Import a class from its dotted path, e.g. sklearn.svm.SVC
+    """
+    module_name, class_name = class_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def candidate_id(model_name: str, params: dict) -> str:
+    return f"{model_name}{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def expand_candidates(model_config: dict) -> List[dict]:
+    """
+    One candidate per model and combination of search_params in model.yaml. Models whose class
+    cannot be imported (optional packages) are skipped.
+    """
+    # scikit-learn is imported by the functions that use it, so a cached training stage never loads it
+    from sklearn.model_selection import ParameterGrid
+
+    candidates = []
+    for model_name, spec in model_config["models"].items():
+        try:
+            import_class(spec["class"])
+        except ImportError as e:
+            logging.info(f"Skipping candidate model {model_name}: {e}")
+            continue
+        for search_params in ParameterGrid(spec.get("search_params") or {}):
+            params = {**(spec.get("fixed_params") or {}), **search_params}
+            candidates.append({
+                "id": candidate_id(model_name, params),
+                "model_name": model_name,
+                "class": spec["class"],
+                "params": params,
+            })
+    return candidates
+
+
+# training matrix of a search worker, memory-mapped once per process by _init_worker
+_worker_features: Optional[np.ndarray] = None
+_worker_target: Optional[np.ndarray] = None
+
+
+def _init_worker(train_file_path: str) -> None:
+    global _worker_features, _worker_target
+    array = load_numpy_array_data(train_file_path, mmap_mode="r")
+    _worker_features, _worker_target = array[:, :-1], array[:, -1]
+
+
+def _fit_fold(class_path: str, params: dict, train_index: np.ndarray, valid_index: np.ndarray,
+              scoring: str) -> Tuple[float, float]:
+    """
+    Fit one candidate on one fold and score it on the held-out rows; runs in a worker process.
+    """
+    from sklearn.metrics import get_scorer
+
+    start = time.perf_counter()
+    estimator = import_class(class_path)(**params)
+    estimator.fit(_worker_features[train_index], _worker_target[train_index])
+    score = get_scorer(scoring)(estimator, _worker_features[valid_index], _worker_target[valid_index])
+    return float(score), time.perf_counter() - start
+
+
+class SearchResultCache:
+    """
+    Class Name :   SearchResultCache
+    Description :  Append-only JSONL file of finished fold evaluations, keyed by the data, the candidate
+                   and the fold, so an interrupted or repeated search only runs the fits it is missing.
+    """
+
+    def __init__(self, file_path: Optional[str]):
+        self.file_path = file_path
+        self.results: Dict[str, dict] = {}
+        if file_path and os.path.exists(file_path):
+            with open(file_path) as file_obj:
+                for line in file_obj:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a line cut short by an interrupted run
+                        continue
+                    self.results[record["key"]] = record
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.results.get(key)
+
+    def add(self, record: dict) -> None:
+        self.results[record["key"]] = record
+        if self.file_path:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with open(self.file_path, "a") as file_obj:
+                file_obj.write(json.dumps(record, default=str) + "\n")
+
+
+class SuccessiveHalvingSearch:
+    """
+    Class Name :   SuccessiveHalvingSearch
+    Description :  Hyperparameter search over the candidates of model.yaml, run as (candidate, fold) fits
+                   on a process pool. Workers memory-map the transformed train array instead of receiving
+                   copies of it.
+
+                   strategy "successive_halving" evaluates every candidate on a small stratified subsample,
+                   keeps the best 1/factor and grows the subsample factor times per rung until the last
+                   rung uses all rows. strategy "exhaustive" cross-validates every candidate on all rows.
+
+                   No new fits are started once time_budget seconds or max_fits fits are used up; the best
+                   candidate of the highest rung it reached is returned. Every successful fit is appended to
+                   the result cache, so a restarted search resumes where it stopped; failed fits are not
+                   cached and run again on the next search.
+    """
+
+    def __init__(self, candidates: List[dict], train_file_path: str, scoring: str = "f1",
+                 strategy: str = "successive_halving", n_folds: int = 3, factor: int = 3, min_samples: int = 200,
+                 time_budget: Optional[float] = None, max_fits: Optional[int] = None, n_jobs: int = 0,
+                 random_state: int = 42, cache_file_path: Optional[str] = None):
+        if strategy not in ("successive_halving", "exhaustive"):
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        if not candidates:
+            raise ValueError("No candidate models to search")
+        if max_fits is not None and max_fits < n_folds:
+            raise ValueError(f"max_fits={max_fits} cannot score any candidate: every candidate needs "
+                             f"n_folds={n_folds} fits, so max_fits must be at least {n_folds}")
+        self.candidates = {candidate["id"]: candidate for candidate in candidates}
+        self.train_file_path = train_file_path
+        self.scoring = scoring
+        self.strategy = strategy
+        self.n_folds = n_folds
+        self.factor = factor
+        self.min_samples = min_samples
+        self.time_budget = time_budget
+        self.max_fits = max_fits
+        self.n_jobs = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+        self.random_state = random_state
+        self.cache = SearchResultCache(cache_file_path)
+
+    def rung_sizes(self, n_rows: int) -> List[int]:
+        """
+        Number of training rows of every rung, the last one being all rows.
+        """
+        if self.strategy == "exhaustive":
+            return [n_rows]
+        n_rungs = 1 + int(math.floor(math.log(len(self.candidates), self.factor))) if len(self.candidates) > 1 else 1
+        sizes = [int(n_rows / self.factor ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+        return [size for size in sizes[:-1] if size >= self.min_samples] + [n_rows]
+
+    def _data_hash(self) -> str:
+        metadata = read_numpy_array_metadata(self.train_file_path)
+        if metadata and metadata.get("sha256"):
+            return metadata["sha256"]
+        stat = os.stat(self.train_file_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _fold_key(self, data_hash: str, candidate: dict, n_samples: int, fold: int) -> str:
+        content = [data_hash, candidate["class"], candidate["id"], n_samples, fold, self.n_folds,
+                   self.random_state, self.scoring]
+        return hashlib.sha256(json.dumps(content, default=str).encode()).hexdigest()
+
+    def _folds(self, target: np.ndarray, n_samples: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Stratified folds over a stratified subsample of n_samples rows; subsamples of later rungs
+        contain those of earlier ones.
+        """
+        rng = np.random.default_rng(self.random_state)
+        order = rng.permutation(len(target))
+        if n_samples < len(target):
+            # take the same share of every class, in the fixed random order
+            rows = []
+            for label in np.unique(target):
+                label_rows = order[target[order] == label]
+                rows.append(label_rows[:max(1, round(len(label_rows) * n_samples / len(target)))])
+            subsample = np.sort(np.concatenate(rows))
+        else:
+            subsample = np.arange(len(target))
+        from sklearn.model_selection import StratifiedKFold
+
+        splitter = StratifiedKFold(n_splits=self.n_folds, shuffle=True, random_state=self.random_state)
+        return [(subsample[train], subsample[valid]) for train, valid in
+                splitter.split(np.zeros(len(subsample)), target[subsample])]
+
+    def run(self) -> dict:
+        """
+        Method Name :   run
+        Description :   Runs the search and returns its report: the best candidate, a leaderboard of
+                        the mean fold scores of every candidate per rung, and budget and cache usage.
+        """
+        try:
+            start = time.perf_counter()
+            deadline = start + self.time_budget if self.time_budget else None
+            target = load_numpy_array_data(self.train_file_path, mmap_mode="r")[:, -1].astype(np.int64)
+            data_hash = self._data_hash()
+            sizes = self.rung_sizes(len(target))
+            logging.info(f"Searching {len(self.candidates)} candidates with {self.strategy}, rungs of {sizes} rows, "
+                         f"{self.n_folds} folds, {self.n_jobs} workers")
+
+            alive = list(self.candidates)
+            rungs = []
+            fits, cached_fits = 0, 0
+            budget_exhausted = False
+            executor = None
+            if self.n_jobs > 1:
+                executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                               initargs=(self.train_file_path,))
+            else:
+                _init_worker(self.train_file_path)
+            try:
+                for rung, n_samples in enumerate(sizes):
+                    folds = self._folds(target, n_samples)
+                    scores: Dict[str, List[float]] = {candidate: [] for candidate in alive}
+                    pending = []
+                    for candidate_key in alive:
+                        candidate = self.candidates[candidate_key]
+                        for fold, (train_index, valid_index) in enumerate(folds):
+                            key = self._fold_key(data_hash, candidate, n_samples, fold)
+                            cached = self.cache.get(key)
+                            if cached is not None:
+                                scores[candidate_key].append(cached["score"])
+                                cached_fits += 1
+                            else:
+                                pending.append((key, candidate_key, fold, train_index, valid_index))
+
+                    running = {}
+                    while pending or running:
+                        out_of_budget = ((deadline is not None and time.perf_counter() > deadline) or
+                                         (self.max_fits is not None and fits + len(running) >= self.max_fits))
+                        if out_of_budget and pending:
+                            budget_exhausted = True
+                            pending = []
+                        # keep at most 2 tasks per worker queued so the budget can stop the rest
+                        while pending and len(running) < 2 * self.n_jobs:
+                            key, candidate_key, fold, train_index, valid_index = pending.pop(0)
+                            candidate = self.candidates[candidate_key]
+                            args = (candidate["class"], candidate["params"], train_index, valid_index, self.scoring)
+                            if executor is None:
+                                running[_Done(_fit_fold, args)] = (key, candidate_key, fold)
+                            else:
+                                running[executor.submit(_fit_fold, *args)] = (key, candidate_key, fold)
+                            if self.max_fits is not None and fits + len(running) >= self.max_fits:
+                                break
+                        if not running:
+                            break
+                        done, _ = wait(list(running), return_when=FIRST_COMPLETED) if executor else (list(running), None)
+                        for future in done:
+                            key, candidate_key, fold = running.pop(future)
+                            fits += 1
+                            try:
+                                score, seconds = future.result()
+                            except Exception as e:
+                                # a candidate that fails to fit is scored -inf in this search only: the failure
+                                # may be transient (a lost worker, MemoryError), so it is not cached
+                                logging.info("Candidate %s failed on fold %d: %s", candidate_key, fold, e)
+                                scores[candidate_key].append(float("-inf"))
+                                continue
+                            scores[candidate_key].append(score)
+                            self.cache.add({"key": key, "candidate": candidate_key, "rung": rung,
+                                            "n_samples": n_samples, "fold": fold, "score": score,
+                                            "fit_seconds": round(seconds, 4)})
+
+                    complete = {candidate: float(np.mean(values)) for candidate, values in scores.items()
+                                if len(values) == self.n_folds}
+                    ranking = sorted(complete, key=complete.get, reverse=True)
+                    rungs.append({"rung": rung, "n_samples": n_samples, "candidates": len(alive),
+                                  "completed": len(complete),
+                                  "scores": {candidate: round(complete[candidate], 6) for candidate in ranking}})
+                    logging.info(f"Rung {rung} ({n_samples} rows): {len(complete)}/{len(alive)} candidates "
+                                 f"completed, best {ranking[0] if ranking else None}")
+                    if budget_exhausted or not ranking:
+                        break
+                    alive = ranking[:max(1, math.ceil(len(ranking) / self.factor))]
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+
+            best_rung = next((rung for rung in reversed(rungs) if rung["scores"]), None)
+            if best_rung is None:
+                raise RuntimeError("The search budget ran out before any candidate was evaluated")
+            best_key = next(iter(best_rung["scores"]))
+            best = self.candidates[best_key]
+            report = {
+                "best": {"model_name": best["model_name"], "class": best["class"], "params": best["params"],
+                         "score": best_rung["scores"][best_key], "rung": best_rung["rung"],
+                         "n_samples": best_rung["n_samples"]},
+                "scoring": self.scoring,
+                "strategy": self.strategy,
+                "rungs": rungs,
+                "fits": fits,
+                "cached_fits": cached_fits,
+                "budget_exhausted": budget_exhausted,
+                "elapsed_seconds": round(time.perf_counter() - start, 2),
+            }
+            logging.info(f"Search finished in {report['elapsed_seconds']}s with {fits} fits "
+                         f"({cached_fits} from cache), best: {report['best']}")
+            return report
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class _Done:
+    """
+    Result holder with the Future interface, used when the search runs in-process (n_jobs=1).
+    """
+
+    def __init__(self, function, args):
+        try:
+            self._result, self._error = function(*args), None
+        except Exception as e:
+            self._result, self._error = None, e
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
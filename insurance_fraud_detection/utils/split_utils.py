@@ -0,0 +1,115 @@
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from insurance_fraud_detection.exception import CustomException
+
+
+# label used for rows whose stratify value is missing
+MISSING_STRATUM = "__missing__"
+
+
+def hash_to_unit_interval(keys: pd.Series, salt: str = "") -> np.ndarray:
+    """
+    Map keys to floats in [0, 1) with pandas' stable siphash, so the same key always lands on the same
+    value across runs, processes and chunkings. salt gives an independent split.
+    """
+    hash_key = (salt + "0123456789123456")[:16]
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy(dtype=np.uint64)
+    # top 53 bits give an exactly representable, uniform double
+    return (hashes >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class HashSplitter:
+    """
+    Class Name :   HashSplitter
+    Description :  Deterministic, streaming train/test split.
+
+                   A row goes to the test set when the hash of its key falls below a threshold: test_ratio
+                   without stratification. With stratify_column every stratum (e.g. fraud_reported Y/N)
+                   gets its own threshold, the test_ratio quantile of the key hashes of that stratum, fitted
+                   in one pass over the keys (fit / fit_chunks). Each stratum then holds
+                   round(test_ratio * rows of the stratum) test rows, give or take one, where an independent
+                   draw per row would leave the rare fraud class with a random test share. The thresholds
+                   are kept with the ingestion state (see thresholds), so rows of later incremental runs are
+                   split with the same thresholds; strata unseen by fit fall back to test_ratio.
+                   Once fitted a row is decided from its own values and the thresholds only: the assignment
+                   is identical for any chunking or order of the data.
+    """
+
+    def __init__(self, test_ratio: float, key_column: str, stratify_column: Optional[str] = None,
+                 salt: str = "", thresholds: Optional[Dict[str, float]] = None):
+        if not 0.0 < test_ratio < 1.0:
+            raise ValueError(f"test_ratio must be between 0 and 1, got {test_ratio}")
+        self.test_ratio = test_ratio
+        self.key_column = key_column
+        self.stratify_column = stratify_column
+        self.salt = salt
+        self.thresholds = dict(thresholds) if thresholds is not None else None
+
+    @property
+    def needs_fit(self) -> bool:
+        return bool(self.stratify_column) and self.thresholds is None
+
+    def _strata(self, dataframe: pd.DataFrame) -> pd.Series:
+        column = dataframe[self.stratify_column]
+        return column.astype(object).where(column.notna(), MISSING_STRATUM).astype(str)
+
+    def fit(self, dataframe: pd.DataFrame) -> "HashSplitter":
+        """
+        Fit the per-stratum thresholds on all rows to split (only the key and stratify columns are used).
+        """
+        return self.fit_chunks([dataframe])
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]) -> "HashSplitter":
+        """
+        Fit the per-stratum thresholds in one pass over chunks holding, together, all rows to split.
+        Only the key hashes of every stratum are kept, 8 bytes per row.
+        """
+        try:
+            if not self.stratify_column:
+                self.thresholds = {}
+                return self
+            hashes: Dict[str, list] = {}
+            for chunk in chunks:
+                frame = pd.DataFrame({"stratum": self._strata(chunk).to_numpy(),
+                                      "hash": hash_to_unit_interval(chunk[self.key_column], self.salt)})
+                for stratum, group in frame.groupby("stratum", sort=False):
+                    hashes.setdefault(stratum, []).append(group["hash"].to_numpy())
+
+            thresholds = {}
+            for stratum, parts in hashes.items():
+                stratum_hashes = np.sort(np.concatenate(parts))
+                n_test = int(round(self.test_ratio * len(stratum_hashes)))
+                if n_test == 0:
+                    thresholds[stratum] = 0.0
+                elif n_test == len(stratum_hashes):
+                    thresholds[stratum] = 1.0
+                else:
+                    # halfway between the last test hash and the first train hash
+                    thresholds[stratum] = float((stratum_hashes[n_test - 1] + stratum_hashes[n_test]) / 2)
+            self.thresholds = thresholds
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def test_mask(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Boolean mask of the rows of dataframe that belong to the test set.
+        """
+        try:
+            hashes = hash_to_unit_interval(dataframe[self.key_column], self.salt)
+            if not self.stratify_column:
+                return hashes < self.test_ratio
+            if self.thresholds is None:
+                raise ValueError("A stratified HashSplitter must be fitted (fit / fit_chunks) before splitting")
+            thresholds = self._strata(dataframe).map(self.thresholds).fillna(self.test_ratio)
+            return hashes < thresholds.to_numpy(dtype=np.float64)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def split(self, dataframe: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        mask = self.test_mask(dataframe)
+        return dataframe[~mask], dataframe[mask]
@@ -0,0 +1,138 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import Callable, Iterable, List, Optional, Type, TypeVar
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.utils.main_utils import compute_file_hash, read_yaml_file, write_yaml_file
+from insurance_fraud_detection.utils.run_metrics import annotate, step
+
+
+Artifact = TypeVar("Artifact")
+
+
+def _file_signature(path: str) -> Optional[list]:
+    """
+    Cheap (size, mtime) signature of a file or directory tree, used to notice outputs that were
+    modified or removed after they were cached.
+    """
+    if not os.path.exists(path):
+        return None
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    signature = []
+    for root, _, names in sorted(os.walk(path)):
+        for name in sorted(names):
+            stat = os.stat(os.path.join(root, name))
+            signature.append([os.path.relpath(os.path.join(root, name), path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def _tree_size(path: str) -> int:
+    """
+    Size in bytes of a file or of all files under a directory, 0 when it does not exist
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class StageCache:
+    """
+    Class Name :   StageCache
+    Description :  Content-hash cache of pipeline stage results.
+
+                   A stage is fingerprinted from its config, a description of its inputs and the source of
+                   the modules that implement it. When a stage runs with a fingerprint that matches the last
+                   recorded run and that run's outputs are untouched, the recorded artifact is returned and
+                   the stage is skipped.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def fingerprint(config: object, inputs: dict, code_modules: Iterable[ModuleType]) -> str:
+        """
+        sha256 over the config, the inputs (hashes, table signatures, ...) and the code of code_modules.
+        """
+        try:
+            digest = hashlib.sha256()
+            config_content = asdict(config) if is_dataclass(config) else config
+            digest.update(json.dumps(config_content, sort_keys=True, default=str).encode())
+            digest.update(json.dumps(inputs, sort_keys=True, default=str).encode())
+            for module in sorted(code_modules, key=lambda module: module.__name__):
+                digest.update(module.__name__.encode())
+                digest.update(compute_file_hash(inspect.getsourcefile(module)).encode())
+            return digest.hexdigest()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _record_path(self, stage_name: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage_name}.yaml")
+
+    def load(self, stage_name: str, fingerprint: str) -> Optional[dict]:
+        """
+        Artifact fields recorded for fingerprint, or None when the stage has to run.
+        """
+        try:
+            record_path = self._record_path(stage_name)
+            if not os.path.exists(record_path):
+                return None
+            record = read_yaml_file(file_path=record_path) or {}
+            if record.get("fingerprint") != fingerprint:
+                logging.info(f"Stage '{stage_name}' fingerprint changed")
+                return None
+            for path, signature in record.get("outputs", {}).items():
+                if _file_signature(path) != signature:
+                    logging.info(f"Stage '{stage_name}' output {path} changed since it was cached")
+                    return None
+            return record["artifact"]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def save(self, stage_name: str, fingerprint: str, artifact: object, output_paths: List[str]) -> None:
+        try:
+            record = {
+                "stage": stage_name,
+                "fingerprint": fingerprint,
+                "artifact": asdict(artifact),
+                "outputs": {path: _file_signature(path) for path in output_paths},
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            write_yaml_file(file_path=self._record_path(stage_name), content=record)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run(self, stage_name: str, fingerprint: str, stage: Callable[[], Artifact], artifact_class: Type[Artifact],
+            output_paths: Callable[[Artifact], List[str]], force_rerun: bool = False) -> Artifact:
+        """
+        Return the cached artifact of stage_name for fingerprint, or run stage() and cache its artifact.
+        output_paths lists the files and directories produced by the stage for a given artifact.
+        """
+        try:
+            # every stage is measured for the run metrics artifact, see run_metrics.RunMetrics
+            with step(stage_name):
+                if not force_rerun:
+                    cached = self.load(stage_name, fingerprint)
+                    if cached is not None:
+                        logging.info(f"Stage '{stage_name}' is up to date, reusing cached artifact")
+                        annotate(cached=True)
+                        return artifact_class(**cached)
+                else:
+                    logging.info(f"Stage '{stage_name}' forced to rerun")
+
+                artifact = stage()
+                paths = output_paths(artifact)
+                self.save(stage_name, fingerprint, artifact, paths)
+                annotate(cached=False, output_bytes=sum(_tree_size(path) for path in paths))
+                return artifact
+        except Exception as e:
+            raise CustomException(e, sys)
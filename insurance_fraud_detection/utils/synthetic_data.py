@@ -0,0 +1,407 @@
+"""
+Synthetic insurance claims following config/schema.yaml, for benchmarks and local runs without the
+MySQL source.
+
+    python -m insurance_fraud_detection.utils.synthetic_data --rows 1000000 \
+        --target feature_store --output artifacts/synthetic/claims.parquet
+    python -m insurance_fraud_detection.utils.synthetic_data --rows 10000000 \
+        --target sqlite --output artifacts/synthetic/claims.db --drift 1.0 --drift-fraction 0.2
+    python -m insurance_fraud_detection.utils.synthetic_data --rows 1000000 --target mysql \
+        --table insurancefraud_dataset
+
+Every chunk is generated from a seed derived from its first row number, so the data does not depend
+on the chunk size or the number of worker processes, and a table can be extended later with
+--start-row. Rows carry the '?' placeholders of the source table, the feature store target stores
+them cleaned (NaN) as ingestion would.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from insurance_fraud_detection.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.utils.main_utils import read_yaml_file
+
+
+MISSING_PLACEHOLDER = "?"
+POLICY_NUMBER_OFFSET = 100_000
+
+# relative frequencies of the categories, roughly as in the original claims table; categories of
+# schema.yaml missing here are drawn uniformly
+CATEGORY_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "policy_state": {"OH": 0.35, "IL": 0.34, "IN": 0.31},
+    "policy_csl": {"250/500": 0.35, "100/300": 0.35, "500/1000": 0.30},
+    "insured_sex": {"FEMALE": 0.54, "MALE": 0.46},
+    "insured_relationship": {"own-child": 0.18, "other-relative": 0.18, "not-in-family": 0.17,
+                             "husband": 0.17, "wife": 0.16, "unmarried": 0.14},
+    "incident_type": {"Multi-vehicle Collision": 0.42, "Single Vehicle Collision": 0.40,
+                      "Vehicle Theft": 0.09, "Parked Car": 0.09},
+    "collision_type": {"Rear Collision": 0.38, "Side Collision": 0.33, "Front Collision": 0.29},
+    "authorities_contacted": {"Police": 0.29, "Fire": 0.23, "Other": 0.20, "Ambulance": 0.20, "None": 0.08},
+    "incident_state": {"NY": 0.26, "SC": 0.25, "WV": 0.22, "VA": 0.11, "NC": 0.11, "PA": 0.03, "OH": 0.02},
+}
+
+# columns without allowed values in schema.yaml
+INSURED_HOBBIES = ["reading", "exercise", "paintball", "bungie-jumping", "movies", "golf", "camping",
+                   "kayaking", "yachting", "hiking", "video-games", "skydiving", "base-jumping",
+                   "board-games", "polo", "chess", "dancing", "sleeping", "cross-fit", "basketball"]
+# hobbies with a much higher fraud rate in the original data
+FRAUD_HOBBIES = ["chess", "cross-fit"]
+INCIDENT_CITIES = ["Springfield", "Arlington", "Columbus", "Northbend", "Hillsdale", "Riverwood", "Northbrook"]
+STREET_NAMES = ["Maple", "Oak", "Pine", "Elm", "Lincoln", "Washington", "Francis", "Embaracadero", "Solo",
+                "Sky", "Tree", "Flute", "Britain", "Cherokee", "Apache", "Texas", "Andromedia",
+                "Rock", "Best", "Weaver", "MLK", "4th", "5th", "Lake", "Park", "Hill", "Creek", "Ridge"]
+STREET_SUFFIXES = ["St", "Ave", "Lane", "Drive", "Hwy", "Ridge", "Way"]
+N_LOCATIONS = 5_000
+AUTO_MODELS = {
+    "Saab": ["92x", "93", "95"],
+    "Dodge": ["RAM", "Neon"],
+    "Suburu": ["Legacy", "Forrestor", "Impreza"],
+    "Nissan": ["Pathfinder", "Maxima", "Ultima"],
+    "Chevrolet": ["Tahoe", "Silverado", "Malibu"],
+    "Ford": ["F150", "Escape", "Fusion"],
+    "BMW": ["X5", "X6", "3 Series", "M5"],
+    "Toyota": ["Corolla", "Camry", "Highlander"],
+    "Audi": ["A5", "A3"],
+    "Accura": ["MDX", "TL", "RSX"],
+    "Volkswagen": ["Passat", "Jetta"],
+    "Jeep": ["Grand Cherokee", "Wrangler"],
+    "Mercedes": ["E400", "C300", "ML350"],
+    "Honda": ["Civic", "Accord", "CRV"],
+}
+# columns whose category frequencies move towards the reversed frequencies under drift
+DRIFTING_CATEGORICAL_COLUMNS = ["policy_state", "insured_occupation", "incident_type", "collision_type",
+                                "authorities_contacted", "incident_state", "auto_make"]
+
+POLICY_BIND_DATES = pd.date_range("1990-01-08", "2015-02-22", freq="D").strftime("%Y-%m-%d").to_numpy(object)
+INCIDENT_DATES = pd.date_range("2015-01-01", "2016-03-01", freq="D").strftime("%Y-%m-%d").to_numpy(object)
+# incident dates of undrifted rows fall in the first two months, as in the original table
+INCIDENT_DATE_DAYS = 60
+
+
+class SyntheticClaimsGenerator:
+    """
+    Class Name :   SyntheticClaimsGenerator
+    Description :  Generates claims with the columns and dtypes of schema.yaml, category values from its
+                   allowed_values with realistic frequencies and cardinalities, consistent claim amounts
+                   and incident details, and a fraud label driven by a few features (incident severity,
+                   hobbies, claim size, police report) at about fraud_rate overall. Rows from
+                   drift_start_row on are drifted with strength drift (0 = none, 1 = strong): older,
+                   more expensive customers, larger claims, shifted category frequencies and more fraud.
+    """
+
+    def __init__(self, schema_config: Optional[dict] = None, fraud_rate: float = 0.25, drift: float = 0.0,
+                 drift_start_row: Optional[int] = None, seed: int = 42):
+        try:
+            if not 0 < fraud_rate < 1:
+                raise ValueError(f"fraud_rate must be between 0 and 1, got {fraud_rate}")
+            self.schema_config = schema_config or read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self.columns: List[str] = list(self.schema_config["columns"])
+            self.fraud_rate = fraud_rate
+            self.drift = drift
+            self.drift_start_row = drift_start_row
+            self.seed = seed
+            self.categories: Dict[str, np.ndarray] = {}
+            self.weights: Dict[str, np.ndarray] = {}
+            for column, values in self.schema_config.get("allowed_values", {}).items():
+                weights = CATEGORY_WEIGHTS.get(column, {})
+                self.categories[column] = np.array([str(value) for value in values], dtype=object)
+                probabilities = np.array([weights.get(str(value), 1.0 / len(values)) for value in values])
+                self.weights[column] = probabilities / probabilities.sum()
+            self.auto_models = {make: np.array(models, dtype=object) for make, models in AUTO_MODELS.items()}
+            # incident_location is drawn from a fixed pool of street addresses
+            location_rng = np.random.default_rng(seed)
+            self.locations = np.array([
+                f"{number} {STREET_NAMES[street]} {STREET_SUFFIXES[suffix]}" for number, street, suffix in zip(
+                    location_rng.integers(1000, 10000, N_LOCATIONS),
+                    location_rng.integers(0, len(STREET_NAMES), N_LOCATIONS),
+                    location_rng.integers(0, len(STREET_SUFFIXES), N_LOCATIONS))], dtype=object)
+            self.intercept = 0.0
+            self.intercept = self._calibrate_intercept()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _choice(self, rng: np.random.Generator, column: str, n_rows: int, drift: np.ndarray) -> np.ndarray:
+        values, weights = self.categories[column], self.weights[column]
+        drawn = rng.choice(len(values), size=n_rows, p=weights)
+        if column in DRIFTING_CATEGORICAL_COLUMNS and drift.any():
+            drifted_weights = weights[::-1]
+            drifted = rng.choice(len(values), size=n_rows, p=drifted_weights / drifted_weights.sum())
+            drawn = np.where(rng.random(n_rows) < 0.6 * np.minimum(drift, 1.0), drifted, drawn)
+        return values[drawn]
+
+    def _fraud_logit(self, frame: Dict[str, np.ndarray], drift: np.ndarray) -> np.ndarray:
+        return (self.intercept
+                + 2.2 * (frame["incident_severity"] == "Major Damage")
+                + 2.5 * np.isin(frame["insured_hobbies"], FRAUD_HOBBIES)
+                + 0.6 * (frame["total_claim_amount"] > 70_000)
+                - 0.4 * (frame["police_report_available"] == "YES")
+                + 0.5 * drift)
+
+    def _calibrate_intercept(self) -> float:
+        # bisect the intercept until the undrifted fraud rate of a sample matches fraud_rate
+        frame = self._features(np.random.default_rng([self.seed, 2 ** 32]), 50_000, np.zeros(50_000))
+        low, high = -10.0, 10.0
+        for _ in range(40):
+            self.intercept = (low + high) / 2
+            rate = (1 / (1 + np.exp(-self._fraud_logit(frame, np.zeros(50_000))))).mean()
+            low, high = (self.intercept, high) if rate < self.fraud_rate else (low, self.intercept)
+        return (low + high) / 2
+
+    def _features(self, rng: np.random.Generator, n_rows: int, drift: np.ndarray) -> Dict[str, np.ndarray]:
+        frame: Dict[str, np.ndarray] = {}
+        age = np.clip(rng.normal(39 + 6 * drift, 9, n_rows), 19, 64).astype(np.int64)
+        frame["age"] = age
+        frame["months_as_customer"] = np.clip(
+            (age - 18) * 12 * rng.beta(2, 4, n_rows) + 24 * drift, 0, 479).astype(np.int64)
+        frame["policy_bind_date"] = POLICY_BIND_DATES[rng.integers(0, len(POLICY_BIND_DATES), n_rows)]
+        for column in ("policy_state", "policy_csl", "insured_sex", "insured_education_level",
+                       "insured_occupation", "insured_relationship", "incident_severity", "incident_state",
+                       "auto_make"):
+            frame[column] = self._choice(rng, column, n_rows, drift)
+        frame["policy_deductable"] = rng.choice(np.array([500, 1000, 2000]), n_rows, p=[0.34, 0.35, 0.31])
+        frame["policy_annual_premium"] = np.round(
+            np.clip(rng.normal(1256, 244, n_rows) * (1 + 0.15 * drift), 400, 2100 * (1 + 0.15 * drift)), 2)
+        frame["umbrella_limit"] = np.where(rng.random(n_rows) < 0.8, 0,
+                                           rng.integers(2, 11, n_rows) * 1_000_000).astype(np.int64)
+        frame["insured_zip"] = rng.integers(430_000, 620_000, n_rows)
+        frame["insured_hobbies"] = np.array(INSURED_HOBBIES, dtype=object)[rng.integers(0, len(INSURED_HOBBIES),
+                                                                                          n_rows)]
+        frame["capital-gains"] = np.where(rng.random(n_rows) < 0.5, 0,
+                                          rng.integers(1, 1001, n_rows) * 100).astype(np.int64)
+        frame["capital-loss"] = np.where(rng.random(n_rows) < 0.5, 0,
+                                         -rng.integers(1, 1120, n_rows) * 100).astype(np.int64)
+        frame["incident_date"] = INCIDENT_DATES[rng.integers(0, INCIDENT_DATE_DAYS, n_rows)
+                                                + (300 * np.minimum(drift, 1.0)).astype(np.int64)]
+
+        incident_type = self._choice(rng, "incident_type", n_rows, drift)
+        frame["incident_type"] = incident_type
+        collision = np.isin(incident_type, ["Single Vehicle Collision", "Multi-vehicle Collision"])
+        collision_type = self._choice(rng, "collision_type", n_rows, drift)
+        frame["collision_type"] = np.where(collision, collision_type, MISSING_PLACEHOLDER)
+        frame["authorities_contacted"] = self._choice(rng, "authorities_contacted", n_rows, drift)
+        frame["incident_city"] = np.array(INCIDENT_CITIES, dtype=object)[rng.integers(0, len(INCIDENT_CITIES),
+                                                                                       n_rows)]
+        frame["incident_location"] = self.locations[rng.integers(0, len(self.locations), n_rows)]
+        frame["incident_hour_of_the_day"] = rng.integers(0, 24, n_rows)
+        frame["number_of_vehicles_involved"] = np.where(
+            incident_type == "Multi-vehicle Collision", rng.integers(2, 5, n_rows), 1).astype(np.int64)
+        frame["property_damage"] = rng.choice(np.array(["YES", "NO", MISSING_PLACEHOLDER], dtype=object), n_rows)
+        frame["bodily_injuries"] = rng.integers(0, 3, n_rows)
+        frame["witnesses"] = rng.integers(0, 4, n_rows)
+        frame["police_report_available"] = rng.choice(np.array(["YES", "NO", MISSING_PLACEHOLDER], dtype=object),
+                                                      n_rows)
+
+        # thefts and parked cars are small claims; the total is the sum of its parts
+        scale = np.where(collision, 1.0, 0.09) * (1 + 0.4 * drift)
+        injury = (rng.gamma(4, 1_800, n_rows) * scale).astype(np.int64) // 10 * 10
+        property_claim = (rng.gamma(4, 1_800, n_rows) * scale).astype(np.int64) // 10 * 10
+        vehicle = (rng.gamma(5, 7_600, n_rows) * scale).astype(np.int64) // 10 * 10
+        frame["injury_claim"], frame["property_claim"], frame["vehicle_claim"] = injury, property_claim, vehicle
+        frame["total_claim_amount"] = injury + property_claim + vehicle
+
+        makes = frame["auto_make"]
+        models = np.empty(n_rows, dtype=object)
+        for make, make_models in self.auto_models.items():
+            rows = np.flatnonzero(makes == make)
+            models[rows] = make_models[rng.integers(0, len(make_models), len(rows))]
+        frame["auto_model"] = models
+        frame["auto_year"] = rng.integers(1995, 2016, n_rows)
+        return frame
+
+    def generate(self, n_rows: int, start_row: int = 0) -> pd.DataFrame:
+        """
+        Rows start_row .. start_row + n_rows - 1 of the synthetic table, in the source table format
+        (schema.yaml columns and dtypes, '?' for missing categories)
+        """
+        try:
+            rng = np.random.default_rng([self.seed, start_row])
+            row_numbers = np.arange(start_row, start_row + n_rows, dtype=np.int64)
+            drift = np.zeros(n_rows)
+            if self.drift_start_row is not None and self.drift:
+                drift[row_numbers >= self.drift_start_row] = self.drift
+            frame = self._features(rng, n_rows, drift)
+            frame["policy_number"] = row_numbers + POLICY_NUMBER_OFFSET
+            probability = 1 / (1 + np.exp(-self._fraud_logit(frame, drift)))
+            frame[TARGET_COLUMN] = np.where(rng.random(n_rows) < probability, "Y", "N").astype(object)
+
+            dataframe = pd.DataFrame({column: frame[column] for column in self.columns})
+            for column, dtype in self.schema_config["columns"].items():
+                if dtype != "object":
+                    dataframe[column] = dataframe[column].astype(dtype)
+            return dataframe
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def iter_chunks(self, n_rows: int, chunk_size: int, start_row: int = 0, n_jobs: int = 1,
+                    clean: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Rows start_row .. start_row + n_rows - 1 in chunks of chunk_size rows, in order, generated on n_jobs
+        worker processes; clean=True replaces the '?' placeholders by NaN
+        """
+        starts = range(start_row, start_row + n_rows, chunk_size)
+        sizes = [min(chunk_size, start_row + n_rows - start) for start in starts]
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                chunks = executor.map(self.generate, sizes, starts)
+                for chunk in chunks:
+                    yield _clean(chunk) if clean else chunk
+            return
+        for size, start in zip(sizes, starts):
+            chunk = self.generate(size, start)
+            yield _clean(chunk) if clean else chunk
+
+
+def _clean(dataframe: pd.DataFrame) -> pd.DataFrame:
+    # the cleaning of InsuranceData.clean_dataframe, without importing the MySQL client
+    return dataframe.replace({MISSING_PLACEHOLDER: np.nan})
+
+
+def _rows(dataframe: pd.DataFrame) -> List[tuple]:
+    # plain python values, which the database drivers accept
+    return list(zip(*[dataframe[column].tolist() for column in dataframe.columns]))
+
+
+def _write_rows(chunks: Iterator[pd.DataFrame], write: Callable[[pd.DataFrame], None]) -> int:
+    n_rows = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        write(chunk)
+        n_rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        logging.info("Wrote %d synthetic rows (%.0f rows/sec)", n_rows, n_rows / elapsed if elapsed > 0 else 0)
+    return n_rows
+
+
+def write_feature_store(chunks: Iterator[pd.DataFrame], file_path: str, file_format: Optional[str] = None,
+                        append: bool = False) -> int:
+    """
+    Write cleaned chunks to a feature store (one parquet part per chunk); returns the number of rows
+    """
+    from insurance_fraud_detection.data_access.feature_store import FeatureStore
+
+    try:
+        feature_store = FeatureStore(file_path=file_path, file_format=file_format)
+        if not append:
+            feature_store.clear()
+        return _write_rows(chunks, feature_store.append)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def _create_table_sql(schema_config: dict, table_name: str, types: Dict[str, str], quote: str) -> str:
+    columns = [f"{quote}{column}{quote} {types[dtype]}" for column, dtype in schema_config["columns"].items()]
+    return (f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)}, "
+            f"PRIMARY KEY ({quote}policy_number{quote}))")
+
+
+def write_sqlite(chunks: Iterator[pd.DataFrame], database_path: str, table_name: str,
+                 schema_config: dict, append: bool = False) -> int:
+    """
+    Write chunks to a table of an SQLite database (a local stand-in for the MySQL source table);
+    returns the number of rows
+    """
+    try:
+        os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+        with sqlite3.connect(database_path) as connection:
+            if not append:
+                connection.execute(f"DROP TABLE IF EXISTS {table_name}")
+            connection.execute(_create_table_sql(schema_config, table_name,
+                                                 {"int64": "INTEGER", "float64": "REAL", "object": "TEXT"}, '"'))
+            insert = f"INSERT INTO {table_name} VALUES ({', '.join(['?'] * len(schema_config['columns']))})"
+
+            def write(chunk: pd.DataFrame) -> None:
+                connection.executemany(insert, _rows(chunk))
+                connection.commit()
+
+            return _write_rows(chunks, write)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def write_mysql(chunks: Iterator[pd.DataFrame], table_name: str, schema_config: dict,
+                append: bool = False) -> int:
+    """
+    Write chunks to a table of the MySQL database configured by the environment variables;
+    returns the number of rows
+    """
+    from insurance_fraud_detection.configuration.mysql_conn import MySQLClient
+
+    try:
+        with MySQLClient().connection() as connection:
+            with connection.cursor() as cursor:
+                if not append:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                cursor.execute(_create_table_sql(schema_config, table_name,
+                                                 {"int64": "BIGINT", "float64": "DOUBLE", "object": "VARCHAR(64)"},
+                                                 "`"))
+                columns = ", ".join(f"`{column}`" for column in schema_config["columns"])
+                # pymysql sends an "INSERT ... VALUES" executemany as multi-row statements
+                insert = (f"INSERT INTO {table_name} ({columns}) "
+                          f"VALUES ({', '.join(['%s'] * len(schema_config['columns']))})")
+                return _write_rows(chunks, lambda chunk: cursor.executemany(insert, _rows(chunk)))
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def read_sqlite_chunks(database_path: str, table_name: str, chunk_size: int,
+                       order_column: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a table of an SQLite database as cleaned DataFrames of at most chunk_size rows
+    """
+    query = f"SELECT * FROM {table_name}" + (f" ORDER BY {order_column}" if order_column else "")
+    with sqlite3.connect(database_path) as connection:
+        for chunk in pd.read_sql_query(query, connection, chunksize=chunk_size):
+            yield _clean(chunk)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic insurance claims")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--target", choices=["feature_store", "sqlite", "mysql"], default="feature_store")
+    parser.add_argument("--output", help="feature store path (.parquet directory or .csv) or SQLite database")
+    parser.add_argument("--table", default="insurancefraud_dataset", help="table for --target sqlite/mysql")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--start-row", type=int, default=0,
+                        help="first row number, e.g. to append new policies to an existing table")
+    parser.add_argument("--append", action="store_true", help="add to the target instead of replacing it")
+    parser.add_argument("--fraud-rate", type=float, default=0.25)
+    parser.add_argument("--drift", type=float, default=0.0, help="drift strength, 0 = none, 1 = strong")
+    parser.add_argument("--drift-fraction", type=float, default=0.0,
+                        help="share of the generated rows (the last ones) that drift")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-jobs", type=int, default=1, help="worker processes generating chunks")
+    args = parser.parse_args(argv)
+    init_logging()
+    if args.target != "mysql" and not args.output:
+        parser.error(f"--output is required for --target {args.target}")
+
+    drift_start_row = args.start_row + int(round(args.rows * (1 - args.drift_fraction)))
+    generator = SyntheticClaimsGenerator(fraud_rate=args.fraud_rate, drift=args.drift,
+                                         drift_start_row=drift_start_row if args.drift_fraction > 0 else None,
+                                         seed=args.seed)
+    chunks = generator.iter_chunks(args.rows, args.chunk_size, start_row=args.start_row, n_jobs=args.n_jobs,
+                                   clean=args.target == "feature_store")
+    start = time.perf_counter()
+    if args.target == "feature_store":
+        n_rows = write_feature_store(chunks, args.output, append=args.append)
+    elif args.target == "sqlite":
+        n_rows = write_sqlite(chunks, args.output, args.table, generator.schema_config, append=args.append)
+    else:
+        n_rows = write_mysql(chunks, args.table, generator.schema_config, append=args.append)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {n_rows} rows to {args.target} {args.output or args.table} in {elapsed:.1f}s "
+          f"({n_rows / elapsed if elapsed > 0 else 0:.0f} rows/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.logger import logging
+
+
+# how many offending category values are kept per column in the report
+MAX_REPORTED_VALUES = 5
+
+
+def dtype_conforms(series: pd.Series, expected_dtype: str) -> bool:
+    """
+    Whether a column matches the schema.yaml dtype. Integer columns that were widened to float
+    because they hold nulls are accepted as long as every value is integral.
+    """
+    if expected_dtype == "int64":
+        if is_integer_dtype(series.dtype):
+            return True
+        if is_float_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            return bool(np.all(values == np.floor(values)))
+        return False
+    if expected_dtype == "float64":
+        return is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+    if expected_dtype == "object":
+        return (is_object_dtype(series.dtype) or is_string_dtype(series.dtype)
+                or isinstance(series.dtype, pd.CategoricalDtype))
+    return str(series.dtype) == expected_dtype
+
+
+class SchemaValidator:
+    """
+    Class Name :   SchemaValidator
+    Description :  Validates dataframes against schema.yaml in one vectorized pass per frame or chunk:
+                   column presence, dtype conformance (`columns`), null rates (`max_null_fraction`),
+                   allowed category sets (`allowed_values`) and numeric ranges (`value_ranges`).
+
+                   Call validate(df) for a whole frame, or update(chunk) for every chunk of a stream
+                   followed by report(); the report holds a status and the statistics of every column.
+    """
+
+    def __init__(self, schema_config: dict):
+        self.expected_dtypes: Dict[str, str] = schema_config["columns"]
+        self.max_null_fraction: float = schema_config.get("max_null_fraction", 1.0)
+        self.allowed_values: Dict[str, list] = {column: [str(value) for value in values]
+                                                for column, values in schema_config.get("allowed_values", {}).items()}
+        self.value_ranges: Dict[str, list] = schema_config.get("value_ranges", {})
+        self.reset()
+
+    def reset(self) -> None:
+        self._rows = 0
+        self._seen_columns: Optional[List[str]] = None
+        self._nulls = pd.Series(0, index=list(self.expected_dtypes), dtype=np.int64)
+        self._observed_dtypes: Dict[str, set] = {column: set() for column in self.expected_dtypes}
+        self._dtype_ok: Dict[str, bool] = {column: True for column in self.expected_dtypes}
+        self._invalid_counts: Dict[str, int] = {column: 0 for column in self.allowed_values}
+        self._invalid_values: Dict[str, set] = {column: set() for column in self.allowed_values}
+        self._out_of_range = pd.Series(0, index=list(self.value_ranges), dtype=np.int64)
+        self._minimum: Dict[str, float] = {}
+        self._maximum: Dict[str, float] = {}
+
+    def update(self, dataframe: pd.DataFrame) -> None:
+        """
+        Accumulate the statistics of one frame or chunk.
+        """
+        try:
+            columns = list(dataframe.columns)
+            if self._seen_columns is None:
+                self._seen_columns = columns
+            elif columns != self._seen_columns:
+                # every chunk of a stream must carry the same columns
+                self._seen_columns = [column for column in self._seen_columns if column in columns]
+            present = [column for column in self.expected_dtypes if column in dataframe.columns]
+            self._rows += len(dataframe)
+
+            # null mask for all columns at once, reused by the category checks
+            null_mask = dataframe[present].isna()
+            self._nulls = self._nulls.add(null_mask.sum(), fill_value=0).astype(np.int64)
+
+            for column in present:
+                series = dataframe[column]
+                self._observed_dtypes[column].add(str(series.dtype))
+                if not dtype_conforms(series, self.expected_dtypes[column]):
+                    self._dtype_ok[column] = False
+
+            for column, allowed in self.allowed_values.items():
+                if column not in dataframe.columns:
+                    continue
+                series = dataframe[column]
+                not_null = ~null_mask[column].to_numpy() if column in null_mask.columns else series.notna().to_numpy()
+                invalid = not_null & ~series.isin(allowed).to_numpy()
+                n_invalid = int(invalid.sum())
+                if n_invalid:
+                    self._invalid_counts[column] += n_invalid
+                    if len(self._invalid_values[column]) < MAX_REPORTED_VALUES:
+                        unique = pd.unique(series[invalid].astype(str))[:MAX_REPORTED_VALUES]
+                        self._invalid_values[column].update(unique.tolist())
+
+            # range checks for all numeric range columns in one frame operation
+            range_columns = [column for column in self.value_ranges
+                             if column in dataframe.columns and is_numeric_dtype(dataframe[column].dtype)]
+            if range_columns:
+                values = dataframe[range_columns]
+                lower = pd.Series({column: self.value_ranges[column][0] for column in range_columns}, dtype=float)
+                upper = pd.Series({column: self.value_ranges[column][1] for column in range_columns}, dtype=float)
+                below = values.lt(lower.fillna(-np.inf), axis=1)
+                above = values.gt(upper.fillna(np.inf), axis=1)
+                self._out_of_range = self._out_of_range.add((below | above).sum(), fill_value=0).astype(np.int64)
+                for column, value in values.min().items():
+                    if pd.notna(value):
+                        self._minimum[column] = min(float(value), self._minimum.get(column, np.inf))
+                for column, value in values.max().items():
+                    if pd.notna(value):
+                        self._maximum[column] = max(float(value), self._maximum.get(column, -np.inf))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def report(self) -> dict:
+        """
+        Structured report of everything accumulated since the last reset.
+        """
+        try:
+            seen_columns = self._seen_columns or []
+            missing_columns = [column for column in self.expected_dtypes if column not in seen_columns]
+            unexpected_columns = [column for column in seen_columns if column not in self.expected_dtypes]
+
+            columns = {}
+            for column, expected_dtype in self.expected_dtypes.items():
+                if column in missing_columns:
+                    columns[column] = {"present": False, "status": False}
+                    continue
+                null_count = int(self._nulls[column])
+                null_fraction = null_count / self._rows if self._rows else 0.0
+                column_report = {
+                    "present": True,
+                    "expected_dtype": expected_dtype,
+                    "observed_dtypes": sorted(self._observed_dtypes[column]),
+                    "dtype_ok": self._dtype_ok[column],
+                    "null_count": null_count,
+                    "null_fraction": round(null_fraction, 6),
+                    "null_ok": null_fraction <= self.max_null_fraction,
+                }
+                status = column_report["dtype_ok"] and column_report["null_ok"]
+                if column in self.allowed_values:
+                    column_report["invalid_category_count"] = self._invalid_counts[column]
+                    column_report["invalid_categories"] = sorted(self._invalid_values[column])
+                    status = status and self._invalid_counts[column] == 0
+                if column in self.value_ranges:
+                    column_report["out_of_range_count"] = int(self._out_of_range.get(column, 0))
+                    column_report["min"] = self._minimum.get(column)
+                    column_report["max"] = self._maximum.get(column)
+                    status = status and column_report["out_of_range_count"] == 0
+                column_report["status"] = bool(status)
+                columns[column] = column_report
+
+            failed_columns = [column for column, column_report in columns.items() if not column_report["status"]]
+            return {
+                "validation_status": not (missing_columns or unexpected_columns or failed_columns),
+                "number_of_rows": int(self._rows),
+                "missing_columns": missing_columns,
+                "unexpected_columns": unexpected_columns,
+                "failed_columns": failed_columns,
+                "columns": columns,
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def validate(self, dataframe: pd.DataFrame) -> dict:
+        self.reset()
+        self.update(dataframe)
+        return self.report()
+
+    def validate_chunks(self, chunks: Iterable[pd.DataFrame]) -> dict:
+        self.reset()
+        for chunk in chunks:
+            self.update(chunk)
+        report = self.report()
+        logging.info(f"Validated {report['number_of_rows']} rows in chunks, status: {report['validation_status']}")
+        return report
@@ -1,27 +1,67 @@
+import sys
+from functools import partial
+
 from insurance_fraud_detection.pipeline.stage_01_data_ingestion_pipeline import DataIngestionTrainingPipeline
 from insurance_fraud_detection.pipeline.stage_02_data_validation_pipeline import DataValidationTrainingPipeline
-from insurance_fraud_detection.logger import logging
+from insurance_fraud_detection.pipeline.stage_03_data_transformation_pipeline import DataTransformationTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_04_model_trainer_pipeline import ModelTrainerTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_05_model_evaluation_pipeline import ModelEvaluationTrainingPipeline
+from insurance_fraud_detection.pipeline.stage_06_model_pusher_pipeline import ModelPusherTrainingPipeline
+from insurance_fraud_detection.logger import init_logging, logging
+from insurance_fraud_detection.pipeline.training_pipeline import run_stage_graph, stage_node
+from insurance_fraud_detection.utils.run_metrics import RunMetrics
 
-STAGE_NAME = "Data Ingestion Stage"
+# `python main.py --force` reruns every stage even when its cached fingerprint is up to date
+FORCE_RERUN = "--force" in sys.argv[1:]
+# `python main.py --resume` continues the last failed run from the stages that did not succeed
+RESUME = "--resume" in sys.argv[1:]
 
-try:
-    logging.info(">>>>> Starting Full Pipeline <<<<<")
+init_logging()
 
-    # Stage 01: Ingestion
-    ingestion_pipeline = DataIngestionTrainingPipeline()
-    data_ingestion_artifact = ingestion_pipeline.main(return_artifact=True)
-    
-except Exception as e:
-    logging.exception(e)
-    raise e
+# every stage is measured into artifacts/run_metrics, written when the run ends (also after a failure);
+# PIPELINE_PROFILE=cprofile or PIPELINE_PROFILE=sampling also profiles every stage
+run_metrics = RunMetrics(run_name="training_pipeline").start(finish_at_exit=True)
 
-STAGE_NAME = "Data Validation Stage"
 
-try:
+def run_stage(stage_name: str, stage, **artifacts):
+    logging.info(f">>>>>> {stage_name} started <<<<<<")
+    artifact = stage(**artifacts, force_rerun=FORCE_RERUN)
+    logging.info(f">>>>>> {stage_name} completed <<<<<<")
+    return artifact
+
+
+# every stage starts as soon as the artifacts it needs are there; retries and timeouts per stage
+# are set in training_pipeline_config
+STAGES = [
+    # Stage 01: Ingestion
+    stage_node("data_ingestion", partial(run_stage, "Data Ingestion Stage",
+                                         partial(DataIngestionTrainingPipeline().main, return_artifact=True))),
     # Stage 02: Validation
-    validation_pipeline = DataValidationTrainingPipeline()
-    validation_pipeline.main(data_ingestion_artifact=data_ingestion_artifact)
+    stage_node("data_validation", partial(run_stage, "Data Validation Stage",
+                                          DataValidationTrainingPipeline().main),
+               inputs={"data_ingestion_artifact": "data_ingestion"}),
+    # Stage 03: Transformation
+    stage_node("data_transformation", partial(run_stage, "Data Transformation Stage",
+                                              DataTransformationTrainingPipeline().main),
+               inputs={"data_ingestion_artifact": "data_ingestion",
+                       "data_validation_artifact": "data_validation"}),
+    # Stage 04: Model training
+    stage_node("model_trainer", partial(run_stage, "Model Trainer Stage", ModelTrainerTrainingPipeline().main),
+               inputs={"data_transformation_artifact": "data_transformation"}),
+    # Stage 05: Model evaluation against the production model
+    stage_node("model_evaluation", partial(run_stage, "Model Evaluation Stage",
+                                           ModelEvaluationTrainingPipeline().main),
+               inputs={"data_ingestion_artifact": "data_ingestion",
+                       "model_trainer_artifact": "model_trainer"}),
+    # Stage 06: Promotion of the accepted model in the model registry
+    stage_node("model_pusher", partial(run_stage, "Model Pusher Stage", ModelPusherTrainingPipeline().main),
+               inputs={"model_evaluation_artifact": "model_evaluation",
+                       "data_transformation_artifact": "data_transformation"}),
+]
 
+try:
+    logging.info(">>>>> Starting Full Pipeline <<<<<")
+    run_stage_graph(STAGES, resume=RESUME)
     logging.info(">>>>> Pipeline Finished Successfully <<<<<")
 except Exception as e:
     logging.exception(e)
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+from insurance_fraud_detection.entity.estimator import SchemaPreprocessor
+from insurance_fraud_detection.utils.main_utils import read_yaml_file
+from insurance_fraud_detection.utils.synthetic_data import SyntheticClaimsGenerator
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "config", "schema.yaml")
+
+
+@pytest.fixture(scope="module")
+def schema_config():
+    return read_yaml_file(SCHEMA_FILE_PATH)
+
+
+@pytest.fixture(scope="module")
+def preprocessor(schema_config):
+    train = SyntheticClaimsGenerator(schema_config=schema_config, seed=1).generate(3_000)
+    return SchemaPreprocessor(schema_config).fit(train)
+
+
+def _serving_frame(schema_config, preprocessor):
+    """
+    Claims as they reach the service: nulls in every input column, NaN numerics, unseen categories,
+    out-of-range hours and unparseable dates.
+    """
+    dataframe = SyntheticClaimsGenerator(schema_config=schema_config, seed=2).generate(600)
+    rng = np.random.default_rng(0)
+    for column in preprocessor.input_columns:
+        rows = rng.choice(len(dataframe), size=60, replace=False)
+        if schema_config["columns"][column] == "object":
+            dataframe[column] = dataframe[column].astype(object)
+            dataframe.loc[rows, column] = None
+        else:
+            dataframe[column] = dataframe[column].astype(float)
+            dataframe.loc[rows, column] = np.nan
+    for column in preprocessor.ordinal_columns + preprocessor.nominal_columns:
+        dataframe[column] = dataframe[column].astype(object)
+        dataframe.loc[rng.choice(len(dataframe), size=20, replace=False), column] = "never seen"
+    for column in preprocessor.hour_columns:
+        dataframe.loc[rng.choice(len(dataframe), size=10, replace=False), column] = 30
+    for column in preprocessor.date_columns:
+        dataframe.loc[rng.choice(len(dataframe), size=10, replace=False), column] = "not a date"
+    return dataframe
+
+
+def _records_with_absent_keys(dataframe, seed: int = 3):
+    """
+    Records of dataframe where some missing values are absent keys instead of None / NaN.
+    """
+    rng = np.random.default_rng(seed)
+    records = dataframe.to_dict("records")
+    for record in records:
+        for column, value in list(record.items()):
+            if (value is None or value != value) and rng.random() < 0.5:
+                del record[column]
+    return records
+
+
+def test_compiled_preprocessor_matches_transform(schema_config, preprocessor):
+    dataframe = _serving_frame(schema_config, preprocessor)
+    records = _records_with_absent_keys(dataframe)
+    assert any(len(record) < len(dataframe.columns) for record in records)
+
+    expected = preprocessor.transform(dataframe).toarray()
+    actual = preprocessor.compile().transform_records(records)
+    assert actual.shape == expected.shape
+    for index in range(len(records)):
+        np.testing.assert_array_equal(actual[index], expected[index], err_msg=f"row {index}")
+
+
+def test_transform_does_not_depend_on_the_frame_a_row_is_in(schema_config, preprocessor):
+    dataframe = _serving_frame(schema_config, preprocessor)
+    expected = preprocessor.transform(dataframe).toarray()
+    chunks = [preprocessor.transform(dataframe.iloc[start:start + 77]).toarray()
+              for start in range(0, len(dataframe), 77)]
+    np.testing.assert_array_equal(np.vstack(chunks), expected)
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.utils.dag_executor import CAN_FORK, DagExecutor, DagNode
+
+
+class Recorder:
+    """
+    Node functions that record the order they were called in.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def node(self, name, function=None):
+        def run(**kwargs):
+            with self._lock:
+                self.calls.append(name)
+            return function(**kwargs) if function else name
+        return run
+
+
+def test_nodes_run_after_their_dependencies_with_their_results():
+    recorder = Recorder()
+    executor = DagExecutor([
+        DagNode("total", recorder.node("total", lambda left, right: left + right),
+                inputs={"left": "double", "right": "square"}),
+        DagNode("double", recorder.node("double", lambda value: value * 2), inputs={"value": "source"}),
+        DagNode("square", recorder.node("square", lambda value: value ** 2), inputs={"value": "source"}),
+        DagNode("source", recorder.node("source", lambda: 3)),
+    ], max_workers=2)
+
+    results = executor.run()
+
+    assert results == {"source": 3, "double": 6, "square": 9, "total": 15}
+    assert recorder.calls[0] == "source" and recorder.calls[-1] == "total"
+    assert executor.order.index("source") < executor.order.index("double") < executor.order.index("total")
+
+
+def test_graph_with_a_cycle_or_unknown_node_is_rejected():
+    with pytest.raises(CustomException, match="cycle"):
+        DagExecutor([DagNode("a", lambda b: b, inputs={"b": "b"}), DagNode("b", lambda a: a, inputs={"a": "a"})])
+    with pytest.raises(CustomException, match="unknown"):
+        DagExecutor([DagNode("a", lambda b: b, inputs={"b": "missing"})])
+
+
+def test_dependents_of_a_failed_node_do_not_run():
+    recorder = Recorder()
+
+    def broken():
+        raise ValueError("boom")
+
+    executor = DagExecutor([
+        DagNode("source", recorder.node("source", broken)),
+        DagNode("dependent", recorder.node("dependent"), inputs={"value": "source"}),
+        DagNode("independent", recorder.node("independent")),
+    ], max_workers=1)
+
+    with pytest.raises(CustomException, match="Node source of dag failed"):
+        executor.run()
+    assert "dependent" not in recorder.calls
+
+
+def test_failed_attempts_are_retried():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ValueError("transient")
+        return "done"
+
+    results = DagExecutor([DagNode("flaky", flaky, retries=2, retry_delay=0.0)]).run()
+    assert results == {"flaky": "done"} and len(attempts) == 3
+
+
+def test_resume_skips_the_nodes_that_succeeded(tmp_path):
+    recorder = Recorder()
+    fail = {"total": True}
+
+    def total(left, right):
+        if fail["total"]:
+            raise ValueError("boom")
+        return left + right
+
+    def nodes():
+        return [
+            DagNode("left", recorder.node("left", lambda: 1)),
+            DagNode("right", recorder.node("right", lambda: 2)),
+            DagNode("total", recorder.node("total", total), inputs={"left": "left", "right": "right"}),
+        ]
+
+    with pytest.raises(CustomException):
+        DagExecutor(nodes(), max_workers=1, state_dir=str(tmp_path)).run()
+    assert sorted(recorder.calls) == ["left", "right", "total"]
+
+    recorder.calls.clear()
+    fail["total"] = False
+    results = DagExecutor(nodes(), max_workers=1, state_dir=str(tmp_path)).run(resume=True)
+    assert results == {"left": 1, "right": 2, "total": 3}
+    assert recorder.calls == ["total"]
+
+    # a run without resume starts over
+    recorder.calls.clear()
+    DagExecutor(nodes(), max_workers=1, state_dir=str(tmp_path)).run()
+    assert sorted(recorder.calls) == ["left", "right", "total"]
+
+
+@pytest.mark.skipif(not CAN_FORK, reason="the lambda of the node can only be passed to a forked child")
+def test_process_node_that_times_out_fails():
+    executor = DagExecutor([DagNode("slow", lambda: time.sleep(10), timeout=0.5, use_process=True)])
+    started = time.monotonic()
+    with pytest.raises(CustomException, match="did not finish"):
+        executor.run()
+    assert time.monotonic() - started < 5
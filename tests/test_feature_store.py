@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from insurance_fraud_detection.data_access.feature_store import FeatureStore
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "config", "schema.yaml")
+
+
+def _claims(start: int, n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(start)
+    return pd.DataFrame({"policy_number": np.arange(start, start + n_rows, dtype=np.int64),
+                         "age": rng.integers(18, 80, n_rows),
+                         "policy_annual_premium": rng.random(n_rows) * 2000,
+                         "fraud_reported": rng.choice(["Y", "N"], n_rows).astype(object)})
+
+
+@pytest.fixture(params=["parquet", "csv"])
+def store(request, tmp_path):
+    file_path = str(tmp_path / f"claims.{request.param}")
+    return FeatureStore(file_path=file_path, schema_file_path=SCHEMA_FILE_PATH)
+
+
+def test_rollback_drops_what_was_appended_after_the_marker(store):
+    store.append(_claims(0, 100))
+    store.append(_claims(100, 50))
+    marker = store.marker()
+    store.append(_claims(150, 70))
+    store.append(_claims(220, 30))
+    assert store.count_rows() == 250
+
+    store.rollback(marker)
+
+    data = store.read()
+    assert len(data) == 150
+    assert data["policy_number"].tolist() == list(range(150))
+    # appending after a rollback continues from the marker
+    store.append(_claims(150, 10))
+    assert store.read()["policy_number"].tolist() == list(range(160))
+
+
+def test_rollback_to_an_empty_store(store):
+    marker = store.marker()
+    assert marker == 0
+    store.append(_claims(0, 20))
+    store.rollback(marker)
+    assert not store.exists()
+    store.append(_claims(0, 5))
+    assert len(store.read()) == 5
+
+
+def test_rollback_removes_an_append_cut_off_half_way(store):
+    store.append(_claims(0, 40))
+    marker = store.marker()
+    if store.file_format == "csv":
+        # a crash in the middle of a csv append leaves part of a row
+        with open(store.file_path, "a") as file_obj:
+            file_obj.write("40,33,12")
+    else:
+        # a crash in the middle of a parquet append leaves the temporary part file
+        with open(os.path.join(store.file_path, "part-00001.parquet.tmp"), "wb") as file_obj:
+            file_obj.write(b"PAR1")
+
+    store.rollback(marker)
+
+    assert len(store.read()) == 40
+    if store.file_format == "parquet":
+        assert not [name for name in os.listdir(store.file_path) if name.endswith(".tmp")]
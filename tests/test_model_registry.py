@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.utils import model_registry
+from insurance_fraud_detection.utils.main_utils import load_model_artifact, save_model_artifact
+from insurance_fraud_detection.utils.model_registry import ModelRegistry
+
+
+def _artifacts(directory, name: str):
+    model_file_path = os.path.join(directory, name, "model.pkl")
+    preprocessor_file_path = os.path.join(directory, name, "preprocessing.pkl")
+    save_model_artifact(model_file_path, {"model": name})
+    save_model_artifact(preprocessor_file_path, {"preprocessor": name})
+    return model_file_path, preprocessor_file_path
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(registry_dir=str(tmp_path / "registry"))
+
+
+def test_registering_a_bundle_twice_is_a_no_op(tmp_path, registry):
+    artifacts = _artifacts(tmp_path, "a")
+    version = registry.register(*artifacts)
+    registered_at = registry.read_bundle(version)["registered_at"]
+
+    assert registry.register(*artifacts) == version
+    assert [bundle["version"] for bundle in registry.list_versions()] == [version]
+    assert registry.read_bundle(version)["registered_at"] == registered_at
+    assert load_model_artifact(registry.model_file_path(version)) == {"model": "a"}
+
+
+def test_concurrent_registration_of_the_same_bundle_succeeds(tmp_path, registry, monkeypatch):
+    artifacts = _artifacts(tmp_path, "a")
+    rename = os.rename
+
+    def rename_after_another_process(source, destination):
+        # another process renames its copy of the same bundle into place first
+        rename(source, source + "-copy")
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        rename(source + "-copy", destination)
+        raise FileExistsError(destination)
+
+    monkeypatch.setattr(model_registry.os, "rename", rename_after_another_process)
+    version = registry.register(*artifacts)
+    monkeypatch.undo()
+
+    assert os.path.exists(registry.model_file_path(version))
+    assert not [name for name in os.listdir(registry.bundles_dir) if name.startswith(".tmp-")]
+
+
+def test_promote_and_rollback_move_the_pointer(tmp_path, registry):
+    version_a = registry.register(*_artifacts(tmp_path, "a"))
+    version_b = registry.register(*_artifacts(tmp_path, "b"))
+    assert registry.current_version() is None
+
+    registry.promote(version_a)
+    registry.promote(version_b)
+    assert registry.current_version() == version_b
+    assert registry.read_pointer()["history"] == [version_a]
+    # promoting the production version again leaves the history alone
+    registry.promote(version_b)
+    assert registry.read_pointer()["history"] == [version_a]
+
+    assert registry.rollback() == version_a
+    assert registry.current_version() == version_a
+    assert registry.read_pointer()["history"] == []
+    with pytest.raises(CustomException, match="No previous version"):
+        registry.rollback()
+
+
+def test_rollback_to_an_older_version_drops_the_later_ones(tmp_path, registry):
+    versions = [registry.register(*_artifacts(tmp_path, name)) for name in ("a", "b", "c", "d")]
+    for version in versions:
+        registry.promote(version)
+    assert registry.read_pointer()["history"] == versions[:3]
+
+    assert registry.rollback(versions[1]) == versions[1]
+    assert registry.read_pointer()["history"] == versions[:1]
+    with pytest.raises(CustomException, match="not in the promotion history"):
+        registry.rollback(versions[2])
+
+
+def test_corrupted_bundle_is_not_promoted_or_rolled_back_to(tmp_path, registry):
+    version_a = registry.register(*_artifacts(tmp_path, "a"))
+    version_b = registry.register(*_artifacts(tmp_path, "b"))
+    registry.promote(version_a)
+    registry.promote(version_b)
+
+    with open(registry.model_file_path(version_a), "r+b") as file_obj:
+        file_obj.seek(-1, os.SEEK_END)
+        last_byte = file_obj.read(1)
+        file_obj.seek(-1, os.SEEK_END)
+        file_obj.write(bytes([last_byte[0] ^ 0xFF]))
+
+    with pytest.raises(CustomException, match="sha256"):
+        registry.rollback()
+    assert registry.current_version() == version_b
+    with pytest.raises(CustomException, match="sha256"):
+        registry.promote(version_a)
+
+
+def test_corrupted_artifact_is_not_registered(tmp_path, registry):
+    model_file_path, preprocessor_file_path = _artifacts(tmp_path, "a")
+    with open(model_file_path, "r+b") as file_obj:
+        file_obj.seek(-1, os.SEEK_END)
+        last_byte = file_obj.read(1)
+        file_obj.seek(-1, os.SEEK_END)
+        file_obj.write(bytes([last_byte[0] ^ 0xFF]))
+
+    with pytest.raises(CustomException, match="sha256"):
+        registry.register(model_file_path, preprocessor_file_path)
+    assert registry.list_versions() == []
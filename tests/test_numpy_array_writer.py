@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from insurance_fraud_detection.exception import CustomException
+from insurance_fraud_detection.utils.main_utils import (NPY_HEADER_SIZE, NumpyArrayWriter, load_numpy_array_data,
+                                                        read_numpy_array_metadata)
+
+
+def _blocks(n_columns: int = 7):
+    rng = np.random.default_rng(0)
+    dense = rng.random((50, n_columns))
+    sparse_block = sparse.random(30, n_columns, density=0.3, format="csr", random_state=1)
+    return [dense, sparse_block, rng.random((1, n_columns)), np.empty((0, n_columns))]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_written_array_loads_with_numpy_and_verifies(tmp_path, dtype):
+    file_path = str(tmp_path / "transformed" / "train.npy")
+    blocks = _blocks()
+    columns = [f"feature_{index}" for index in range(7)]
+    with NumpyArrayWriter(file_path, n_columns=7, dtype=dtype, columns=columns) as writer:
+        for block in blocks:
+            writer.append(block)
+
+    expected = np.vstack([block.toarray() if sparse.issparse(block) else block for block in blocks]).astype(dtype)
+    np.testing.assert_array_equal(np.load(file_path), expected)
+    array = load_numpy_array_data(file_path, mmap_mode="r", verify=True)
+    assert isinstance(array, np.memmap) and array.dtype == dtype and array.shape == (81, 7)
+    np.testing.assert_array_equal(array, expected)
+    assert os.path.getsize(file_path) == NPY_HEADER_SIZE + expected.nbytes
+    assert read_numpy_array_metadata(file_path)["columns"] == columns
+    assert not os.path.exists(file_path + ".tmp")
+
+
+def test_empty_array(tmp_path):
+    file_path = str(tmp_path / "empty.npy")
+    NumpyArrayWriter(file_path, n_columns=3).close()
+    assert load_numpy_array_data(file_path, verify=True).shape == (0, 3)
+
+
+def test_verify_detects_a_modified_file(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+    with NumpyArrayWriter(file_path, n_columns=7) as writer:
+        writer.append(_blocks()[0])
+    with open(file_path, "r+b") as file_obj:
+        file_obj.seek(200)
+        file_obj.write(b"\x00\x01\x02\x03")
+    with pytest.raises(CustomException, match="does not match its metadata"):
+        load_numpy_array_data(file_path, mmap_mode="r", verify=True)
+
+
+def test_abort_leaves_no_file_behind(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+    writer = NumpyArrayWriter(file_path, n_columns=7)
+    writer.append(_blocks()[0])
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+
+    with pytest.raises(CustomException):
+        with NumpyArrayWriter(file_path, n_columns=7) as writer:
+            writer.append(_blocks()[0])
+            writer.append(np.ones((2, 3)))
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_rewrite_keeps_the_previous_file(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+    with NumpyArrayWriter(file_path, n_columns=7) as writer:
+        writer.append(_blocks()[0])
+    with pytest.raises(RuntimeError):
+        with NumpyArrayWriter(file_path, n_columns=7) as writer:
+            writer.append(np.zeros((5, 7)))
+            raise RuntimeError("transform failed")
+    np.testing.assert_array_equal(load_numpy_array_data(file_path, verify=True), _blocks()[0].astype(np.float32))
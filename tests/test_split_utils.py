@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insurance_fraud_detection.utils.split_utils import HashSplitter
+
+
+def _claims(n_rows: int = 20_000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    fraud = np.where(rng.random(n_rows) < 0.05, "Y", "N").astype(object)
+    fraud[rng.random(n_rows) < 0.01] = None
+    return pd.DataFrame({"policy_number": rng.permutation(np.arange(100_000, 100_000 + n_rows)),
+                         "fraud_reported": fraud})
+
+
+def _test_keys(splitter: HashSplitter, dataframe: pd.DataFrame, chunk_size: int) -> set:
+    keys = set()
+    for start in range(0, len(dataframe), chunk_size):
+        chunk = dataframe.iloc[start:start + chunk_size]
+        keys.update(chunk.loc[splitter.test_mask(chunk), "policy_number"])
+    return keys
+
+
+def _test_count_errors(mask: np.ndarray, claims: pd.DataFrame, test_ratio: float) -> dict:
+    strata = claims["fraud_reported"].fillna("missing")
+    return {stratum: abs(int(mask[(strata == stratum).to_numpy()].sum()) - round(test_ratio * n_rows))
+            for stratum, n_rows in strata.value_counts().items()}
+
+
+@pytest.mark.parametrize("stratify_column", [None, "fraud_reported"])
+def test_split_does_not_depend_on_chunking_or_order(stratify_column):
+    claims = _claims()
+    splitter = HashSplitter(test_ratio=0.2, key_column="policy_number", stratify_column=stratify_column)
+    splitter.fit_chunks(claims.iloc[start:start + 3_000] for start in range(0, len(claims), 3_000))
+    expected = _test_keys(splitter, claims, chunk_size=len(claims))
+    for chunk_size in (5_000, 777, 13):
+        assert _test_keys(splitter, claims, chunk_size) == expected
+    shuffled = claims.sample(frac=1.0, random_state=1)
+    assert _test_keys(splitter, shuffled, chunk_size=1_000) == expected
+
+
+def test_stratified_split_meets_the_test_quota_of_every_stratum():
+    claims = _claims()
+    stratified = HashSplitter(test_ratio=0.2, key_column="policy_number", stratify_column="fraud_reported")
+    errors = _test_count_errors(stratified.fit(claims).test_mask(claims), claims, 0.2)
+    assert max(errors.values()) <= 1
+
+    unstratified = HashSplitter(test_ratio=0.2, key_column="policy_number")
+    errors = _test_count_errors(unstratified.test_mask(claims), claims, 0.2)
+    assert max(errors.values()) > 1
+
+
+def test_fitted_thresholds_reproduce_the_split():
+    claims = _claims()
+    fitted = HashSplitter(test_ratio=0.2, key_column="policy_number", stratify_column="fraud_reported").fit(claims)
+    restored = HashSplitter(test_ratio=0.2, key_column="policy_number", stratify_column="fraud_reported",
+                            thresholds=fitted.thresholds)
+    np.testing.assert_array_equal(restored.test_mask(claims), fitted.test_mask(claims))
+
+
+def test_stratified_split_must_be_fitted():
+    splitter = HashSplitter(test_ratio=0.2, key_column="policy_number", stratify_column="fraud_reported")
+    with pytest.raises(Exception, match="fitted"):
+        splitter.test_mask(_claims(100))